@@ -4,13 +4,18 @@
 import logging
 import json
 import os
+import time
+from contextlib import ExitStack
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify
 from flask_cors import CORS
 from app.config_manager import ConfigManager
 from app.network_manager import NetworkManager
-from app.modbus.rtu_master import ModbusRTUMaster
-from app.modbus.tcp_server import ModbusTCPServer
+from app.bus_service import BusService
+from app.bus_ipc import BusClient, BusIPCServer, EventMirror
+from app.event_stream import EventHub, subscription_filter, sse_stream
+from app.modbus.bus_scheduler import bus_context, DEADLINE_EXCEEDED, OUTCOME_UNKNOWN
+from app.response_encoder import JSON_MIMETYPE, init_app as init_response_encoding, json_loads, preferred_mimetype
 
 # Настройка логирования
 logging.basicConfig(
@@ -19,12 +24,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Заголовок запроса: сколько секунд клиент готов ждать ответа
+DEADLINE_HEADER = 'X-Request-Timeout'
+
 
 class SmartHomeController:
     """Основное приложение контроллера умного дома"""
     
-    def __init__(self):
-        """Инициализация контроллера"""
+    def __init__(self, remote_bus: bool = False):
+        """
+        Инициализация контроллера
+        
+        Args:
+            remote_bus: False - шина обслуживается в этом процессе;
+                        True - отдельным процессом (BusService через Unix сокет),
+                        что позволяет запускать несколько процессов веб-сервера
+        """
         # Получить абсолютный путь к директории приложения
         app_dir = Path(__file__).parent.absolute()
         template_dir = app_dir / 'web' / 'templates'
@@ -38,35 +53,55 @@ class SmartHomeController:
         # Менеджеры
         self.config_manager = ConfigManager(config_file='./config/config.json')
         self.network_manager = NetworkManager()
-        self.rtu_master = None
-        self.tcp_server = None
+        self.event_mirror = None
+        init_response_encoding(self.app, self.config_manager.get('http', {}))
+        self._register_deadline(self.config_manager.get('http', {}))
+        if remote_bus:
+            self.bus = BusClient(self.config_manager.get('ipc.socket', '/tmp/smarthome-bus.sock'),
+                                 timeout=self.config_manager.get('ipc.timeout', 30.0))
+            self.events = EventHub()
+            self.event_mirror = EventMirror(self.bus, self.events)
+        else:
+            self.bus = BusService(self.config_manager)
+            self.events = self.bus.events
         
         # Регистрация маршрутов
         self._register_routes()
         
         # Инициализация компонентов
-        self._initialize_components()
+        if not remote_bus:
+            self.bus.start()
     
-    def _initialize_components(self):
-        """Инициализация компонентов на основе конфигурации"""
-        # Инициализировать RTU мастер
-        rtu_config = self.config_manager.get('modbus_rtu', {})
-        if rtu_config.get('enabled'):
-            self.rtu_master = ModbusRTUMaster(
-                port=rtu_config.get('port', '/dev/ttyUSB0'),
-                baudrate=rtu_config.get('baudrate', 9600),
-                timeout=rtu_config.get('timeout', 1)
-            )
-            self.rtu_master.connect()
-        
-        # Инициализировать TCP сервер
-        tcp_config = self.config_manager.get('modbus_tcp', {})
-        if tcp_config.get('enabled'):
-            self.tcp_server = ModbusTCPServer(
-                host=tcp_config.get('host', '0.0.0.0'),
-                port=tcp_config.get('port', 5020)
-            )
-            self.tcp_server.start()
+    def _register_deadline(self, config: dict):
+        """
+        Крайний срок каждого запроса: заголовок X-Request-Timeout (секунды) или
+        http.request_timeout, но не больше http.max_request_timeout
+        
+        Срок действует через bus_context() на все транзакции шины запроса
+        (и передается процессу шины): транзакция, не начатая к сроку, не
+        выполняется, а поток веб-сервера перестает ждать ответа шины.
+        """
+        default = config.get('request_timeout', 10.0)
+        maximum = config.get('max_request_timeout', 60.0)
+        
+        @self.app.before_request
+        def start_deadline():
+            timeout = request.headers.get(DEADLINE_HEADER, type=float)
+            if timeout is None:
+                timeout = default
+                if not timeout:
+                    # request_timeout: 0 - без срока, если клиент его не задал
+                    return
+            if maximum:
+                timeout = min(timeout, maximum)
+            g.deadline = ExitStack()
+            g.deadline.enter_context(bus_context(deadline=time.monotonic() + max(timeout, 0.0)))
+        
+        @self.app.teardown_request
+        def end_deadline(error):
+            stack = g.pop('deadline', None)
+            if stack is not None:
+                stack.close()
     
     def _register_routes(self):
         """Регистрация всех маршрутов приложения"""
@@ -79,7 +114,7 @@ class SmartHomeController:
         # API маршруты
         @self.app.route('/api/system/status', methods=['GET'])
         def get_system_status():
-            return jsonify(self._get_system_status())
+            return self._versioned_response('system') or jsonify(self.bus.system_status())
         
         # Сетевые настройки
         @self.app.route('/api/network/config', methods=['GET'])
@@ -90,148 +125,193 @@ class SmartHomeController:
         def network_hostname():
             if request.method == 'POST':
                 data = request.get_json()
-                hostname = data.get('hostname')
-                success = self.network_manager.set_hostname(hostname)
-                return jsonify({'success': success})
+                return jsonify(self.bus.hostname_set(hostname=data.get('hostname')))
             else:
-                return jsonify({'hostname': self.network_manager.get_hostname()})
+                return jsonify(self.bus.hostname_get())
         
         # Конфигурация
         @self.app.route('/api/config/get', methods=['GET'])
         def get_config():
-            return jsonify(self.config_manager.get_all())
+            return self._versioned_response('config') or jsonify(self.bus.config_get())
         
         @self.app.route('/api/config/update', methods=['POST'])
         def update_config():
-            data = request.get_json()
-            success = self.config_manager.update(data)
-            return jsonify({'success': success})
+            return jsonify(self.bus.config_update(data=request.get_json()))
         
         # Modbus RTU
         @self.app.route('/api/modbus/rtu/status', methods=['GET'])
         def get_rtu_status():
-            if self.rtu_master:
-                return jsonify(self.rtu_master.get_status())
-            return jsonify({'error': 'RTU not initialized'})
+            bus = request.args.get('bus')
+            return (self._versioned_response(f'rtu:{bus}' if bus else 'rtu')
+                    or jsonify(self.bus.rtu_status(bus=bus)))
+        
+        @self.app.route('/api/modbus/rtu/stats', methods=['GET'])
+        def get_rtu_stats():
+            return jsonify(self.bus.rtu_stats(bus=request.args.get('bus')))
+        
+        @self.app.route('/api/modbus/rtu/buses', methods=['GET'])
+        def get_rtu_buses():
+            return jsonify(self.bus.buses_status())
         
         @self.app.route('/api/modbus/rtu/connect', methods=['POST'])
         def rtu_connect():
-            try:
-                data = request.get_json()
-                port = data.get('port')
-                baudrate = data.get('baudrate', 9600)
-                
-                if self.rtu_master:
-                    self.rtu_master.disconnect()
-                
-                self.rtu_master = ModbusRTUMaster(port=port, baudrate=baudrate)
-                success = self.rtu_master.connect()
-                return jsonify({'success': success})
-            except Exception as e:
-                logger.error(f"Error connecting to RTU: {e}")
-                return jsonify({'success': False, 'error': str(e)})
+            data = request.get_json(silent=True) or {}
+            return jsonify(self.bus.rtu_connect(
+                port=data.get('port'),
+                baudrate=data.get('baudrate', 9600),
+                bus=data.get('bus')
+            ))
         
         @self.app.route('/api/modbus/rtu/disconnect', methods=['POST'])
         def rtu_disconnect():
-            if self.rtu_master:
-                self.rtu_master.disconnect()
-                return jsonify({'success': True})
-            return jsonify({'success': False, 'error': 'RTU not initialized'})
+            data = request.get_json(silent=True) or {}
+            return jsonify(self.bus.rtu_disconnect(bus=data.get('bus')))
+        
+        @self.app.route('/api/modbus/rtu/discovery', methods=['GET'])
+        def rtu_discovery_status():
+            return jsonify(self.bus.discovery_status(bus=request.args.get('bus')))
+        
+        @self.app.route('/api/modbus/rtu/discovery/start', methods=['POST'])
+        def rtu_discovery_start():
+            data = request.get_json(silent=True) or {}
+            return jsonify(self.bus.discovery_start(
+                bus=data.get('bus'),
+                first=data.get('first', 1),
+                last=data.get('last', 247),
+                mode=data.get('mode', 'full')
+            ))
+        
+        @self.app.route('/api/modbus/rtu/discovery/cancel', methods=['POST'])
+        def rtu_discovery_cancel():
+            data = request.get_json(silent=True) or {}
+            return jsonify(self.bus.discovery_cancel(bus=data.get('bus')))
         
         @self.app.route('/api/modbus/rtu/read', methods=['POST'])
         def rtu_read():
-            try:
-                if not self.rtu_master:
-                    return jsonify({'success': False, 'error': 'RTU not initialized'})
-                
-                data = request.get_json()
-                slave_id = data.get('slave_id')
-                read_type = data.get('type')  # coils, discrete_inputs, holding_registers, input_registers
-                start_addr = data.get('start_addr')
-                quantity = data.get('quantity')
-                
-                if read_type == 'coils':
-                    result = self.rtu_master.read_coils(slave_id, start_addr, quantity)
-                elif read_type == 'discrete_inputs':
-                    result = self.rtu_master.read_discrete_inputs(slave_id, start_addr, quantity)
-                elif read_type == 'holding_registers':
-                    result = self.rtu_master.read_holding_registers(slave_id, start_addr, quantity)
-                elif read_type == 'input_registers':
-                    result = self.rtu_master.read_input_registers(slave_id, start_addr, quantity)
-                else:
-                    return jsonify({'success': False, 'error': 'Unknown read type'})
-                
-                return jsonify(result)
-            except Exception as e:
-                logger.error(f"Error reading from RTU: {e}")
-                return jsonify({'success': False, 'error': str(e)})
+            data = request.get_json(silent=True) or {}
+            return self._bus_response(self.bus.rtu_read(
+                slave_id=data.get('slave_id'),
+                read_type=data.get('type'),  # coils, discrete_inputs, holding_registers, input_registers
+                start_addr=data.get('start_addr'),
+                quantity=data.get('quantity'),
+                encoding=data.get('encoding', 'list'),  # list, base64, hex
+                bus=data.get('bus')
+            ))
         
         @self.app.route('/api/modbus/rtu/write', methods=['POST'])
         def rtu_write():
-            try:
-                if not self.rtu_master:
-                    return jsonify({'success': False, 'error': 'RTU not initialized'})
-                
-                data = request.get_json()
-                slave_id = data.get('slave_id')
-                write_type = data.get('type')  # coil, register, coils, registers
-                addr = data.get('addr')
-                value = data.get('value')
-                
-                if write_type == 'coil':
-                    result = self.rtu_master.write_coil(slave_id, addr, value)
-                elif write_type == 'register':
-                    result = self.rtu_master.write_register(slave_id, addr, value)
-                elif write_type == 'coils':
-                    result = self.rtu_master.write_coils(slave_id, addr, value)
-                elif write_type == 'registers':
-                    result = self.rtu_master.write_registers(slave_id, addr, value)
-                else:
-                    return jsonify({'success': False, 'error': 'Unknown write type'})
-                
-                return jsonify(result)
-            except Exception as e:
-                logger.error(f"Error writing to RTU: {e}")
-                return jsonify({'success': False, 'error': str(e)})
+            data = request.get_json(silent=True) or {}
+            return self._bus_response(self.bus.rtu_write(
+                slave_id=data.get('slave_id'),
+                write_type=data.get('type'),  # coil, register, coils, registers
+                addr=data.get('addr'),
+                value=data.get('value'),
+                bus=data.get('bus')
+            ))
         
+        @self.app.route('/api/modbus/rtu/batch', methods=['POST'])
+        def rtu_batch():
+            data = request.get_json(silent=True) or {}
+            return self._bus_response(self.bus.rtu_batch(
+                operations=data.get('operations'),
+                timeout=data.get('timeout'),
+                merge=data.get('merge', True)
+            ))
+        
+        # Поток событий
+        @self.app.route('/api/events', methods=['GET'])
+        def events_stream():
+            def split(name):
+                value = request.args.get(name)
+                return [item for item in value.split(',') if item] if value else None
+            
+            if self.event_mirror:
+                self.event_mirror.start()
+            match = subscription_filter(split('topics'), split('devices'), split('points'))
+            last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+            stream = sse_stream(
+                self.events, match, last_event_id,
+                min_interval=request.args.get('interval', 0.0, type=float),
+                keepalive=self.config_manager.get('events.keepalive', 15.0)
+            )
+            return Response(stream, mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        
+        # Фоновый опрос
+        @self.app.route('/api/poll/status', methods=['GET'])
+        def get_poll_status():
+            return jsonify(self.bus.poll_status())
+        
+        @self.app.route('/api/poll/snapshot', methods=['GET'])
+        def get_poll_snapshot():
+            return jsonify(self.bus.poll_snapshot())
+        
+        @self.app.route('/api/poll/plan', methods=['GET'])
+        def get_poll_plan():
+            return jsonify(self.bus.poll_plan())
+
+        @self.app.route('/api/devices/<int:device_id>/values', methods=['GET'])
+        def get_device_values(device_id):
+            result = self.bus.device_values(device_id=device_id)
+            if result.pop('not_found', False):
+                return jsonify(result), 404
+            return jsonify(result)
+
         # Modbus TCP
         @self.app.route('/api/modbus/tcp/status', methods=['GET'])
         def get_tcp_status():
-            if self.tcp_server:
-                return jsonify(self.tcp_server.get_status())
-            return jsonify({'error': 'TCP server not initialized'})
+            return self._versioned_response('tcp') or jsonify(self.bus.tcp_status())
+        
+        @self.app.route('/api/modbus/tcp/stats', methods=['GET'])
+        def get_tcp_stats():
+            return jsonify(self.bus.tcp_stats())
         
         @self.app.route('/api/modbus/tcp/start', methods=['POST'])
         def tcp_start():
-            try:
-                data = request.get_json()
-                host = data.get('host', '0.0.0.0')
-                port = data.get('port', 5020)
-                
-                if self.tcp_server:
-                    self.tcp_server.stop()
-                
-                self.tcp_server = ModbusTCPServer(host=host, port=port)
-                success = self.tcp_server.start()
-                return jsonify({'success': success})
-            except Exception as e:
-                logger.error(f"Error starting TCP server: {e}")
-                return jsonify({'success': False, 'error': str(e)})
+            data = request.get_json(silent=True) or {}
+            return jsonify(self.bus.tcp_start(
+                host=data.get('host', '0.0.0.0'),
+                port=data.get('port', 5020)
+            ))
         
         @self.app.route('/api/modbus/tcp/stop', methods=['POST'])
         def tcp_stop():
-            if self.tcp_server:
-                self.tcp_server.stop()
-                return jsonify({'success': True})
-            return jsonify({'success': False, 'error': 'TCP server not initialized'})
+            return jsonify(self.bus.tcp_stop())
+    
+    def _bus_response(self, result):
+        """
+        JSON ответ операции шины; 504 - крайний срок запроса истек до ответа шины
+
+        DEADLINE_EXCEEDED - транзакция не выполнялась, OUTCOME_UNKNOWN - начатая
+        транзакция не завершилась вовремя и могла быть выполнена.
+        """
+        if isinstance(result, dict) and result.get('error') in (DEADLINE_EXCEEDED, OUTCOME_UNKNOWN):
+            return jsonify(result), 504
+        return jsonify(result)
     
-    def _get_system_status(self) -> dict:
-        """Получить общий статус системы"""
-        return {
-            'rtu': self.rtu_master.get_status() if self.rtu_master else None,
-            'tcp': self.tcp_server.get_status() if self.tcp_server else None,
-            'hostname': self.network_manager.get_hostname()
-        }
+    def _versioned_response(self, name: str):
+        """
+        Ответ с ETag версии состояния (None - состояние недоступно)
+        
+        Если версия из If-None-Match актуальна - 304 без тела; с параметром
+        wait=<секунды> запрос ждет новой версии (long-poll) и по истечении
+        ожидания отвечает 304.
+        """
+        # Слабые ETag - те же версии после сжатия ответа
+        etags = list(request.if_none_match.as_set(include_weak=True))
+        state = self.bus.state_get(name=name, etags=etags,
+                                   wait=request.args.get('wait', 0.0, type=float))
+        if 'etag' not in state:
+            return None
+        if state.get('not_modified'):
+            response = Response(status=304)
+        elif preferred_mimetype() != JSON_MIMETYPE:
+            response = self.app.json.response(json_loads(state['body']))
+        else:
+            response = Response(state['body'], mimetype=JSON_MIMETYPE)
+        response.set_etag(state['etag'])
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     
     def run(self, host: str = '0.0.0.0', port: int = 8000, debug: bool = False):
         """Запуск приложения"""
@@ -239,9 +319,32 @@ class SmartHomeController:
         self.app.run(host=host, port=port, debug=debug)
 
 
-def create_app():
+def create_app(remote_bus: bool = False):
     """Factory функция для создания приложения"""
-    return SmartHomeController()
+    return SmartHomeController(remote_bus=remote_bus)
+
+
+def create_web_app():
+    """
+    WSGI приложение для процессов веб-сервера при отдельном процессе шины
+    
+    Пример: gunicorn -w 4 -b 0.0.0.0:8000 'app:create_web_app()'
+    """
+    return create_app(remote_bus=True).app
+
+
+def create_bus_service(config_file: str = './config/config.json'):
+    """
+    Процесс-владелец шины: BusService и IPC сервер на Unix сокете
+    
+    Returns:
+        (BusService, BusIPCServer) - сервис запущен, IPC сервер еще не принимает запросы
+    """
+    config_manager = ConfigManager(config_file=config_file)
+    service = BusService(config_manager)
+    server = BusIPCServer(service, config_manager.get('ipc.socket', '/tmp/smarthome-bus.sock'))
+    service.start()
+    return service, server
 
 
 if __name__ == '__main__':
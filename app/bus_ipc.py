@@ -0,0 +1,334 @@
+"""
+Bus IPC - доступ к BusService из других процессов через Unix сокет
+
+Протокол: кадр - 4 байта длины (big-endian) и JSON тело.
+Запрос:  {"id": 1, "method": "rtu_read", "params": {...}, "timeout": 4.98}
+Ответ:   {"id": 1, "result": ...} или {"id": 1, "error": "..."}
+
+timeout - секунд до крайнего срока запроса клиента (bus_context); сервис
+выполняет метод с тем же сроком, поэтому работа, не дошедшая до шины вовремя,
+отбрасывается и в процессе шины.
+
+Соединение обслуживает запросы по очереди; параллельность дают несколько
+соединений (у клиента - пул, у сервера - поток на соединение).
+"""
+import itertools
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Any, Dict, Optional
+from app.bus_service import BusService
+from app.event_stream import EventHub
+from app.modbus.bus_scheduler import bus_context, remaining_time, DEADLINE_EXCEEDED, OUTCOME_UNKNOWN
+from app.response_encoder import json_dumps, json_loads
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('>I')
+MAX_FRAME = 16 * 1024 * 1024
+
+# Запас к крайнему сроку на ожидание ответа сервиса: к сроку он сам отвечает
+# DEADLINE_EXCEEDED, а начатую транзакцию доводит до конца (до 4 таймаутов линии)
+DEADLINE_MARGIN = 5.0
+
+
+class IPCError(Exception):
+    """Нарушение протокола или обрыв соединения"""
+    pass
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Прочитать ровно size байт (None - соединение закрыто до начала кадра)"""
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(remaining)
+        if not chunk:
+            if remaining == size:
+                return None
+            raise IPCError("Connection closed mid-frame")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def read_frame(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    """Прочитать кадр (None - соединение закрыто)"""
+    header = _recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    size, = HEADER.unpack(header)
+    if size > MAX_FRAME:
+        raise IPCError(f"Frame too large: {size}")
+    body = _recv_exact(sock, size)
+    if body is None:
+        raise IPCError("Connection closed mid-frame")
+    return json_loads(body)
+
+
+def write_frame(sock: socket.socket, message: Dict[str, Any]):
+    body = json_dumps(message)
+    sock.sendall(HEADER.pack(len(body)) + body)
+
+
+class _IPCHandler(socketserver.BaseRequestHandler):
+    """Обслуживание одного соединения"""
+
+    def setup(self):
+        self.server.track(self.request, True)
+
+    def handle(self):
+        while True:
+            try:
+                request = read_frame(self.request)
+            except (IPCError, OSError, ValueError) as e:
+                logger.warning(f"IPC connection error: {e}")
+                return
+            if request is None:
+                return
+            try:
+                write_frame(self.request, self.server.dispatch(request))
+            except OSError:
+                return
+
+    def finish(self):
+        self.server.track(self.request, False)
+
+
+class BusIPCServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Сервер BusService на Unix сокете"""
+
+    daemon_threads = True
+
+    def __init__(self, service: BusService, path: str, mode: int = 0o660):
+        """
+        Args:
+            service: Сервис, методы которого вызываются (BusService.METHODS)
+            path: Путь к сокету
+            mode: Права на сокет (доступ для веб-процессов той же группы)
+
+        Raises:
+            OSError: Сокет занят работающим сервисом
+        """
+        self.service = service
+        self.path = path
+        self.connections = set()
+        self.lock = threading.Lock()
+        self.thread = None
+        _remove_stale_socket(path)
+        super().__init__(path, _IPCHandler)
+        os.chmod(path, mode)
+
+    def track(self, sock: socket.socket, opened: bool):
+        with self.lock:
+            if opened:
+                self.connections.add(sock)
+            else:
+                self.connections.discard(sock)
+
+    def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Выполнить запрос; ошибка метода возвращается клиенту, соединение остается"""
+        request_id = request.get('id')
+        method = request.get('method')
+        if method not in BusService.METHODS:
+            return {'id': request_id, 'error': f'Unknown method: {method}'}
+        timeout = request.get('timeout')
+        try:
+            with bus_context(deadline=None if timeout is None else time.monotonic() + timeout):
+                result = getattr(self.service, method)(**(request.get('params') or {}))
+        except Exception as e:
+            logger.error(f"IPC method {method} error: {e}")
+            return {'id': request_id, 'error': str(e)}
+        return {'id': request_id, 'result': result}
+
+    def start(self):
+        """Обслуживать запросы в фоновом потоке"""
+        self.thread = threading.Thread(target=self.serve_forever, name='bus-ipc', daemon=True)
+        self.thread.start()
+        logger.info(f"Bus IPC listening on {self.path}")
+
+    def stop(self):
+        """Остановить прием, закрыть соединения клиентов и удалить сокет"""
+        if self.thread:
+            self.shutdown()
+            self.thread.join(timeout=5)
+            self.thread = None
+        with self.lock:
+            connections = list(self.connections)
+        for sock in connections:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.server_close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _remove_stale_socket(path: str):
+    """Удалить сокет, оставшийся от завершившегося процесса"""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(f"Bus service is already running on {path}")
+
+
+class BusClient:
+    """
+    Клиент BusService для процессов веб-сервера
+
+    Методы BusService.METHODS доступны как методы клиента (только именованные
+    аргументы) и возвращают тот же результат. Если сервис недоступен,
+    возвращается {"success": False, "error"} - так же, как маршруты сообщают
+    об ошибках RTU. Крайний срок bus_context() вызывающего потока передается
+    сервису и ограничивает ожидание ответа.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0, pool_size: int = 8):
+        self.path = path
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.pool = []
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def __getattr__(self, name: str):
+        if name not in BusService.METHODS:
+            raise AttributeError(name)
+        return lambda **params: self.call(name, params, timeout=self._timeout(params.get('wait')))
+
+    def _timeout(self, wait: Optional[float]) -> float:
+        """Ожидание ответа: не дольше крайнего срока; wait - long-poll на стороне сервиса"""
+        timeout = self.timeout
+        remaining = remaining_time()
+        if remaining is not None:
+            timeout = min(timeout, remaining + DEADLINE_MARGIN)
+        return timeout + (wait or 0)
+
+    def _acquire(self) -> tuple:
+        with self.lock:
+            if self.pool:
+                return self.pool.pop(), True
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock, False
+
+    def _release(self, sock: socket.socket):
+        with self.lock:
+            if len(self.pool) < self.pool_size:
+                self.pool.append(sock)
+                return
+        sock.close()
+
+    def call(self, method: str, params: Optional[Dict[str, Any]] = None,
+             timeout: Optional[float] = None) -> Any:
+        """Вызвать метод сервиса"""
+        request = {'id': next(self._ids), 'method': method, 'params': params or {}}
+        remaining = remaining_time()
+        if remaining is not None:
+            if remaining == 0:
+                return {'success': False, 'error': DEADLINE_EXCEEDED}
+            request['timeout'] = round(remaining, 3)
+        for attempt in range(2):
+            try:
+                sock, reused = self._acquire()
+            except OSError as e:
+                return {'success': False, 'error': f'Bus service unavailable: {e}'}
+            try:
+                sock.settimeout(self.timeout if timeout is None else timeout)
+                try:
+                    write_frame(sock, request)
+                except OSError:
+                    sock.close()
+                    if reused and attempt == 0:
+                        # Соединение из пула закрыто сервисом (перезапуск) - запрос
+                        # не был отправлен, повтор безопасен
+                        continue
+                    raise
+                response = read_frame(sock)
+                if response is None or response.get('id') != request['id']:
+                    raise IPCError("Bus service closed the connection")
+            except socket.timeout:
+                sock.close()
+                if 'timeout' in request:
+                    # Запрос мог быть выполнен сервисом после срока
+                    return {'success': False, 'error': OUTCOME_UNKNOWN}
+                return {'success': False, 'error': 'Bus service timeout'}
+            except (IPCError, OSError, ValueError) as e:
+                sock.close()
+                return {'success': False, 'error': f'Bus service error: {e}'}
+            self._release(sock)
+            if 'error' in response:
+                return {'success': False, 'error': response['error']}
+            return response.get('result')
+
+    def close(self):
+        with self.lock:
+            pool, self.pool = self.pool, []
+        for sock in pool:
+            sock.close()
+
+
+class EventMirror:
+    """
+    Копия EventHub сервиса в процессе веб-сервера
+
+    Один длинный запрос events_poll на процесс вместо запроса на каждого
+    SSE клиента; клиенты обслуживаются из локальной копии.
+    """
+
+    def __init__(self, client: BusClient, hub: EventHub, wait: float = 15.0, retry_interval: float = 1.0):
+        self.client = client
+        self.hub = hub
+        self.wait = wait
+        self.retry_interval = retry_interval
+        self.running = False
+        self.thread = None
+        self.lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def start(self):
+        """Запустить (повторный вызов ничего не делает)"""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            self._stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name='event-mirror', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self._stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=self.wait + self.client.timeout)
+        self.thread = None
+
+    def _run(self):
+        token = None
+        while not self._stop_event.is_set():
+            result = self.client.call('events_poll', {'token': token, 'timeout': self.wait},
+                                      timeout=self.wait + self.client.timeout)
+            if not result.get('success'):
+                logger.warning(f"Event mirror: {result.get('error')}")
+                self._stop_event.wait(self.retry_interval)
+                continue
+            self.hub.apply(result['token'], result['items'])
+            token = result['token']
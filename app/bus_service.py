@@ -0,0 +1,521 @@
+"""
+Bus Service - владелец RTU линий, фонового опроса и Modbus TCP шлюза
+
+Последовательный порт может открыть только один процесс, поэтому все, что
+работает с шиной, собрано здесь. Веб-интерфейс вызывает методы сервиса
+напрямую (один процесс) или через Unix сокет (см. app.bus_ipc), что позволяет
+запускать несколько процессов веб-сервера при одном владельце шины.
+Все методы из METHODS принимают и возвращают JSON-совместимые значения.
+"""
+import logging
+from typing import Dict, Any, List, Optional
+from app.config_manager import ConfigManager
+from app.network_manager import NetworkManager
+from app.event_stream import EventHub, TOPIC_VALUES, subscription_filter
+from app.state_versions import StateVersions
+from app.modbus.rtu_master import ModbusRTUMaster
+from app.modbus.register_cache import RegisterCache
+from app.modbus.slave_health import SlaveHealthTracker
+from app.modbus.async_rtu_master import AsyncModbusRTUMaster, AsyncRTUMasterFacade, EventLoopThread
+from app.modbus.bus_manager import RTUBusManager, bus_configs, DEFAULT_BUS
+from app.modbus.reconnect import ReconnectSupervisor
+from app.modbus.tcp_server import ModbusTCPServer
+from app.modbus.gateway import GatewayServerContext
+from app.modbus.poller import ModbusPoller
+from app.modbus.batch import run_batch
+from app.modbus.payload import ENCODINGS, encode_data
+
+logger = logging.getLogger(__name__)
+
+# Максимальное ожидание events_poll и state_get за один вызов
+MAX_WAIT = 30.0
+
+# Поля статуса, входящие в версионируемое состояние (ETag): счетчики меняются
+# при каждом опросе и отдаются отдельно (rtu_stats, tcp_stats, poll_status)
+RTU_STATE_FIELDS = ('connected', 'port', 'baudrate', 'mode')
+TCP_STATE_FIELDS = ('running', 'host', 'port', 'units')
+POLLER_STATE_FIELDS = ('running', 'points', 'devices')
+
+
+def _pick(status: Dict[str, Any], fields: tuple) -> Dict[str, Any]:
+    return {field: status[field] for field in fields if field in status}
+
+
+class BusService:
+    """Компоненты, владеющие шиной, и операции над ними"""
+
+    # Методы, доступные через IPC
+    METHODS = frozenset({
+        'system_status', 'config_get', 'config_update',
+        'rtu_status', 'rtu_stats', 'buses_status', 'rtu_connect', 'rtu_disconnect',
+        'discovery_status', 'discovery_start', 'discovery_cancel',
+        'rtu_read', 'rtu_write', 'rtu_batch',
+        'poll_status', 'poll_snapshot', 'poll_plan', 'device_values',
+        'tcp_status', 'tcp_stats', 'tcp_start', 'tcp_stop',
+        'hostname_get', 'hostname_set',
+        'events_poll', 'state_get',
+    })
+
+    def __init__(self, config_manager: ConfigManager):
+        self.config_manager = config_manager
+        self.rtu_master = None
+        self.rtu_buses = RTUBusManager()
+        self.event_loop = EventLoopThread()
+        self.reconnect_supervisor = None
+        self.tcp_server = None
+        self.gateway = None
+        self.poller = None
+        self.events = EventHub()
+        self.network_manager = NetworkManager()
+        self.states = StateVersions()
+
+    def start(self):
+        """Инициализация компонентов на основе конфигурации"""
+        # Инициализировать RTU мастер для каждой линии
+        rtu_config = self.config_manager.get('modbus_rtu', {})
+        if rtu_config.get('enabled'):
+            for bus in bus_configs(rtu_config):
+                master = self._create_rtu_master(
+                    port=bus['port'],
+                    baudrate=bus['baudrate'],
+                    timeout=bus['timeout']
+                )
+                master.connect()
+                self.rtu_buses.add_bus(bus['name'], master, bus['slaves'])
+            self.rtu_buses.load_routes(self.config_manager.get('devices', []))
+            self.rtu_master = self.rtu_buses.get()
+
+            # Переподключение потерянных линий в фоне
+            if rtu_config.get('auto_reconnect'):
+                self.reconnect_supervisor = ReconnectSupervisor(
+                    self.rtu_buses,
+                    interval=rtu_config.get('reconnect_interval', 5),
+                    max_interval=rtu_config.get('reconnect_max_interval', 60)
+                )
+                self.reconnect_supervisor.start()
+
+        # Инициализировать фоновый опрос устройств
+        poll_config = self.config_manager.get('polling', {})
+        if poll_config.get('enabled'):
+            self.poller = ModbusPoller(
+                self.rtu_buses,
+                self.config_manager.get('devices', []),
+                default_interval=poll_config.get('default_interval', 1.0),
+                stale_factor=poll_config.get('stale_factor', 3),
+                max_gap=poll_config.get('max_gap', 8),
+                max_bit_gap=poll_config.get('max_bit_gap', 32)
+            )
+            self.poller.add_change_listener(self.events.publish_values)
+            self.poller.start()
+
+        # Инициализировать TCP сервер (шлюз к RTU устройствам)
+        tcp_config = self.config_manager.get('modbus_tcp', {})
+        if tcp_config.get('enabled'):
+            datastore_config = tcp_config.get('datastore', {})
+            self.gateway = GatewayServerContext(
+                self.rtu_buses,
+                self.config_manager.get('devices', []),
+                tcp_config.get('units', {}),
+                page_size=datastore_config.get('page_size', 256),
+                strict=datastore_config.get('strict', True),
+                max_gap=poll_config.get('max_gap', 8),
+                max_bit_gap=poll_config.get('max_bit_gap', 32)
+            )
+            if self.poller:
+                self.poller.add_listener(self.gateway.update)
+            self.tcp_server = ModbusTCPServer(
+                host=tcp_config.get('host', '0.0.0.0'),
+                port=tcp_config.get('port', 5020),
+                context=self.gateway,
+                admission=self._tcp_admission_config(),
+                workers=tcp_config.get('workers', 8)
+            )
+            self.tcp_server.start()
+
+        # Поток событий: изменения значений публикует опросчик, статус проверяется здесь
+        self.events.add_source('rtu', self._rtu_summary)
+        self.events.add_source('tcp', self._tcp_summary)
+        self.events.start(self.config_manager.get('events.status_interval', 1.0))
+
+        # Версии состояния для ETag и long-poll (конфигурация меняется только через config_update)
+        self.states.refresh_interval = self.config_manager.get('state.refresh_interval', 1.0)
+        self.states.register('config', self.config_get, periodic=False)
+        self.states.register('system', self.system_status)
+        self.states.register('rtu', self.rtu_status)
+        self.states.register('tcp', self.tcp_status)
+
+    def stop(self):
+        """Остановить компоненты и освободить порты"""
+        self.events.stop()
+        if self.tcp_server:
+            self.tcp_server.stop()
+        if self.poller:
+            self.poller.stop()
+        if self.reconnect_supervisor:
+            self.reconnect_supervisor.stop()
+        self.rtu_buses.disconnect()
+        self.event_loop.stop()
+
+    def _rtu_summary(self) -> dict:
+        """Состояние линий RTU для потока событий"""
+        buses = {name: bool(master.connected) for name, master in self.rtu_buses.buses.items()}
+        return {'connected': any(buses.values()), 'buses': buses}
+
+    def _tcp_summary(self) -> dict:
+        """Состояние TCP сервера для потока событий"""
+        if not self.tcp_server:
+            tcp_config = self.config_manager.get('modbus_tcp', {})
+            return {'running': False, 'host': tcp_config.get('host'), 'port': tcp_config.get('port')}
+        return {'running': self.tcp_server.running, 'host': self.tcp_server.host, 'port': self.tcp_server.port}
+
+    def _tcp_admission_config(self) -> dict:
+        """Лимиты соединений и клиентов Modbus TCP сервера из конфигурации"""
+        tcp_config = self.config_manager.get('modbus_tcp', {})
+        return {
+            "max_connections": tcp_config.get('max_connections', 10),
+            "max_connections_per_client": tcp_config.get('max_connections_per_client', 0),
+            "rate_limit": tcp_config.get('rate_limit', 0),
+            "rate_burst": tcp_config.get('rate_burst', 0),
+            "idle_timeout": tcp_config.get('idle_timeout', 0),
+            "max_pending_bytes": tcp_config.get('max_pending_bytes', 65536),
+            "max_pipeline": tcp_config.get('max_pipeline', 16)
+        }
+
+    def _create_rtu_master(self, port: str, baudrate: int = 9600, timeout: int = 1):
+        """Создать RTU мастер с учетом настроек кэша и режима (потоковый или asyncio)"""
+        cache_config = self.config_manager.get('modbus_rtu.cache', {})
+        cache = None
+        if cache_config.get('enabled'):
+            cache = RegisterCache(
+                ttl=cache_config.get('ttl'),
+                max_bytes=cache_config.get('max_bytes', 1024 * 1024)
+            )
+        health_config = self.config_manager.get('modbus_rtu.health', {})
+        health = SlaveHealthTracker(
+            base_timeout=timeout,
+            min_timeout=health_config.get('min_timeout', 0.05),
+            timeout_multiplier=health_config.get('timeout_multiplier', 3.0),
+            failure_threshold=health_config.get('failure_threshold', 3),
+            backoff_initial=health_config.get('backoff_initial', 5.0),
+            backoff_max=health_config.get('backoff_max', 300.0)
+        )
+        write_batch_window = self.config_manager.get('modbus_rtu.write_batch_window', 0.0)
+        discovery = self.config_manager.get('modbus_rtu.discovery', {})
+        if self.config_manager.get('modbus_rtu.async'):
+            # Объединение записей и обнаружение устройств есть только у потокового мастера
+            if write_batch_window:
+                logger.warning(f"modbus_rtu.write_batch_window is not supported in async mode, "
+                               f"writes on {port} are not batched")
+            if discovery:
+                logger.warning(f"modbus_rtu.discovery is not supported in async mode, "
+                               f"discovery API is not available on {port}")
+            master = AsyncModbusRTUMaster(port=port, baudrate=baudrate, timeout=timeout,
+                                          cache=cache, health=health)
+            return AsyncRTUMasterFacade(master, self.event_loop)
+        return ModbusRTUMaster(
+            port=port, baudrate=baudrate, timeout=timeout, cache=cache, health=health,
+            write_batch_window=write_batch_window,
+            discovery=discovery
+        )
+
+    # Система и конфигурация
+
+    def system_status(self) -> Dict[str, Any]:
+        """Статус RTU, TCP, опроса и имя хоста"""
+        return {
+            'rtu': self.rtu_status() if self.rtu_master else None,
+            'tcp': self.tcp_status() if self.tcp_server else None,
+            'poller': _pick(self.poller.get_status(), POLLER_STATE_FIELDS) if self.poller else None,
+            'hostname': self.network_manager.get_hostname()
+        }
+
+    def hostname_get(self) -> Dict[str, Any]:
+        return {'hostname': self.network_manager.get_hostname()}
+
+    def hostname_set(self, hostname: str) -> Dict[str, Any]:
+        success = self.network_manager.set_hostname(hostname)
+        if success:
+            self.states.invalidate('system')
+        return {'success': success}
+
+    def config_get(self) -> Dict[str, Any]:
+        return self.config_manager.get_all()
+
+    def config_update(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Обновить конфигурацию и применить изменения устройств без перезапуска"""
+        success = self.config_manager.update(data)
+        if success:
+            self.states.invalidate('config')
+        if success and 'devices' in data:
+            self.rtu_buses.load_routes(self.config_manager.get('devices', []))
+            if self.poller:
+                self.poller.load_devices(self.config_manager.get('devices', []))
+                points = self.poller.points
+                self.events.forget(lambda key: key[0] != TOPIC_VALUES or (key[1], key[2]) in points)
+        if success and self.gateway and ('devices' in data or 'modbus_tcp' in data):
+            # Контексты шлюза обновляются на работающем сервере без перезапуска
+            self.gateway.load_units(self.config_manager.get('devices', []),
+                                    self.config_manager.get('modbus_tcp.units', {}))
+        return {'success': success}
+
+    # Modbus RTU
+
+    def rtu_status(self, bus: Optional[str] = None) -> Dict[str, Any]:
+        """Состояние линии без счетчиков: подключение, порт и состояние автомата защиты slave"""
+        master = self.rtu_buses.get(bus)
+        if master:
+            status = master.get_status()
+            state = _pick(status, RTU_STATE_FIELDS)
+            state['slaves'] = {slave_id: health['state'] for slave_id, health in status.get('slaves', {}).items()}
+            return state
+        return {'error': 'RTU not initialized'}
+
+    def rtu_stats(self, bus: Optional[str] = None) -> Dict[str, Any]:
+        """Полный статус линии со счетчиками очереди, объединения, кэша и времени отклика"""
+        master = self.rtu_buses.get(bus)
+        if master:
+            return master.get_status()
+        return {'error': 'RTU not initialized'}
+
+    def buses_status(self) -> Dict[str, Any]:
+        status = self.rtu_buses.get_status()
+        if self.reconnect_supervisor:
+            status['reconnect'] = self.reconnect_supervisor.get_status()
+        return status
+
+    def rtu_connect(self, port: str, baudrate: int = 9600, bus: Optional[str] = None) -> Dict[str, Any]:
+        """Подключить (или переподключить) линию к порту"""
+        try:
+            bus = bus or self.rtu_buses.default_bus or DEFAULT_BUS
+            old_master = self.rtu_buses.get(bus)
+            if old_master:
+                old_master.disconnect()
+
+            master = self._create_rtu_master(port=port, baudrate=baudrate)
+            success = master.connect()
+            self.rtu_buses.add_bus(bus, master)
+            self.rtu_master = self.rtu_buses.get()
+            self.states.invalidate('rtu', 'system')
+            return {'success': success}
+        except Exception as e:
+            logger.error(f"Error connecting to RTU: {e}")
+            return {'success': False, 'error': str(e)}
+
+    def rtu_disconnect(self, bus: Optional[str] = None) -> Dict[str, Any]:
+        master = self.rtu_buses.get(bus)
+        if master:
+            master.disconnect()
+            self.states.invalidate('rtu', 'system')
+            return {'success': True}
+        return {'success': False, 'error': 'RTU not initialized'}
+
+    def _discovery_master(self, bus: Optional[str]):
+        master = self.rtu_buses.get(bus)
+        if not master or not hasattr(master, 'discovery'):
+            return None
+        return master
+
+    def discovery_status(self, bus: Optional[str] = None) -> Dict[str, Any]:
+        master = self._discovery_master(bus)
+        if not master:
+            return {'success': False, 'error': 'Discovery not available'}
+        return {'success': True, **master.discovery.get_status()}
+
+    def discovery_start(self, bus: Optional[str] = None, first: int = 1, last: int = 247,
+                        mode: str = 'full') -> Dict[str, Any]:
+        master = self._discovery_master(bus)
+        if not master:
+            return {'success': False, 'error': 'Discovery not available'}
+        if not master.connected:
+            return {'success': False, 'error': 'Not connected'}
+        if mode not in ('full', 'quick'):
+            return {'success': False, 'error': f'Unknown mode: {mode}'}
+        if not master.discovery.start(first=first, last=last, mode=mode):
+            return {'success': False, 'error': 'Discovery already running'}
+        return {'success': True, **master.discovery.get_status()}
+
+    def discovery_cancel(self, bus: Optional[str] = None) -> Dict[str, Any]:
+        master = self._discovery_master(bus)
+        if not master:
+            return {'success': False, 'error': 'Discovery not available'}
+        master.discovery.cancel()
+        return {'success': True}
+
+    def rtu_read(self, slave_id: int, read_type: str, start_addr: int, quantity: int,
+                 encoding: str = 'list', bus: Optional[str] = None) -> Dict[str, Any]:
+        """Чтение: read_type - coils, discrete_inputs, holding_registers, input_registers"""
+        try:
+            if encoding not in ENCODINGS:
+                return {'success': False, 'error': 'Unknown encoding'}
+
+            master = self.rtu_buses.resolve(slave_id, bus)
+            if not master:
+                return {'success': False, 'error': 'RTU not initialized'}
+
+            if read_type == 'coils':
+                result = master.read_coils(slave_id, start_addr, quantity)
+            elif read_type == 'discrete_inputs':
+                result = master.read_discrete_inputs(slave_id, start_addr, quantity)
+            elif read_type == 'holding_registers':
+                result = master.read_holding_registers(slave_id, start_addr, quantity)
+            elif read_type == 'input_registers':
+                result = master.read_input_registers(slave_id, start_addr, quantity)
+            else:
+                return {'success': False, 'error': 'Unknown read type'}
+
+            if encoding != 'list' and result.get('success'):
+                result = dict(result, encoding=encoding, data=encode_data(read_type, result['data'], encoding))
+            return result
+        except Exception as e:
+            logger.error(f"Error reading from RTU: {e}")
+            return {'success': False, 'error': str(e)}
+
+    def rtu_write(self, slave_id: int, write_type: str, addr: int, value: Any,
+                  bus: Optional[str] = None) -> Dict[str, Any]:
+        """Запись: write_type - coil, register, coils, registers"""
+        try:
+            master = self.rtu_buses.resolve(slave_id, bus)
+            if not master:
+                return {'success': False, 'error': 'RTU not initialized'}
+
+            if write_type == 'coil':
+                return master.write_coil(slave_id, addr, value)
+            if write_type == 'register':
+                return master.write_register(slave_id, addr, value)
+            if write_type == 'coils':
+                return master.write_coils(slave_id, addr, value)
+            if write_type == 'registers':
+                return master.write_registers(slave_id, addr, value)
+            return {'success': False, 'error': 'Unknown write type'}
+        except Exception as e:
+            logger.error(f"Error writing to RTU: {e}")
+            return {'success': False, 'error': str(e)}
+
+    def rtu_batch(self, operations: List[Dict[str, Any]], timeout: Optional[float] = None,
+                  merge: bool = True) -> Dict[str, Any]:
+        """Пакет операций (см. app.modbus.batch.run_batch)"""
+        try:
+            if not isinstance(operations, list):
+                return {'success': False, 'error': 'operations must be a list'}
+            if not self.rtu_buses:
+                return {'success': False, 'error': 'RTU not initialized'}
+
+            poll_config = self.config_manager.get('polling', {})
+            return run_batch(
+                self.rtu_buses, operations,
+                timeout=timeout,
+                merge=merge,
+                max_gap=poll_config.get('max_gap', 8),
+                max_bit_gap=poll_config.get('max_bit_gap', 32)
+            )
+        except Exception as e:
+            logger.error(f"Error executing RTU batch: {e}")
+            return {'success': False, 'error': str(e)}
+
+    # Фоновый опрос
+
+    def poll_status(self) -> Dict[str, Any]:
+        if self.poller:
+            return self.poller.get_status()
+        return {'error': 'Poller not initialized'}
+
+    def poll_snapshot(self) -> Dict[str, Any]:
+        if self.poller:
+            return {'success': True, 'devices': self.poller.get_snapshot()}
+        return {'success': False, 'error': 'Poller not initialized'}
+
+    def poll_plan(self) -> Dict[str, Any]:
+        if self.poller:
+            return {'success': True, 'plan': self.poller.get_plan()}
+        return {'success': False, 'error': 'Poller not initialized'}
+
+    def device_values(self, device_id: int) -> Dict[str, Any]:
+        """Значения устройства; not_found - устройства нет в конфигурации"""
+        if not self.poller:
+            return {'success': False, 'error': 'Poller not initialized'}
+        device = self.poller.get_device_values(device_id)
+        if device is None:
+            return {'success': False, 'error': f'Device {device_id} not found', 'not_found': True}
+        return {'success': True, 'device': device}
+
+    # Modbus TCP
+
+    def tcp_status(self) -> Dict[str, Any]:
+        """Состояние TCP сервера без счетчиков: адрес, работа и таблица unit id"""
+        if self.tcp_server:
+            return _pick(self.tcp_server.get_status(), TCP_STATE_FIELDS)
+        return {'error': 'TCP server not initialized'}
+
+    def tcp_stats(self) -> Dict[str, Any]:
+        """Полный статус TCP сервера со счетчиками клиентов и памятью хранилища"""
+        if self.tcp_server:
+            return self.tcp_server.get_status()
+        return {'error': 'TCP server not initialized'}
+
+    def tcp_start(self, host: str = '0.0.0.0', port: int = 5020) -> Dict[str, Any]:
+        """Перезапустить TCP сервер на новом адресе"""
+        try:
+            if self.tcp_server:
+                self.tcp_server.stop()
+
+            self.tcp_server = ModbusTCPServer(host=host, port=port, context=self.gateway,
+                                              admission=self._tcp_admission_config(),
+                                              workers=self.config_manager.get('modbus_tcp.workers', 8))
+            started = self.tcp_server.start()
+            self.states.invalidate('tcp', 'system')
+            if started:
+                return {'success': True}
+            return {'success': False, 'error': self.tcp_server.error}
+        except Exception as e:
+            logger.error(f"Error starting TCP server: {e}")
+            return {'success': False, 'error': str(e)}
+
+    def tcp_stop(self) -> Dict[str, Any]:
+        if self.tcp_server:
+            self.tcp_server.stop()
+            self.states.invalidate('tcp', 'system')
+            return {'success': True}
+        return {'success': False, 'error': 'TCP server not initialized'}
+
+    # Поток событий
+
+    def events_poll(self, token: Optional[str] = None, topics: Optional[List[str]] = None,
+                    devices: Optional[List] = None, points: Optional[List[str]] = None,
+                    timeout: float = 0.0) -> Dict[str, Any]:
+        """Изменения после токена (ожидание не дольше timeout секунд)"""
+        match = subscription_filter(topics, devices, points)
+        token, items = self.events.poll(token, match, min(timeout, MAX_WAIT))
+        return {'success': True, 'token': token, 'items': items}
+
+    # Версии состояния
+
+    def _state(self, name: str):
+        state = self.states.get(name)
+        if state is None and name.startswith('rtu:') and name[4:] in self.rtu_buses.buses:
+            bus = name[4:]
+            state = self.states.register(name, lambda: self.rtu_status(bus))
+        return state
+
+    def state_get(self, name: str, etags: Optional[List[str]] = None, wait: float = 0.0) -> Dict[str, Any]:
+        """
+        Версионированное состояние домена: config, system, rtu, rtu:<линия>, tcp
+
+        Args:
+            etags: ETag версий, которые уже есть у клиента (If-None-Match)
+            wait: Ждать новой версии до wait секунд (long-poll), если версия клиента актуальна
+
+        Returns:
+            {"etag", "version", "body"} - body уже сериализован в JSON;
+            {"etag", "version", "not_modified": True} - версия клиента актуальна
+        """
+        state = self._state(name)
+        if state is None:
+            return {'success': False, 'error': f'Unknown state: {name}'}
+        etags = etags or []
+        if wait and etags:
+            etag, version, body = state.wait(etags, min(wait, MAX_WAIT))
+        else:
+            etag, version, body = state.current()
+        if etag in etags:
+            return {'etag': etag, 'version': version, 'not_modified': True}
+        return {'etag': etag, 'version': version, 'body': body}
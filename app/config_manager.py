@@ -26,7 +26,19 @@ class ConfigManager:
             "enabled": True,
             "host": "0.0.0.0",
             "port": 5020,
-            "max_connections": 10
+            "max_connections": 10,
+            "max_connections_per_client": 4,
+            "rate_limit": 50,
+            "rate_burst": 100,
+            "idle_timeout": 300,
+            "max_pending_bytes": 65536,
+            "max_pipeline": 16,
+            "workers": 8,
+            "units": {},
+            "datastore": {
+                "page_size": 256,
+                "strict": True
+            }
         },
         "modbus_rtu": {
             "enabled": True,
@@ -34,7 +46,57 @@ class ConfigManager:
             "baudrate": 9600,
             "timeout": 1,
             "auto_reconnect": True,
-            "reconnect_interval": 5
+            "reconnect_interval": 5,
+            "reconnect_max_interval": 60,
+            "discovery": {
+                "probe_timeout": 0.1,
+                "probe_function": "holding_registers",
+                "probe_address": 0
+            },
+            "async": False,
+            "write_batch_window": 0.0,
+            "health": {
+                "min_timeout": 0.05,
+                "timeout_multiplier": 3.0,
+                "failure_threshold": 3,
+                "backoff_initial": 5.0,
+                "backoff_max": 300.0
+            },
+            "cache": {
+                "enabled": False,
+                "ttl": {
+                    "coils": 0.5,
+                    "discrete_inputs": 0.5,
+                    "holding_registers": 1.0,
+                    "input_registers": 0.5
+                },
+                "max_bytes": 1048576
+            }
+        },
+        "polling": {
+            "enabled": True,
+            "default_interval": 1.0,
+            "stale_factor": 3,
+            "max_gap": 8,
+            "max_bit_gap": 32
+        },
+        "events": {
+            "status_interval": 1.0,
+            "keepalive": 15
+        },
+        "state": {
+            "refresh_interval": 1.0
+        },
+        "http": {
+            "json_backend": "auto",
+            "compress_min_size": 1024,
+            "compress_level": 1,
+            "request_timeout": 10.0,
+            "max_request_timeout": 60.0
+        },
+        "ipc": {
+            "socket": "/tmp/smarthome-bus.sock",
+            "timeout": 30
         },
         "devices": [],
         "logging": {
@@ -52,7 +114,8 @@ class ConfigManager:
         """
         self.config_file = config_file
         self.config = self.DEFAULT_CONFIG.copy()
-        self.lock = threading.Lock()
+        # update() сохраняет файл, удерживая блокировку
+        self.lock = threading.RLock()
         self.load()
     
     def load(self) -> bool:
@@ -0,0 +1,262 @@
+"""
+Event Stream - рассылка изменений значений и статуса клиентам (Server-Sent Events)
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+TOPIC_VALUES = 'values'
+TOPIC_STATUS = 'status'
+TOPICS = (TOPIC_VALUES, TOPIC_STATUS)
+
+
+class EventHub:
+    """
+    Последнее состояние каждого ключа с номером изменения
+
+    Каждая публикация получает возрастающий номер (seq). Подписчик помнит номер
+    последнего полученного изменения и при следующем чтении получает только
+    ключи, изменившиеся после него, - каждый ключ один раз, с последним значением.
+    Так медленный клиент не копит очередь: промежуточные значения схлопываются.
+    Токен возобновления - epoch и seq; после перезапуска сервера (другой epoch)
+    клиент получает полное состояние.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.entries: "OrderedDict[tuple, tuple]" = OrderedDict()    # key -> (seq, data), по возрастанию seq
+        self.sources: Dict[tuple, Callable[[], Any]] = {}
+        self.cond = threading.Condition()
+        self.running = False
+        self.watch_thread = None
+        self._stop_event = threading.Event()
+
+    def publish(self, key: tuple, data: Any, only_changed: bool = True) -> bool:
+        """
+        Опубликовать значение ключа (topic, ...)
+
+        Returns:
+            True - значение изменилось и разослано подписчикам
+        """
+        with self.cond:
+            current = self.entries.get(key)
+            if only_changed and current is not None and current[1] == data:
+                return False
+            self.seq += 1
+            self.entries[key] = (self.seq, data)
+            self.entries.move_to_end(key)
+            self.cond.notify_all()
+        return True
+
+    def publish_values(self, changes: List[Dict[str, Any]]):
+        """Слушатель изменений опросчика (ModbusPoller.add_change_listener)"""
+        for change in changes:
+            self.publish((TOPIC_VALUES, change['device_id'], change['name']), {
+                "value": change['value'],
+                "quality": change['quality'],
+                "timestamp": change['timestamp']
+            })
+
+    def forget(self, keep: Callable[[tuple], bool]):
+        """
+        Удалить ключи (например, точки удаленных устройств)
+
+        Новый epoch заставляет клиентов и зеркала запросить полное состояние,
+        иначе они не узнают об удалении. Если удалять нечего, epoch сохраняется:
+        изменение конфигурации без удаленных точек не сбрасывает клиентов.
+        """
+        with self.cond:
+            removed = [k for k in self.entries if not keep(k)]
+            if not removed:
+                return
+            for key in removed:
+                del self.entries[key]
+            self.epoch = uuid.uuid4().hex[:8]
+            self.cond.notify_all()
+
+    def apply(self, token: str, items: List[tuple]):
+        """
+        Применить изменения, полученные от EventHub другого процесса (зеркало)
+
+        Зеркало принимает epoch и seq источника, поэтому токены возобновления
+        действуют в любом процессе веб-сервера.
+        """
+        epoch, _, seq = token.rpartition('-')
+        with self.cond:
+            if epoch != self.epoch:
+                self.epoch = epoch
+                self.entries.clear()
+            self.seq = int(seq)
+            for key, data in items:
+                key = tuple(key)
+                self.entries[key] = (self.seq, data)
+                self.entries.move_to_end(key)
+            self.cond.notify_all()
+
+    def token(self, seq: Optional[int] = None) -> str:
+        return f"{self.epoch}-{self.seq if seq is None else seq}"
+
+    def parse_token(self, token: Optional[str]) -> int:
+        """Номер изменения из токена возобновления (0 - полное состояние)"""
+        if not token:
+            return 0
+        epoch, _, seq = token.rpartition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return 0
+        return min(int(seq), self.seq)
+
+    def changes_since(self, cursor: int, match: Callable[[tuple], bool]) -> tuple:
+        """
+        Изменения после номера cursor
+
+        Returns:
+            (новый cursor, [(key, data)])
+        """
+        with self.cond:
+            return self._collect(cursor, match)
+
+    def _collect(self, cursor: int, match: Callable[[tuple], bool]) -> tuple:
+        items = []
+        # Ключи упорядочены по seq - идем с конца до первого уже отправленного
+        for key in reversed(self.entries):
+            seq, data = self.entries[key]
+            if seq <= cursor:
+                break
+            if match(key):
+                items.append((key, data))
+        items.reverse()
+        return self.seq, items
+
+    def poll(self, token: Optional[str], match: Callable[[tuple], bool], timeout: float = 0.0) -> tuple:
+        """
+        Изменения после токена возобновления (ожидание не дольше timeout)
+
+        Returns:
+            (новый токен, [(key, data)]); при смене epoch - полное состояние
+        """
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            epoch = self.epoch
+            cursor = self.parse_token(token)
+            while True:
+                if self.epoch != epoch:
+                    epoch, cursor = self.epoch, 0
+                cursor, items = self._collect(cursor, match)
+                remaining = deadline - time.monotonic()
+                if items or remaining <= 0:
+                    return self.token(cursor), items
+                self.cond.wait(remaining)
+
+    def add_source(self, name: str, fn: Callable[[], Any]):
+        """Периодически опрашиваемый источник статуса (публикуется только при изменении)"""
+        self.sources[(TOPIC_STATUS, name)] = fn
+
+    def start(self, interval: float = 1.0):
+        """Запустить опрос источников статуса"""
+        if self.running:
+            return
+        self.running = True
+        self._stop_event.clear()
+        self.watch_thread = threading.Thread(target=self._watch, args=(interval,),
+                                             name='event-status', daemon=True)
+        self.watch_thread.start()
+
+    def stop(self):
+        self.running = False
+        self._stop_event.set()
+        if self.watch_thread and self.watch_thread is not threading.current_thread():
+            self.watch_thread.join(timeout=5)
+        self.watch_thread = None
+
+    def _watch(self, interval: float):
+        while not self._stop_event.is_set():
+            self.poll_sources()
+            self._stop_event.wait(interval)
+
+    def poll_sources(self):
+        for key, fn in list(self.sources.items()):
+            try:
+                self.publish(key, fn())
+            except Exception as e:
+                logger.error(f"Status source {key[1]} error: {e}")
+
+    def get_status(self) -> Dict[str, Any]:
+        with self.cond:
+            return {
+                "token": self.token(),
+                "keys": len(self.entries)
+            }
+
+
+def subscription_filter(topics: Optional[Iterable[str]] = None,
+                        devices: Optional[Iterable] = None,
+                        points: Optional[Iterable[str]] = None) -> Callable[[tuple], bool]:
+    """
+    Фильтр подписки
+
+    Args:
+        topics: values и/или status (по умолчанию все)
+        devices: id устройств (по умолчанию все)
+        points: имена точек (по умолчанию все)
+    """
+    topics = set(topics or TOPICS)
+    devices = {str(d) for d in devices} if devices else None
+    points = set(points) if points else None
+
+    def match(key: tuple) -> bool:
+        if key[0] not in topics:
+            return False
+        if key[0] == TOPIC_VALUES:
+            if devices is not None and str(key[1]) not in devices:
+                return False
+            if points is not None and key[2] not in points:
+                return False
+        return True
+    return match
+
+
+def _message(token: str, items: List[tuple]) -> str:
+    """Одно SSE сообщение на пачку изменений: values и status отдельными событиями"""
+    values: Dict[str, Dict[str, Any]] = {}
+    status: Dict[str, Any] = {}
+    for key, data in items:
+        if key[0] == TOPIC_VALUES:
+            values.setdefault(str(key[1]), {})[key[2]] = data
+        else:
+            status[key[1]] = data
+    lines = []
+    if values:
+        lines.append(f"id: {token}\nevent: {TOPIC_VALUES}\ndata: {json.dumps({'devices': values})}\n\n")
+    if status:
+        lines.append(f"id: {token}\nevent: {TOPIC_STATUS}\ndata: {json.dumps(status)}\n\n")
+    return ''.join(lines)
+
+
+def sse_stream(hub: EventHub, match: Callable[[tuple], bool], last_event_id: Optional[str] = None,
+               min_interval: float = 0.0, keepalive: float = 15.0) -> Iterator[str]:
+    """
+    Генератор SSE потока для Flask Response
+
+    Первое сообщение - состояние всех подходящих ключей (или изменения после
+    last_event_id при переподключении). Далее - только изменения. min_interval
+    задает минимальный интервал между сообщениями: изменения за это время
+    объединяются в одно сообщение.
+    """
+    yield "retry: 3000\n\n"
+    token, items = hub.poll(last_event_id, match)
+    yield _message(token, items) or f"id: {token}\n: synced\n\n"
+    while True:
+        if min_interval:
+            time.sleep(min_interval)
+        token, items = hub.poll(token, match, keepalive)
+        if items:
+            yield _message(token, items)
+        else:
+            yield ": keepalive\n\n"
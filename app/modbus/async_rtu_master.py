@@ -0,0 +1,550 @@
+"""
+Async Modbus RTU Master - asyncio вариант RTU мастера и синхронный фасад для Flask
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import List, Dict, Any, Optional
+from pymodbus.client import AsyncModbusSerialClient
+from pymodbus.exceptions import ConnectionException
+from app.modbus.register_cache import RegisterCache
+from app.modbus.slave_health import SlaveHealthTracker
+from app.modbus.bus_scheduler import (
+    BusPriority, DEFAULT_MAX_WAIT, select_queue, current_deadline, current_priority, remaining_time,
+    DEADLINE_EXCEEDED, OUTCOME_UNKNOWN
+)
+
+logger = logging.getLogger(__name__)
+
+BIT_FUNCTIONS = ('coils', 'discrete_inputs')
+
+SLAVE_UNAVAILABLE = "Slave {} is unavailable (circuit open)"
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+class _PriorityLock:
+    """
+    Блокировка шины для asyncio с классами приоритета BusPriority
+
+    Освободившаяся шина передается по тому же правилу, что и в BusScheduler
+    (select_queue): записи первыми, среди остальных - самый важный класс или
+    заявка, ждущая дольше DEFAULT_MAX_WAIT своего класса.
+    """
+
+    def __init__(self):
+        self.locked = False
+        self.queues = {priority: deque() for priority in BusPriority.NAMES}
+
+    async def acquire(self, priority: int):
+        if not self.locked and not any(self.queues.values()):
+            self.locked = True
+            return
+        future = asyncio.get_running_loop().create_future()
+        self.queues[priority].append((time.monotonic(), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Шина уже передана этой заявке - отдать следующей
+                self.release()
+            raise
+
+    def release(self):
+        for queue in self.queues.values():
+            # Отмененные ожидания (истек крайний срок) пропускаются
+            while queue and queue[0][1].done():
+                queue.popleft()
+        chosen = select_queue(self.queues, DEFAULT_MAX_WAIT, time.monotonic(), lambda item: item[0])
+        if chosen is None:
+            self.locked = False
+        else:
+            chosen.popleft()[1].set_result(True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Глубина очередей по классам (вызывается и из других потоков)"""
+        return {name: {"queued": len(self.queues[priority])}
+                for priority, name in BusPriority.NAMES.items()}
+
+
+class AsyncModbusRTUMaster:
+    """
+    Клиент Modbus RTU на asyncio: ожидающие операции не занимают потоки ОС
+
+    Транзакции получают шину в порядке классов приоритета, недоступные slave
+    отсекаются автоматом защиты SlaveHealthTracker, потеря связи с адаптером
+    сбрасывает connected для супервизора переподключения. Объединение записей
+    и обнаружение устройств есть только у потокового ModbusRTUMaster.
+    """
+
+    def __init__(self, port: str, baudrate: int = 9600, timeout: int = 1,
+                 cache: Optional[RegisterCache] = None,
+                 health: Optional[SlaveHealthTracker] = None):
+        """
+        Инициализация асинхронного Modbus RTU мастера
+
+        Args:
+            port: Последовательный порт (/dev/ttyUSB0, COM3 и т.д.)
+            baudrate: Скорость передачи
+            timeout: Таймаут ответа в секундах
+            cache: Кэш результатов чтения (None - кэширование выключено)
+            health: Трекер времени отклика и доступности slave устройств
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.client = None
+        self.connected = False
+        self.keep_connected = False
+        self.cache = cache
+        self.health = health or SlaveHealthTracker(base_timeout=timeout)
+        self._lock: Optional[_PriorityLock] = None
+        self._inflight: Dict[tuple, List[tuple]] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def _bus_lock(self) -> _PriorityLock:
+        # Создается лениво, чтобы привязаться к циклу событий, в котором работает мастер
+        if self._lock is None:
+            self._lock = _PriorityLock()
+        return self._lock
+
+    def _link_lost(self, error: Exception):
+        """Отметить потерю связи с адаптером (порт закрыт или устройство пропало)"""
+        if self.connected:
+            logger.warning(f"Lost connection to Modbus RTU (async) on {self.port}: {error}")
+        self.connected = False
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    async def connect(self) -> bool:
+        """Подключение к RTU устройствам"""
+        self.keep_connected = True
+        try:
+            self.client = AsyncModbusSerialClient(
+                port=self.port,
+                baudrate=self.baudrate,
+                timeout=self.timeout
+            )
+            await self.client.connect()
+            self.connected = bool(self.client.connected)
+            if self.connected:
+                logger.info(f"Connected to Modbus RTU (async) on {self.port} at {self.baudrate} baud")
+            else:
+                logger.error(f"Failed to connect to {self.port}")
+            return self.connected
+        except Exception as e:
+            logger.error(f"Error connecting to Modbus RTU: {e}")
+            return False
+
+    async def reconnect(self) -> bool:
+        """Переоткрыть порт после потери связи (между транзакциями, а не посреди начатой)"""
+        self.connected = False
+        lock = self._bus_lock()
+        await lock.acquire(BusPriority.WRITE)
+        try:
+            if self.client:
+                try:
+                    await self.client.close()
+                except Exception as e:
+                    logger.debug(f"Error closing async RTU client on {self.port}: {e}")
+            return await self.connect()
+        finally:
+            lock.release()
+
+    async def disconnect(self):
+        """Отключение от RTU устройств"""
+        self.keep_connected = False
+        if self.client:
+            await self.client.close()
+            self.connected = False
+            if self.cache is not None:
+                self.cache.invalidate()
+            logger.info("Disconnected from Modbus RTU (async)")
+
+    async def read_coils(self, slave_id: int, start_addr: int, quantity: int,
+                         use_cache: bool = True, priority: int = BusPriority.READ,
+                         deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Чтение дискретных выходов (катушек)"""
+        return await self._read('coils', slave_id, start_addr, quantity, use_cache,
+                                priority, deadline)
+
+    async def read_discrete_inputs(self, slave_id: int, start_addr: int, quantity: int,
+                                   use_cache: bool = True, priority: int = BusPriority.READ,
+                                   deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Чтение дискретных входов"""
+        return await self._read('discrete_inputs', slave_id, start_addr, quantity, use_cache,
+                                priority, deadline)
+
+    async def read_holding_registers(self, slave_id: int, start_addr: int, quantity: int,
+                                     use_cache: bool = True, priority: int = BusPriority.READ,
+                                     deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Чтение регистров удержания"""
+        return await self._read('holding_registers', slave_id, start_addr, quantity, use_cache,
+                                priority, deadline)
+
+    async def read_input_registers(self, slave_id: int, start_addr: int, quantity: int,
+                                   use_cache: bool = True, priority: int = BusPriority.READ,
+                                   deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Чтение входных регистров"""
+        return await self._read('input_registers', slave_id, start_addr, quantity, use_cache,
+                                priority, deadline)
+
+    async def write_coil(self, slave_id: int, addr: int, value: bool,
+                         priority: int = BusPriority.WRITE,
+                         deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Запись одной катушки"""
+        return await self._write('coil', slave_id, addr, value, priority, deadline)
+
+    async def write_register(self, slave_id: int, addr: int, value: int,
+                             priority: int = BusPriority.WRITE,
+                             deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Запись одного регистра"""
+        return await self._write('register', slave_id, addr, value, priority, deadline)
+
+    async def write_coils(self, slave_id: int, start_addr: int, values: List[bool],
+                          priority: int = BusPriority.WRITE,
+                          deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Запись нескольких катушек"""
+        return await self._write('coils', slave_id, start_addr, values, priority, deadline)
+
+    async def write_registers(self, slave_id: int, start_addr: int, values: List[int],
+                              priority: int = BusPriority.WRITE,
+                              deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Запись нескольких регистров"""
+        return await self._write('registers', slave_id, start_addr, values, priority, deadline)
+
+    async def _read(self, function: str, slave_id: int, start_addr: int, quantity: int,
+                    use_cache: bool = True, priority: int = BusPriority.READ,
+                    deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Чтение через кэш, с объединением одновременных одинаковых запросов
+
+        Запрос присоединяется только к чтению того же или более важного класса
+        с тем же или более поздним крайним сроком: иначе он ждал бы шину в очереди
+        менее важного или получил бы чужой Deadline exceeded раньше своего срока.
+        """
+        if not self.connected:
+            return {"success": False, "error": "Not connected"}
+        if use_cache and self.cache is not None:
+            data = self.cache.get(slave_id, function, start_addr, quantity)
+            if data is not None:
+                return {"success": True, "data": data}
+
+        key = (slave_id, function)
+        for flight_start, flight_quantity, flight_priority, flight_deadline, future in self._inflight.get(key, ()):
+            if (flight_start <= start_addr and start_addr + quantity <= flight_start + flight_quantity
+                    and flight_priority <= priority
+                    and (flight_deadline is None or (deadline is not None and flight_deadline >= deadline))):
+                self.shared += 1
+                try:
+                    result = dict(await asyncio.wait_for(asyncio.shield(future), _remaining(deadline)))
+                except asyncio.TimeoutError:
+                    return {"success": False, "error": DEADLINE_EXCEEDED}
+                if result.get('data') is not None:
+                    offset = start_addr - flight_start
+                    result['data'] = list(result['data'][offset:offset + quantity])
+                return result
+
+        flight = (start_addr, quantity, priority, deadline, asyncio.get_running_loop().create_future())
+        self._inflight.setdefault(key, []).append(flight)
+        self.executed += 1
+        result = {"success": False, "error": "Read cancelled"}
+        try:
+            result = await self._do_read(function, slave_id, start_addr, quantity, priority, deadline)
+            return result
+        finally:
+            flights = self._inflight.get(key, [])
+            if flight in flights:
+                flights.remove(flight)
+            if not flights:
+                self._inflight.pop(key, None)
+            flight[4].set_result(result)
+
+    async def _do_read(self, function: str, slave_id: int, start_addr: int, quantity: int,
+                       priority: int = BusPriority.READ, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Транзакция чтения на шине"""
+        if self.health.is_open(slave_id):
+            return {"success": False, "error": SLAVE_UNAVAILABLE.format(slave_id)}
+        lock = self._bus_lock()
+        if not await self._acquire(lock, priority, deadline):
+            return {"success": False, "error": DEADLINE_EXCEEDED}
+        try:
+            if not self.connected:
+                return {"success": False, "error": "Not connected"}
+            if not self.health.allow(slave_id):
+                return {"success": False, "error": SLAVE_UNAVAILABLE.format(slave_id)}
+
+            result = await self._execute(slave_id, getattr(self.client, 'read_' + function), start_addr, quantity)
+            attr = 'bits' if function in BIT_FUNCTIONS else 'registers'
+            if hasattr(result, attr):
+                data = getattr(result, attr)[:quantity]
+                if self.cache is not None:
+                    self.cache.put(slave_id, function, start_addr, quantity, data)
+                return {"success": True, "data": data}
+            else:
+                return {"success": False, "error": str(result)}
+        except Exception as e:
+            logger.error(f"Error reading {function.replace('_', ' ')}: {e}")
+            return {"success": False, "error": str(e)}
+        finally:
+            lock.release()
+
+    async def _write(self, function: str, slave_id: int, addr: int, value: Any,
+                     priority: int = BusPriority.WRITE, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Транзакция записи на шине"""
+        if not self.connected:
+            return {"success": False, "error": "Not connected"}
+        if self.health.is_open(slave_id):
+            return {"success": False, "error": SLAVE_UNAVAILABLE.format(slave_id)}
+        lock = self._bus_lock()
+        if not await self._acquire(lock, priority, deadline):
+            return {"success": False, "error": DEADLINE_EXCEEDED}
+        try:
+            if not self.connected:
+                return {"success": False, "error": "Not connected"}
+            if not self.health.allow(slave_id):
+                return {"success": False, "error": SLAVE_UNAVAILABLE.format(slave_id)}
+
+            result = await self._execute(slave_id, getattr(self.client, 'write_' + function), addr, value)
+            if hasattr(result, 'function_code'):
+                if self.cache is not None:
+                    values = value if isinstance(value, (list, tuple)) else [value]
+                    self.cache.apply_write(slave_id, function, addr, values)
+                return {"success": True}
+            else:
+                return {"success": False, "error": str(result)}
+        except Exception as e:
+            logger.error(f"Error writing {function}: {e}")
+            return {"success": False, "error": str(e)}
+        finally:
+            lock.release()
+
+    @staticmethod
+    async def _acquire(lock: _PriorityLock, priority: int, deadline: Optional[float]) -> bool:
+        """
+        Дождаться шины не дольше крайнего срока
+
+        Срок ограничивает только ожидание: получившая шину транзакция доводится
+        до конца, как в BusScheduler.
+        """
+        if deadline is None:
+            await lock.acquire(priority)
+            return True
+        remaining = _remaining(deadline)
+        if remaining == 0:
+            return False
+        try:
+            await asyncio.wait_for(lock.acquire(priority), remaining)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def _execute(self, slave_id: int, call, *args):
+        """Транзакция с адаптивным таймаутом и учетом отклика slave"""
+        if hasattr(self.client, 'params'):
+            self.client.params.timeout = self.health.timeout_for(slave_id)
+        started = time.monotonic()
+        try:
+            result = await call(*args, slave=slave_id)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # Slave не ответил (asyncio.TimeoutError - подкласс OSError) или транзакция
+            # прервана фасадом после transaction_timeout
+            self.health.record_failure(slave_id)
+            raise
+        except (ConnectionException, OSError) as e:
+            self._link_lost(e)
+            self.health.release_probe(slave_id)
+            raise
+        except Exception:
+            self.health.record_failure(slave_id)
+            raise
+        if hasattr(result, 'function_code'):
+            self.health.record_success(slave_id, time.monotonic() - started)
+        else:
+            self.health.record_failure(slave_id)
+        return result
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получить статус соединения"""
+        status = {
+            "connected": self.connected,
+            "port": self.port,
+            "baudrate": self.baudrate,
+            "mode": "async",
+            "coalescing": {
+                "executed": self.executed,
+                "shared": self.shared
+            },
+            "queue": self._lock.get_stats() if self._lock is not None else {},
+            "slaves": self.health.get_status()
+        }
+        if self.cache is not None:
+            status["cache"] = self.cache.get_stats()
+        return status
+
+
+class EventLoopThread:
+    """Общий цикл событий asyncio в отдельном потоке"""
+
+    def __init__(self, name: str = 'modbus-asyncio'):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread = None
+        self._ready = threading.Event()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Запустить цикл событий (повторный вызов возвращает уже запущенный цикл)"""
+        if self.loop is not None and self.thread.is_alive():
+            return self.loop
+        self._ready.clear()
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+        self._ready.wait()
+        return self.loop
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """
+        Выполнить корутину в цикле и дождаться результата из другого потока
+
+        Raises:
+            concurrent.futures.TimeoutError: Корутина не завершилась за timeout
+                секунд (она отменяется)
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.start())
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise
+
+    def stop(self):
+        """Остановить цикл событий"""
+        if self.loop is not None and self.thread and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=5)
+        self.loop = None
+
+
+class AsyncRTUMasterFacade:
+    """
+    Синхронный фасад над AsyncModbusRTUMaster с тем же API, что и ModbusRTUMaster
+
+    Позволяет существующим маршрутам Flask работать с асинхронным мастером,
+    который выполняется в общем цикле событий.
+    """
+
+    def __init__(self, master: AsyncModbusRTUMaster, loop_thread: Optional[EventLoopThread] = None):
+        self.master = master
+        self.loop_thread = loop_thread or EventLoopThread()
+        self._owns_loop = loop_thread is None
+        # Начатая транзакция: ответ и до 3 повторов pymodbus (как у BusScheduler)
+        self.transaction_timeout = master.timeout * 4
+
+    def __getattr__(self, name):
+        # port, baudrate, timeout, connected, cache и т.д. берутся из мастера
+        return getattr(self.master, name)
+
+    def _call(self, coro) -> Any:
+        try:
+            return self.loop_thread.run(coro)
+        except Exception as e:
+            logger.error(f"Async RTU call failed: {e}")
+            return {"success": False, "error": str(e)}
+
+    def _transaction(self, coro) -> Dict[str, Any]:
+        """
+        Чтение или запись с крайним сроком bus_context()
+
+        Срок передается в корутину: транзакция, не получившая шину к сроку, не
+        выполняется (DEADLINE_EXCEEDED), начатая доводится до конца. Ее результат
+        ждется еще transaction_timeout секунд, затем корутина отменяется (OUTCOME_UNKNOWN).
+        """
+        remaining = remaining_time()
+        if remaining == 0:
+            coro.close()
+            return {"success": False, "error": DEADLINE_EXCEEDED}
+        timeout = None if remaining is None else remaining + self.transaction_timeout
+        try:
+            return self.loop_thread.run(coro, timeout)
+        except FutureTimeout:
+            return {"success": False, "error": OUTCOME_UNKNOWN}
+        except Exception as e:
+            logger.error(f"Async RTU call failed: {e}")
+            return {"success": False, "error": str(e)}
+
+    def connect(self) -> bool:
+        """Подключение к RTU устройствам"""
+        return bool(self._call(self.master.connect()))
+
+    def reconnect(self) -> bool:
+        """Переоткрыть порт после потери связи"""
+        return bool(self._call(self.master.reconnect()))
+
+    def disconnect(self):
+        """Отключение от RTU устройств"""
+        self._call(self.master.disconnect())
+        if self._owns_loop:
+            self.loop_thread.stop()
+
+    def read_coils(self, slave_id: int, start_addr: int, quantity: int,
+                   use_cache: bool = True) -> Dict[str, Any]:
+        """Чтение дискретных выходов (катушек)"""
+        return self._transaction(self.master.read_coils(
+            slave_id, start_addr, quantity, use_cache, current_priority(BusPriority.READ), current_deadline()))
+
+    def read_discrete_inputs(self, slave_id: int, start_addr: int, quantity: int,
+                             use_cache: bool = True) -> Dict[str, Any]:
+        """Чтение дискретных входов"""
+        return self._transaction(self.master.read_discrete_inputs(
+            slave_id, start_addr, quantity, use_cache, current_priority(BusPriority.READ), current_deadline()))
+
+    def read_holding_registers(self, slave_id: int, start_addr: int, quantity: int,
+                               use_cache: bool = True) -> Dict[str, Any]:
+        """Чтение регистров удержания"""
+        return self._transaction(self.master.read_holding_registers(
+            slave_id, start_addr, quantity, use_cache, current_priority(BusPriority.READ), current_deadline()))
+
+    def read_input_registers(self, slave_id: int, start_addr: int, quantity: int,
+                             use_cache: bool = True) -> Dict[str, Any]:
+        """Чтение входных регистров"""
+        return self._transaction(self.master.read_input_registers(
+            slave_id, start_addr, quantity, use_cache, current_priority(BusPriority.READ), current_deadline()))
+
+    def write_coil(self, slave_id: int, addr: int, value: bool) -> Dict[str, Any]:
+        """Запись одной катушки"""
+        return self._transaction(self.master.write_coil(
+            slave_id, addr, value, current_priority(BusPriority.WRITE), current_deadline()))
+
+    def write_register(self, slave_id: int, addr: int, value: int) -> Dict[str, Any]:
+        """Запись одного регистра"""
+        return self._transaction(self.master.write_register(
+            slave_id, addr, value, current_priority(BusPriority.WRITE), current_deadline()))
+
+    def write_coils(self, slave_id: int, start_addr: int, values: List[bool]) -> Dict[str, Any]:
+        """Запись нескольких катушек"""
+        return self._transaction(self.master.write_coils(
+            slave_id, start_addr, values, current_priority(BusPriority.WRITE), current_deadline()))
+
+    def write_registers(self, slave_id: int, start_addr: int, values: List[int]) -> Dict[str, Any]:
+        """Запись нескольких регистров"""
+        return self._transaction(self.master.write_registers(
+            slave_id, start_addr, values, current_priority(BusPriority.WRITE), current_deadline()))
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получить статус соединения"""
+        return self.master.get_status()
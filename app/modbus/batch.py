@@ -0,0 +1,333 @@
+"""
+Batch - пакет операций чтения и записи по нескольким slave устройствам и линиям
+"""
+import logging
+import time
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+from typing import Dict, Any, List, Optional
+from app.modbus.block_planner import plan_reads
+from app.modbus.bus_scheduler import (
+    BusPriority, bus_context, current_deadline, current_priority, DEADLINE_EXCEEDED
+)
+from app.modbus.payload import ENCODINGS, encode_data
+from app.modbus.write_batcher import MAX_WRITE_REGISTERS, MAX_WRITE_COILS
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_OPERATIONS = 256
+MAX_JOB_FRAMES = 16         # Транзакций в одной заявке шины: дольше шина не занята пакетом
+
+# Тип чтения API -> тип точки планировщика
+READ_TYPES = {
+    'coils': 'coil',
+    'discrete_inputs': 'discrete_input',
+    'holding_registers': 'holding_register',
+    'input_registers': 'input_register',
+}
+
+# Тип записи API -> (таблица, несколько значений)
+WRITE_TYPES = {
+    'coil': ('coil', False),
+    'coils': ('coil', True),
+    'register': ('register', False),
+    'registers': ('register', True),
+}
+
+WRITE_LIMITS = {
+    'coil': MAX_WRITE_COILS,
+    'register': MAX_WRITE_REGISTERS,
+}
+
+
+class _Read:
+    """Операция чтения пакета (точка для планировщика блоков)"""
+
+    def __init__(self, index: int, slave_id: int, read_type: str, address: int, count: int, encoding: str):
+        self.index = index
+        self.slave_id = slave_id
+        self.read_type = read_type
+        self.type = READ_TYPES[read_type]
+        self.address = address
+        self.count = count
+        self.encoding = encoding
+
+
+class _Write:
+    """Операция записи пакета"""
+
+    def __init__(self, index: int, slave_id: int, write_type: str, address: int, values: list):
+        self.index = index
+        self.slave_id = slave_id
+        self.write_type = write_type
+        self.table, self.multiple = WRITE_TYPES[write_type]
+        self.address = address
+        self.values = values
+
+
+class _Frame:
+    """Одна транзакция шины и операции пакета, которые она обслуживает"""
+
+    def __init__(self, function: str, slave_id: int, address: int, arg, operations: list):
+        self.function = function
+        self.slave_id = slave_id
+        self.address = address
+        self.arg = arg
+        self.operations = operations
+
+    def as_tuple(self) -> tuple:
+        return self.function, self.slave_id, self.address, self.arg
+
+
+def parse_operation(index: int, operation: Dict[str, Any]):
+    """
+    Разобрать операцию запроса
+
+    Чтение: {"slave_id", "type": coils|discrete_inputs|holding_registers|input_registers,
+             "start_addr", "quantity", "encoding"}
+    Запись: {"slave_id", "type": coil|register|coils|registers, "addr", "value"}
+
+    Raises:
+        ValueError: Операция задана неверно
+    """
+    if not isinstance(operation, dict):
+        raise ValueError("Operation must be an object")
+    slave_id = operation.get('slave_id')
+    op_type = operation.get('type')
+    if not isinstance(slave_id, int):
+        raise ValueError("slave_id is required")
+    if op_type in READ_TYPES:
+        start_addr, quantity = operation.get('start_addr'), operation.get('quantity')
+        if not isinstance(start_addr, int) or not isinstance(quantity, int) or quantity < 1:
+            raise ValueError("start_addr and quantity are required")
+        encoding = operation.get('encoding', 'list')
+        if encoding not in ENCODINGS:
+            raise ValueError("Unknown encoding")
+        return _Read(index, slave_id, op_type, start_addr, quantity, encoding)
+    if op_type in WRITE_TYPES:
+        addr, value = operation.get('addr'), operation.get('value')
+        if not isinstance(addr, int) or value is None:
+            raise ValueError("addr and value are required")
+        if WRITE_TYPES[op_type][1]:
+            if not isinstance(value, list) or not value:
+                raise ValueError("value must be a non-empty list")
+            values = list(value)
+        else:
+            values = [value]
+        return _Write(index, slave_id, op_type, addr, values)
+    raise ValueError("Unknown operation type")
+
+
+def _phases(operations: list) -> List[list]:
+    """Разбить операции на фазы: подряд идущие чтения или подряд идущие записи"""
+    phases = []
+    for operation in operations:
+        if phases and isinstance(phases[-1][0], type(operation)):
+            phases[-1].append(operation)
+        else:
+            phases.append([operation])
+    return phases
+
+
+def _read_frames(reads: List[_Read], merge: bool, max_gap: int, max_bit_gap: int) -> List[_Frame]:
+    if merge:
+        blocks = plan_reads(reads, max_gap=max_gap, max_bit_gap=max_bit_gap)
+        return [_Frame('read_' + block.items[0].read_type, block.slave_id, block.start,
+                       block.quantity, block.items) for block in blocks]
+    return [_Frame('read_' + r.read_type, r.slave_id, r.address, r.count, [r]) for r in reads]
+
+
+def _write_frames(writes: List[_Write], merge: bool) -> List[_Frame]:
+    if not merge:
+        return [_Frame('write_' + w.write_type, w.slave_id, w.address,
+                       w.values if w.multiple else w.values[0], [w]) for w in writes]
+
+    # Значения по адресам для каждого slave и таблицы (повторная запись адреса - последняя побеждает)
+    groups: Dict[tuple, Dict[int, Any]] = {}
+    owners: Dict[tuple, Dict[int, list]] = {}
+    for write in writes:
+        key = (write.slave_id, write.table)
+        values = groups.setdefault(key, {})
+        for offset, value in enumerate(write.values):
+            values[write.address + offset] = value
+            owners.setdefault(key, {}).setdefault(write.address + offset, []).append(write)
+
+    frames = []
+    for (slave_id, table), values in groups.items():
+        limit = WRITE_LIMITS[table]
+        run = []
+        for address in sorted(values) + [None]:
+            if run and (address is None or address != run[-1] + 1 or len(run) >= limit):
+                served = []
+                for item in run:
+                    for write in owners[(slave_id, table)][item]:
+                        if write not in served:
+                            served.append(write)
+                run_values = [values[item] for item in run]
+                if len(run) == 1 and not any(w.multiple for w in served):
+                    frames.append(_Frame('write_' + table, slave_id, run[0], run_values[0], served))
+                else:
+                    frames.append(_Frame('write_' + table + 's', slave_id, run[0], run_values, served))
+                run = []
+            if address is not None:
+                run.append(address)
+    return frames
+
+
+def _apply(frame: _Frame, result: Dict[str, Any], results: List[Optional[Dict[str, Any]]]):
+    """Разнести результат транзакции по операциям пакета"""
+    for operation in frame.operations:
+        if results[operation.index] is not None and not results[operation.index].get('success'):
+            # Операция, записанная несколькими транзакциями, неуспешна, если неуспешна любая
+            continue
+        if not result.get('success'):
+            results[operation.index] = {"success": False, "error": result.get('error')}
+        elif isinstance(operation, _Read):
+            offset = operation.address - frame.address
+            data = result['data'][offset:offset + operation.count]
+            if operation.encoding != 'list':
+                results[operation.index] = {"success": True, "encoding": operation.encoding,
+                                            "data": encode_data(operation.read_type, data, operation.encoding)}
+            else:
+                results[operation.index] = {"success": True, "data": data}
+        else:
+            results[operation.index] = {"success": True}
+
+
+def run_batch(buses, operations: List[Dict[str, Any]], timeout: Optional[float] = None,
+              merge: bool = True, max_gap: int = 8, max_bit_gap: int = 32) -> Dict[str, Any]:
+    """
+    Выполнить пакет операций
+
+    Операции группируются по линиям. Подряд идущие чтения объединяются в блоки
+    (как при фоновом опросе), записи в соседние адреса - в FC15/FC16. Порядок
+    между чтениями и записями сохраняется: чтение, указанное после записи,
+    выполняется после нее. Фаза записей ставится в очередь шины с приоритетом
+    записи, фаза чтений - с приоритетом чтения, заявками не больше MAX_JOB_FRAMES
+    транзакций; заявки одной линии идут по очереди, линии работают параллельно.
+
+    Args:
+        buses: RTUBusManager
+        operations: Операции (см. parse_operation)
+        timeout: Общий крайний срок пакета в секундах; не начатые к этому времени
+                 транзакции не выполняются. Если задан bus_context(deadline=...),
+                 действует более ранний срок
+        merge: False - каждая операция отдельной транзакцией
+        max_gap: Неиспользуемых регистров, читаемых ради объединения
+        max_bit_gap: То же для катушек и дискретных входов
+
+    Returns:
+        {"success": True, "results": [результат каждой операции], "failed", "frames", "elapsed"}
+        Ошибка отдельной операции не прерывает остальные.
+    """
+    started = time.monotonic()
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return {"success": False, "error": f"Too many operations (max {MAX_BATCH_OPERATIONS})"}
+    deadline = started + timeout if timeout else None
+    # Крайний срок запроса (bus_context) ограничивает пакет так же, как timeout
+    context_deadline = current_deadline()
+    if context_deadline is not None and (deadline is None or context_deadline < deadline):
+        deadline = context_deadline
+    results: List[Optional[Dict[str, Any]]] = [None] * len(operations)
+
+    # Разбор и маршрутизация операций по линиям
+    per_bus: Dict[int, list] = {}
+    masters = {}
+    for index, operation in enumerate(operations):
+        try:
+            parsed = parse_operation(index, operation)
+        except ValueError as e:
+            results[index] = {"success": False, "error": str(e)}
+            continue
+        master = buses.resolve(parsed.slave_id, operation.get('bus'))
+        if master is None:
+            results[index] = {"success": False, "error": f"No RTU bus for slave {parsed.slave_id}"}
+            continue
+        masters[id(master)] = master
+        per_bus.setdefault(id(master), []).append(parsed)
+
+    # Заявки каждой линии: фазы по порядку, у записей приоритет записи, у чтений - чтения;
+    # длинная фаза делится на заявки не больше MAX_JOB_FRAMES транзакций
+    jobs: Dict[int, List[tuple]] = {}
+    frame_count = 0
+    for key, bus_operations in per_bus.items():
+        jobs[key] = []
+        for phase in _phases(bus_operations):
+            if isinstance(phase[0], _Read):
+                frames = _read_frames(phase, merge, max_gap, max_bit_gap)
+                priority = current_priority(BusPriority.READ)
+            else:
+                frames = _write_frames(phase, merge)
+                priority = current_priority(BusPriority.WRITE)
+            frame_count += len(frames)
+            for offset in range(0, len(frames), MAX_JOB_FRAMES):
+                jobs[key].append((priority, frames[offset:offset + MAX_JOB_FRAMES]))
+
+    pending: Dict[Future, tuple] = {}
+
+    def submit_next(key):
+        """Поставить в очередь шины следующую заявку линии"""
+        master = masters[key]
+        while jobs[key]:
+            priority, frames = jobs[key].pop(0)
+            if hasattr(master, 'submit_batch'):
+                future = master.submit_batch([f.as_tuple() for f in frames], priority, deadline)
+                pending[future] = (key, frames)
+                return
+            # Мастер без планировщика (asyncio режим) - по одной транзакции
+            for frame in frames:
+                if deadline is not None and time.monotonic() > deadline:
+                    result = {"success": False, "error": DEADLINE_EXCEEDED}
+                else:
+                    with bus_context(priority, deadline):
+                        method = getattr(master, frame.function)
+                        result = method(frame.slave_id, frame.address, frame.arg)
+                _apply(frame, result, results)
+
+    # Линии работают параллельно, заявки одной линии - строго по очереди: следующая
+    # ставится после завершения предыдущей, так что порядок фаз сохраняется, а между
+    # заявками шину получают более важные транзакции
+    for key in jobs:
+        submit_next(key)
+    expired = False
+    while pending:
+        remaining = None
+        if deadline is not None and not expired:
+            remaining = max(0.0, deadline - time.monotonic())
+        done, _ = wait(list(pending), remaining, return_when=FIRST_COMPLETED)
+        if not done:
+            # Крайний срок: оставшиеся заявки не ставятся, не начатые отменяются,
+            # начатые после срока не начинают новых транзакций - дожидаемся текущих
+            expired = True
+            skipped = []
+            for future, (key, frames) in list(pending.items()):
+                skipped.extend(frame for _, job_frames in jobs[key] for frame in job_frames)
+                jobs[key] = []
+                if future.cancel():
+                    skipped.extend(frames)
+                    del pending[future]
+            for frame in skipped:
+                # Операция, записанная частью транзакций, тоже считается невыполненной
+                _apply(frame, {"success": False, "error": DEADLINE_EXCEEDED}, results)
+            continue
+        for future in done:
+            key, frames = pending.pop(future)
+            frame_results = future.result()
+            if isinstance(frame_results, dict):
+                # Заявка отброшена целиком
+                frame_results = [frame_results] * len(frames)
+            for frame, result in zip(frames, frame_results):
+                _apply(frame, result, results)
+            submit_next(key)
+
+    for index, result in enumerate(results):
+        if result is None:
+            # Транзакция пакета не завершилась до крайнего срока
+            results[index] = {"success": False, "error": DEADLINE_EXCEEDED}
+
+    return {
+        "success": True,
+        "results": results,
+        "failed": sum(1 for r in results if not r.get('success')),
+        "frames": frame_count,
+        "elapsed": round(time.monotonic() - started, 3)
+    }
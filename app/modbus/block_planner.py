@@ -0,0 +1,99 @@
+"""
+Block Planner - объединение чтений соседних адресов в минимальное число Modbus запросов
+"""
+from typing import Dict, Any, List, Iterable, Optional
+
+# Протокольные ограничения на количество элементов в одном запросе
+MAX_READ_REGISTERS = 125
+MAX_READ_BITS = 2000
+
+BIT_TYPES = ('coil', 'discrete_input')
+REGISTER_TYPES = ('holding_register', 'input_register')
+
+
+class ReadBlock:
+    """Один Modbus запрос чтения, покрывающий несколько точек"""
+
+    def __init__(self, slave_id: int, type: str, start: int, quantity: int,
+                 bus: Optional[str] = None):
+        self.bus = bus
+        self.slave_id = slave_id
+        self.type = type
+        self.start = start
+        self.quantity = quantity
+        self.items = []
+
+    @property
+    def end(self) -> int:
+        """Адрес, следующий за последним адресом блока"""
+        return self.start + self.quantity
+
+    def offset(self, address: int) -> int:
+        """Смещение адреса внутри прочитанных данных"""
+        return address - self.start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "bus": self.bus,
+            "slave_id": self.slave_id,
+            "type": self.type,
+            "start": self.start,
+            "quantity": self.quantity,
+            "points": len(self.items)
+        }
+
+
+def plan_reads(items: Iterable, max_gap: int = 8, max_bit_gap: int = 32,
+               max_registers: int = MAX_READ_REGISTERS,
+               max_bits: int = MAX_READ_BITS) -> List[ReadBlock]:
+    """
+    Сгруппировать точки по линии, slave и типу и объединить соседние адреса в блоки
+
+    Args:
+        items: Объекты с атрибутами slave_id, type, address и (необязательно) count
+               и bus (линия; одинаковые slave_id на разных линиях - разные устройства)
+        max_gap: Максимальное число неиспользуемых регистров, читаемых ради объединения
+        max_bit_gap: То же для катушек и дискретных входов
+        max_registers: Ограничение размера блока регистров
+        max_bits: Ограничение размера блока катушек
+
+    Returns:
+        Список блоков чтения, отсортированный по линии, slave, типу и адресу
+    """
+    groups: Dict[tuple, list] = {}
+    for item in items:
+        groups.setdefault((getattr(item, 'bus', None), item.slave_id, item.type), []).append(item)
+
+    blocks = []
+    for (bus, slave_id, read_type), group in sorted(groups.items(),
+                                                    key=lambda g: (g[0][0] or '', g[0][1], g[0][2])):
+        if read_type in BIT_TYPES:
+            limit, gap = max_bits, max_bit_gap
+        else:
+            limit, gap = max_registers, max_gap
+
+        group.sort(key=lambda i: i.address)
+        block = None
+        for item in group:
+            count = getattr(item, 'count', 1)
+            end = item.address + count
+            if (block is not None
+                    and item.address - block.end <= gap
+                    and max(end, block.end) - block.start <= limit):
+                block.quantity = max(end, block.end) - block.start
+            else:
+                block = ReadBlock(slave_id, read_type, item.address, count, bus)
+                blocks.append(block)
+            block.items.append(item)
+    return blocks
+
+
+def describe_plan(blocks: List[ReadBlock]) -> Dict[str, Any]:
+    """Сводка плана опроса для API"""
+    return {
+        "frames": len(blocks),
+        "points": sum(len(b.items) for b in blocks),
+        "registers": sum(b.quantity for b in blocks if b.type in REGISTER_TYPES),
+        "bits": sum(b.quantity for b in blocks if b.type in BIT_TYPES),
+        "blocks": [b.to_dict() for b in blocks]
+    }
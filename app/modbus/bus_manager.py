@@ -0,0 +1,171 @@
+"""
+RTU Bus Manager - несколько линий RS-485 и маршрутизация slave -> шина
+"""
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUS = 'default'
+
+
+def bus_configs(rtu_config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Получить список линий из секции modbus_rtu
+
+    Поддерживается как список ports, так и старый формат с одним port.
+    """
+    ports = rtu_config.get('ports')
+    if not ports:
+        return [{
+            "name": DEFAULT_BUS,
+            "port": rtu_config.get('port', '/dev/ttyUSB0'),
+            "baudrate": rtu_config.get('baudrate', 9600),
+            "timeout": rtu_config.get('timeout', 1),
+            "slaves": []
+        }]
+    result = []
+    for index, port in enumerate(ports):
+        entry = {
+            "name": port.get('name') or (DEFAULT_BUS if index == 0 else port.get('port')),
+            "port": port.get('port'),
+            "baudrate": port.get('baudrate', rtu_config.get('baudrate', 9600)),
+            "timeout": port.get('timeout', rtu_config.get('timeout', 1)),
+            "slaves": port.get('slaves', [])
+        }
+        result.append(entry)
+    return result
+
+
+class RTUBusManager:
+    """
+    Набор RTU мастеров (по одному на линию) с таблицей маршрутизации slave_id -> шина
+
+    Устройство адресуется парой (линия, slave_id): одинаковые адреса на разных
+    линиях - разные устройства. Таблица маршрутизации выбирает линию для
+    запросов без явно указанной линии.
+    """
+
+    def __init__(self):
+        """Инициализация менеджера шин"""
+        self.buses: Dict[str, Any] = {}
+        self.routes: Dict[int, str] = {}
+        self.port_routes: Dict[int, str] = {}   # slaves из конфигурации линий
+        self.default_bus = None
+        self.lock = threading.Lock()
+
+    def add_bus(self, name: str, master, slaves: Optional[List[int]] = None):
+        """Добавить (или заменить) линию"""
+        with self.lock:
+            self.buses[name] = master
+            if self.default_bus is None:
+                self.default_bus = name
+            for slave_id in slaves or []:
+                self.port_routes[int(slave_id)] = name
+                self.routes[int(slave_id)] = name
+
+    def remove_bus(self, name: str):
+        """Удалить линию и маршруты на нее"""
+        with self.lock:
+            self.buses.pop(name, None)
+            self.routes = {s: b for s, b in self.routes.items() if b != name}
+            self.port_routes = {s: b for s, b in self.port_routes.items() if b != name}
+            if self.default_bus == name:
+                self.default_bus = next(iter(self.buses), None)
+
+    def get(self, name: Optional[str] = None):
+        """Получить мастер линии по имени (None - линия по умолчанию)"""
+        return self.buses.get(name or self.default_bus)
+
+    def load_routes(self, devices: List[Dict[str, Any]]):
+        """
+        Построить таблицу маршрутизации заново: slaves линий и поле bus устройств
+
+        Маршруты удаленных из конфигурации устройств не сохраняются. Если slave_id
+        есть на нескольких линиях, запросы без линии идут на первую из них.
+        """
+        routes = dict(self.port_routes)
+        device_routes: Dict[int, str] = {}
+        for device in devices or []:
+            if not device.get('bus') or device.get('slave_id') is None:
+                continue
+            slave_id = int(device['slave_id'])
+            bus = device_routes.setdefault(slave_id, device['bus'])
+            if bus != device['bus']:
+                logger.warning(f"Slave {slave_id} is configured on buses {bus} and {device['bus']}; "
+                               f"requests without bus go to {bus}")
+        routes.update(device_routes)
+        with self.lock:
+            self.routes = routes
+
+    def bus_for(self, slave_id: int) -> Optional[str]:
+        """Имя линии, на которой находится slave"""
+        try:
+            bus = self.routes.get(int(slave_id))
+        except (TypeError, ValueError):
+            bus = None
+        if bus in self.buses:
+            return bus
+        return self.default_bus
+
+    def resolve(self, slave_id: int, bus: Optional[str] = None):
+        """Мастер для запроса: явно указанная линия или по таблице маршрутизации"""
+        if bus:
+            return self.buses.get(bus)
+        name = self.bus_for(slave_id)
+        return self.buses.get(name) if name else None
+
+    def __len__(self):
+        return len(self.buses)
+
+    def _dispatch(self, method: str, slave_id: int, *args, **kwargs) -> Dict[str, Any]:
+        master = self.resolve(slave_id)
+        if master is None:
+            return {"success": False, "error": f"No RTU bus for slave {slave_id}"}
+        return getattr(master, method)(slave_id, *args, **kwargs)
+
+    def read_coils(self, slave_id: int, start_addr: int, quantity: int, **kwargs) -> Dict[str, Any]:
+        """Чтение катушек на линии slave"""
+        return self._dispatch('read_coils', slave_id, start_addr, quantity, **kwargs)
+
+    def read_discrete_inputs(self, slave_id: int, start_addr: int, quantity: int, **kwargs) -> Dict[str, Any]:
+        """Чтение дискретных входов на линии slave"""
+        return self._dispatch('read_discrete_inputs', slave_id, start_addr, quantity, **kwargs)
+
+    def read_holding_registers(self, slave_id: int, start_addr: int, quantity: int, **kwargs) -> Dict[str, Any]:
+        """Чтение регистров удержания на линии slave"""
+        return self._dispatch('read_holding_registers', slave_id, start_addr, quantity, **kwargs)
+
+    def read_input_registers(self, slave_id: int, start_addr: int, quantity: int, **kwargs) -> Dict[str, Any]:
+        """Чтение входных регистров на линии slave"""
+        return self._dispatch('read_input_registers', slave_id, start_addr, quantity, **kwargs)
+
+    def write_coil(self, slave_id: int, addr: int, value: bool) -> Dict[str, Any]:
+        """Запись катушки на линии slave"""
+        return self._dispatch('write_coil', slave_id, addr, value)
+
+    def write_register(self, slave_id: int, addr: int, value: int) -> Dict[str, Any]:
+        """Запись регистра на линии slave"""
+        return self._dispatch('write_register', slave_id, addr, value)
+
+    def write_coils(self, slave_id: int, start_addr: int, values: List[bool]) -> Dict[str, Any]:
+        """Запись нескольких катушек на линии slave"""
+        return self._dispatch('write_coils', slave_id, start_addr, values)
+
+    def write_registers(self, slave_id: int, start_addr: int, values: List[int]) -> Dict[str, Any]:
+        """Запись нескольких регистров на линии slave"""
+        return self._dispatch('write_registers', slave_id, start_addr, values)
+
+    def disconnect(self):
+        """Отключить все линии"""
+        for master in list(self.buses.values()):
+            master.disconnect()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получить статус всех линий и таблицу маршрутизации"""
+        return {
+            "default": self.default_bus,
+            "buses": {name: master.get_status() for name, master in list(self.buses.items())},
+            "routes": {str(slave_id): bus for slave_id, bus in sorted(self.routes.items())}
+        }
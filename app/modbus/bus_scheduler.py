@@ -0,0 +1,283 @@
+"""
+Bus Scheduler - очередь транзакций последовательной шины с классами приоритета
+"""
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BusPriority:
+    """Классы приоритета транзакций (меньше - важнее)"""
+    WRITE = 0       # Запись по команде пользователя
+    READ = 1        # Чтение по запросу API/UI
+    POLL = 2        # Фоновый опрос
+    DISCOVERY = 3   # Поиск устройств на шине
+
+    NAMES = {
+        WRITE: 'write',
+        READ: 'read',
+        POLL: 'poll',
+        DISCOVERY: 'discovery',
+    }
+
+
+# Сколько секунд заявка может ждать, прежде чем будет обслужена вне очереди
+DEFAULT_MAX_WAIT = {
+    BusPriority.WRITE: 0.0,
+    BusPriority.READ: 0.5,
+    BusPriority.POLL: 2.0,
+    BusPriority.DISCOVERY: 5.0,
+}
+
+
+
+def select_queue(queues: Dict[int, deque], max_wait: Dict[int, float], now: float,
+                 enqueued: Callable[[Any], float] = lambda item: item.enqueued) -> Optional[deque]:
+    """
+    Очередь, из которой обслуживается следующая заявка
+
+    Записи никогда не обгоняются: пока ждет запись, выполняется она, поэтому
+    задержка записи на занятой шине ограничена одной транзакцией. Среди остальных
+    классов заявка, ожидающая дольше max_wait своего класса, обслуживается раньше
+    более важных, но более новых заявок.
+
+    Args:
+        queues: Очереди по классам приоритета в порядке важности
+        enqueued: Время постановки заявки в очередь (time.monotonic())
+    """
+    if queues.get(BusPriority.WRITE):
+        return queues[BusPriority.WRITE]
+    chosen = None
+    for priority, queue in queues.items():
+        if not queue:
+            continue
+        if chosen is None:
+            chosen = queue
+        elif now - enqueued(queue[0]) > max_wait[priority] and enqueued(queue[0]) < enqueued(chosen[0]):
+            chosen = queue
+    return chosen
+
+
+DEADLINE_EXCEEDED = "Deadline exceeded"
+# Крайний срок истек, когда транзакция уже выполнялась на шине, и она не завершилась
+# за transaction_timeout: запись могла быть выполнена
+OUTCOME_UNKNOWN = "Transaction outcome unknown"
+
+_context = threading.local()
+
+
+@contextmanager
+def bus_context(priority: Optional[int] = None, deadline: Optional[float] = None):
+    """
+    Задать приоритет и/или крайний срок для всех транзакций текущего потока
+
+    Args:
+        priority: Класс приоритета BusPriority
+        deadline: Крайний срок по time.monotonic(), после которого транзакция не нужна
+    """
+    saved = (getattr(_context, 'priority', None), getattr(_context, 'deadline', None))
+    if priority is not None:
+        _context.priority = priority
+    if deadline is not None:
+        _context.deadline = deadline
+    try:
+        yield
+    finally:
+        _context.priority, _context.deadline = saved
+
+
+def current_priority(default: int) -> int:
+    """Приоритет, заданный bus_context(), или значение по умолчанию"""
+    priority = getattr(_context, 'priority', None)
+    return default if priority is None else priority
+
+
+def current_deadline() -> Optional[float]:
+    """Крайний срок, заданный bus_context()"""
+    return getattr(_context, 'deadline', None)
+
+
+def remaining_time() -> Optional[float]:
+    """Секунд до крайнего срока bus_context() (None - срок не задан, 0 - истек)"""
+    deadline = current_deadline()
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+class _Job:
+    __slots__ = ('fn', 'priority', 'deadline', 'future', 'enqueued')
+
+    def __init__(self, fn: Callable, priority: int, deadline: Optional[float]):
+        self.fn = fn
+        self.priority = priority
+        self.deadline = deadline
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class _ClassStats:
+    __slots__ = ('submitted', 'completed', 'dropped', 'wait_total', 'wait_max')
+
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class BusScheduler:
+    """Выполняет транзакции шины в одном рабочем потоке в порядке приоритета"""
+
+    def __init__(self, name: str = 'bus', max_wait: Optional[Dict[int, float]] = None,
+                 transaction_timeout: Optional[float] = None):
+        """
+        Инициализация планировщика
+
+        Args:
+            name: Имя шины (для имени рабочего потока и логов)
+            max_wait: Максимальное ожидание для каждого класса, после которого
+                заявка обслуживается раньше более приоритетных (защита от голодания)
+            transaction_timeout: Сколько run() ждет транзакцию, начатую до крайнего
+                срока (None - без ограничения)
+        """
+        self.name = name
+        self.transaction_timeout = transaction_timeout
+        self.max_wait = dict(DEFAULT_MAX_WAIT)
+        self.max_wait.update(max_wait or {})
+        self.queues = {priority: deque() for priority in BusPriority.NAMES}
+        self.stats = {priority: _ClassStats() for priority in BusPriority.NAMES}
+        self.cond = threading.Condition()
+        self.worker = None
+        self.running = False
+
+    def submit(self, fn: Callable[[], Any], priority: int = BusPriority.READ,
+               deadline: Optional[float] = None) -> Future:
+        """
+        Поставить транзакцию в очередь
+
+        Returns:
+            Future с результатом fn()
+        """
+        if deadline is None:
+            deadline = current_deadline()
+        job = _Job(fn, priority, deadline)
+        with self.cond:
+            if not self.running:
+                self._start()
+            self.queues[priority].append(job)
+            self.stats[priority].submitted += 1
+            self.cond.notify()
+        return job.future
+
+    def run(self, fn: Callable[[], Dict[str, Any]], priority: int = BusPriority.READ,
+            deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Выполнить транзакцию и дождаться результата
+
+        Транзакция, не начатая до крайнего срока, отбрасывается (DEADLINE_EXCEEDED).
+        Начатая транзакция доводится до конца, и run() ждет ее результата еще
+        transaction_timeout секунд (затем - OUTCOME_UNKNOWN).
+        """
+        if deadline is None:
+            deadline = current_deadline()
+        future = self.submit(fn, priority, deadline)
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            pass
+        if future.cancel():
+            return {"success": False, "error": DEADLINE_EXCEEDED}
+        try:
+            return future.result(self.transaction_timeout)
+        except FutureTimeout:
+            return {"success": False, "error": OUTCOME_UNKNOWN}
+
+    def _start(self):
+        self.running = True
+        # Рабочий поток, еще не завершившийся после stop(), продолжает обслуживать
+        # очередь: второй поток на том же порту не запускается
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._run, name=f'bus-{self.name}', daemon=True)
+            self.worker.start()
+
+    def stop(self):
+        """Остановить рабочий поток, отклонив все ожидающие транзакции"""
+        with self.cond:
+            self.running = False
+            pending = [job for queue in self.queues.values() for job in queue]
+            for queue in self.queues.values():
+                queue.clear()
+            self.cond.notify_all()
+            worker = self.worker
+        for job in pending:
+            if job.future.set_running_or_notify_cancel():
+                job.future.set_result({"success": False, "error": "Bus scheduler stopped"})
+        if worker and worker is not threading.current_thread():
+            # Дождаться, пока поток закончит текущую транзакцию и завершится
+            # (или продолжит работу, если за это время поступили новые заявки)
+            with self.cond:
+                self.cond.wait_for(lambda: self.worker is not worker or self.running, timeout=5)
+
+    def _next_job(self) -> Optional[_Job]:
+        """Выбрать следующую заявку: записи, затем просроченные по ожиданию, иначе по приоритету"""
+        chosen = select_queue(self.queues, self.max_wait, time.monotonic())
+        return chosen.popleft() if chosen else None
+
+    def _run(self):
+        while True:
+            with self.cond:
+                job = None
+                while self.running:
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    self.cond.wait()
+                if job is None:
+                    # Под блокировкой: следующий submit() запустит новый поток
+                    self.worker = None
+                    self.cond.notify_all()
+                    return
+
+            stats = self.stats[job.priority]
+            if not job.future.set_running_or_notify_cancel():
+                stats.dropped += 1
+                continue
+            started = time.monotonic()
+            if job.deadline is not None and started > job.deadline:
+                stats.dropped += 1
+                job.future.set_result({"success": False, "error": DEADLINE_EXCEEDED})
+                continue
+
+            wait = started - job.enqueued
+            stats.wait_total += wait
+            stats.wait_max = max(stats.wait_max, wait)
+            try:
+                job.future.set_result(job.fn())
+            except Exception as e:
+                logger.error(f"Bus {self.name} transaction failed: {e}")
+                job.future.set_result({"success": False, "error": str(e)})
+            stats.completed += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Получить глубину очередей и время ожидания по классам"""
+        result = {}
+        with self.cond:
+            for priority, name in BusPriority.NAMES.items():
+                stats = self.stats[priority]
+                executed = stats.completed
+                result[name] = {
+                    "queued": len(self.queues[priority]),
+                    "submitted": stats.submitted,
+                    "completed": stats.completed,
+                    "dropped": stats.dropped,
+                    "wait_avg_ms": round(stats.wait_total / executed * 1000, 3) if executed else 0.0,
+                    "wait_max_ms": round(stats.wait_max * 1000, 3)
+                }
+        return result
@@ -0,0 +1,126 @@
+"""
+Paged Datastore - разреженное хранилище адресного пространства Modbus на компактных массивах
+"""
+from array import array
+from typing import Dict, Any, List, Iterator, Tuple
+from pymodbus.datastore.store import BaseModbusDataBlock
+
+DEFAULT_PAGE_SIZE = 256
+ADDRESS_SPACE = 65536
+
+
+class PagedDataBlock(BaseModbusDataBlock):
+    """
+    Блок данных на все 65536 адресов, память под который выделяется страницами по мере записи
+
+    Регистры хранятся в array('H') (2 байта на адрес), биты - в bytearray (1 байт на адрес).
+    Чтение и запись диапазона затрагивают не больше двух-трех страниц независимо от размера
+    адресного пространства.
+    """
+
+    def __init__(self, bits: bool = False, page_size: int = DEFAULT_PAGE_SIZE, strict: bool = True):
+        """
+        Инициализация
+
+        Args:
+            bits: True - катушки/дискретные входы, False - регистры
+            page_size: Число адресов на странице
+            strict: True - читать можно только записанные адреса (остальные - Illegal Data Address),
+                    False - незаписанные адреса читаются как 0
+        """
+        if page_size <= 0 or ADDRESS_SPACE % page_size:
+            raise ValueError(f"page_size must divide {ADDRESS_SPACE}")
+        self.bits = bits
+        self.page_size = page_size
+        self.strict = strict
+        self.address = 0
+        self.default_value = False if bits else 0
+        self.pages: Dict[int, Any] = {}
+        self.known: Dict[int, bytearray] = {}
+
+    def __str__(self):
+        return f"PagedDataBlock({'bits' if self.bits else 'registers'}, {len(self.pages)} pages)"
+
+    def __iter__(self):
+        for index in sorted(self.pages):
+            page = self.pages[index]
+            base = index * self.page_size
+            for offset, value in enumerate(page):
+                yield base + offset, bool(value) if self.bits else value
+
+    def _new_page(self):
+        if self.bits:
+            return bytearray(self.page_size)
+        return array('H', bytes(2 * self.page_size))
+
+    def _spans(self, address: int, count: int) -> Iterator[Tuple[int, int, int, int]]:
+        """Разбить диапазон на части по страницам: (страница, смещение, позиция в values, длина)"""
+        index, offset = divmod(address, self.page_size)
+        if offset + count <= self.page_size:
+            # Диапазон внутри одной страницы - самый частый случай
+            return ((index, offset, 0, count),)
+        return self._split(address, count)
+
+    def _split(self, address: int, count: int) -> Iterator[Tuple[int, int, int, int]]:
+        position = 0
+        while position < count:
+            index, offset = divmod(address + position, self.page_size)
+            length = min(self.page_size - offset, count - position)
+            yield index, offset, position, length
+            position += length
+
+    def reset(self):
+        """Освободить все страницы"""
+        self.pages.clear()
+        self.known.clear()
+
+    def validate(self, address, count=1):
+        if address < 0 or count < 0 or address + count > ADDRESS_SPACE:
+            return False
+        if not self.strict:
+            return True
+        for index, offset, _, length in self._spans(address, count):
+            known = self.known.get(index)
+            if known is None or known.find(0, offset, offset + length) != -1:
+                return False
+        return True
+
+    def getValues(self, address, count=1):
+        result: List = []
+        for index, offset, _, length in self._spans(address, count):
+            page = self.pages.get(index)
+            if page is None:
+                result.extend([self.default_value] * length)
+            elif self.bits:
+                result.extend(bool(v) for v in page[offset:offset + length])
+            else:
+                result.extend(page[offset:offset + length].tolist())
+        return result
+
+    def setValues(self, address, values):
+        if not isinstance(values, (list, tuple)):
+            values = [values]
+        for index, offset, position, length in self._spans(address, len(values)):
+            page = self.pages.get(index)
+            if page is None:
+                page = self.pages[index] = self._new_page()
+                if self.strict:
+                    self.known[index] = bytearray(self.page_size)
+            chunk = values[position:position + length]
+            if self.bits:
+                page[offset:offset + length] = bytes(1 if v else 0 for v in chunk)
+            else:
+                page[offset:offset + length] = array('H', chunk)
+            if self.strict:
+                self.known[index][offset:offset + length] = b'\x01' * length
+
+    def memory_bytes(self) -> int:
+        """Размер буферов страниц в байтах"""
+        total = sum(len(page) * (1 if self.bits else page.itemsize) for page in self.pages.values())
+        return total + sum(len(known) for known in self.known.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pages": len(self.pages),
+            "bytes": self.memory_bytes()
+        }
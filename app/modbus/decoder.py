@@ -0,0 +1,165 @@
+"""
+Register Map Decoder - преобразование прочитанных регистров в инженерные значения
+"""
+import logging
+import struct
+from typing import Dict, Any, List, Optional
+from app.modbus.payload import registers_to_bytes, BIT_FUNCTIONS
+
+logger = logging.getLogger(__name__)
+
+# Тип данных -> (формат struct, число регистров)
+DATA_TYPES = {
+    'uint16': ('H', 1),
+    'int16': ('h', 1),
+    'uint32': ('I', 2),
+    'int32': ('i', 2),
+    'uint64': ('Q', 4),
+    'int64': ('q', 4),
+    'float32': ('f', 2),
+    'float64': ('d', 4),
+}
+
+# Тип регистра в конфигурации -> функция чтения
+TABLES = {
+    'coil': 'coils',
+    'discrete_input': 'discrete_inputs',
+    'holding_register': 'holding_registers',
+    'input_register': 'input_registers',
+}
+
+
+class FieldSpec:
+    """Скомпилированное описание одного значения из карты регистров"""
+
+    def __init__(self, register: Dict[str, Any]):
+        self.name = register.get('name')
+        self.type = register.get('type', 'holding_register')
+        self.address = register.get('address', 0)
+        self.scale = register.get('scale', 1)
+        self.offset = register.get('offset', 0)
+        self.bit = register.get('bit')
+        self.word_order = register.get('word_order', 'big')
+        self.byte_order = register.get('byte_order', 'big')
+
+        if self.type in ('coil', 'discrete_input'):
+            self.data_type = 'bool'
+            self.count = 1
+            self.format = None
+            return
+
+        self.data_type = register.get('data_type', 'uint16')
+        if self.data_type not in DATA_TYPES:
+            raise ValueError(f"Unknown data_type '{self.data_type}' for register '{self.name}'")
+        self.format, self.count = DATA_TYPES[self.data_type]
+        if self.bit is not None:
+            self.count = 1
+
+    @property
+    def standard_order(self) -> bool:
+        """Порядок слов и байтов совпадает с сетевым (big-endian)"""
+        return self.bit is None and self.word_order == 'big' and self.byte_order == 'big'
+
+    def convert(self, value):
+        """Применить масштаб и смещение"""
+        if isinstance(value, bool) or (self.scale in (None, 1) and not self.offset):
+            return value
+        return value * (self.scale if self.scale is not None else 1) + self.offset
+
+    def decode_single(self, raw: bytes, position: int):
+        """Декодировать значение с нестандартным порядком слов/байтов или бит регистра"""
+        if self.bit is not None:
+            word = int.from_bytes(raw[position:position + 2], 'big')
+            return bool((word >> self.bit) & 1)
+        chunk = raw[position:position + self.count * 2]
+        words = [chunk[i:i + 2] for i in range(0, len(chunk), 2)]
+        if self.word_order == 'little':
+            words.reverse()
+        if self.byte_order == 'little':
+            words = [w[::-1] for w in words]
+        return self.convert(struct.unpack('>' + self.format, b''.join(words))[0])
+
+
+class _BlockPlan:
+    """Скомпилированный декодер для блока (таблица, начальный адрес, длина)"""
+
+    def __init__(self, fields: List[FieldSpec], start: int, length: int):
+        covered = sorted(
+            (f for f in fields if start <= f.address and f.address + f.count <= start + length),
+            key=lambda f: f.address
+        )
+        fmt = ['>']
+        position = 0
+        self.packed: List[FieldSpec] = []
+        self.single: List[tuple] = []
+        for field in covered:
+            byte_offset = (field.address - start) * 2
+            if field.standard_order and byte_offset >= position:
+                # Пропуски между значениями читаются как байты-заполнители
+                if byte_offset > position:
+                    fmt.append(f'{byte_offset - position}x')
+                fmt.append(field.format)
+                position = byte_offset + field.count * 2
+                self.packed.append(field)
+            else:
+                self.single.append((field, byte_offset))
+        self.struct = struct.Struct(''.join(fmt)) if self.packed else None
+
+
+class RegisterMapDecoder:
+    """
+    Декодер карты регистров одного устройства
+
+    Карта компилируется один раз; для каждого блока чтения строится один struct.Struct,
+    который извлекает все значения блока за один вызов unpack_from.
+    """
+
+    def __init__(self, registers: List[Dict[str, Any]]):
+        self.fields: Dict[str, FieldSpec] = {}
+        self.tables: Dict[str, List[FieldSpec]] = {}
+        for register in registers or []:
+            if register.get('type', 'holding_register') not in TABLES:
+                continue
+            try:
+                field = FieldSpec(register)
+            except ValueError as e:
+                logger.warning(str(e))
+                continue
+            self.fields[field.name] = field
+            self.tables.setdefault(TABLES[field.type], []).append(field)
+        self._plans: Dict[tuple, _BlockPlan] = {}
+
+    def field(self, name: str) -> Optional[FieldSpec]:
+        return self.fields.get(name)
+
+    def decode(self, table: str, start: int, data: List) -> Dict[str, Any]:
+        """
+        Преобразовать результат блочного чтения в значения по именам
+
+        Args:
+            table: Функция чтения (coils, discrete_inputs, holding_registers, input_registers)
+            start: Начальный адрес блока
+            data: Прочитанные значения блока
+        """
+        fields = self.tables.get(table)
+        if not fields:
+            return {}
+        if table in BIT_FUNCTIONS:
+            return {
+                f.name: bool(data[f.address - start])
+                for f in fields if 0 <= f.address - start < len(data)
+            }
+
+        key = (table, start, len(data))
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._plans[key] = _BlockPlan(fields, start, len(data))
+
+        raw = registers_to_bytes(data)
+        values = {}
+        if plan.struct is not None:
+            for field, value in zip(plan.packed, plan.struct.unpack_from(raw)):
+                values[field.name] = field.convert(value)
+        for field, byte_offset in plan.single:
+            values[field.name] = field.decode_single(raw, byte_offset)
+        return values
@@ -0,0 +1,252 @@
+"""
+Slave Discovery - поиск slave устройств на линии RTU и кэш их идентификации
+"""
+import logging
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MIN_SLAVE_ID = 1
+MAX_SLAVE_ID = 247
+
+# Объекты базовой идентификации устройства (FC43 / MEI 0x0E)
+IDENTITY_OBJECTS = {
+    0x00: 'vendor',
+    0x01: 'product_code',
+    0x02: 'revision',
+}
+
+# Функции чтения, которые можно использовать для пробного запроса
+PROBE_FUNCTIONS = ('coils', 'discrete_inputs', 'holding_registers', 'input_registers')
+
+
+class DiscoveryState:
+    """Состояния задачи обнаружения"""
+    IDLE = 'idle'
+    RUNNING = 'running'
+    DONE = 'done'
+    CANCELLED = 'cancelled'
+    FAILED = 'failed'
+
+
+class DeviceStatus:
+    """Результат проверки адреса относительно предыдущих сканирований"""
+    NEW = 'new'            # Устройство найдено впервые
+    KNOWN = 'known'        # Ответ совпадает с сохраненным
+    CHANGED = 'changed'    # По адресу отвечает другое устройство
+    MISSING = 'missing'    # Ранее найденное устройство не отвечает
+
+
+class SlaveDiscovery:
+    """
+    Фоновое сканирование адресов линии с коротким таймаутом
+
+    Присутствие определяется пробным чтением настраиваемого регистра, после чего
+    ответившие устройства идентифицируются через FC43 (Read Device Identification).
+    Найденные устройства сохраняются: быстрое сканирование (mode=quick) проверяет
+    только известные адреса, а FC43 повторяется только для новых и изменившихся.
+    """
+
+    def __init__(self, master, probe_timeout: float = 0.1, probe_function: str = 'holding_registers',
+                 probe_address: int = 0, probe_count: int = 1):
+        """
+        Инициализация
+
+        Args:
+            master: ModbusRTUMaster линии
+            probe_timeout: Таймаут пробного запроса в секундах
+            probe_function: Функция пробного чтения (holding_registers, input_registers, coils, discrete_inputs)
+            probe_address: Адрес пробного регистра
+            probe_count: Количество читаемых регистров
+        """
+        if probe_function not in PROBE_FUNCTIONS:
+            raise ValueError(f"Unknown probe function '{probe_function}'")
+        self.master = master
+        self.probe_timeout = probe_timeout
+        self.probe_function = probe_function
+        self.probe_address = probe_address
+        self.probe_count = probe_count
+        self.devices: Dict[int, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        self.thread = None
+        self._cancel = threading.Event()
+        self.progress = self._new_progress(DiscoveryState.IDLE, 0, None)
+
+    @staticmethod
+    def _new_progress(state: str, total: int, mode: Optional[str]) -> Dict[str, Any]:
+        return {
+            "state": state,
+            "mode": mode,
+            "total": total,
+            "scanned": 0,
+            "found": 0,
+            "current": None,
+            "started": time.time() if state == DiscoveryState.RUNNING else None,
+            "finished": None,
+            "error": None
+        }
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, first: int = MIN_SLAVE_ID, last: int = MAX_SLAVE_ID, mode: str = 'full') -> bool:
+        """
+        Запустить сканирование в фоне
+
+        Args:
+            first, last: Диапазон адресов
+            mode: full - все адреса диапазона, quick - только ранее найденные
+
+        Returns:
+            False, если сканирование уже выполняется
+        """
+        with self.lock:
+            if self.running:
+                return False
+            slave_ids = self._targets(first, last, mode)
+            self._cancel.clear()
+            self.progress = self._new_progress(DiscoveryState.RUNNING, len(slave_ids), mode)
+            self.thread = threading.Thread(target=self.scan, args=(slave_ids,),
+                                           name=f'discovery-{self.master.port}', daemon=True)
+            self.thread.start()
+        logger.info(f"Started {mode} discovery on {self.master.port}: {len(slave_ids)} addresses")
+        return True
+
+    def _targets(self, first: int, last: int, mode: str) -> List[int]:
+        first = max(MIN_SLAVE_ID, int(first))
+        last = min(MAX_SLAVE_ID, int(last))
+        if mode == 'quick' and self.devices:
+            return [s for s in sorted(self.devices) if first <= s <= last]
+        return list(range(first, last + 1))
+
+    def cancel(self):
+        """Остановить сканирование (текущий пробный запрос будет завершен)"""
+        self._cancel.set()
+
+    def wait(self, timeout: Optional[float] = None):
+        """Дождаться завершения сканирования"""
+        thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def scan(self, slave_ids: List[int]):
+        """Просканировать адреса (выполняется в фоновом потоке)"""
+        progress = self.progress
+        if progress["state"] != DiscoveryState.RUNNING:
+            progress = self.progress = self._new_progress(DiscoveryState.RUNNING, len(slave_ids), None)
+        try:
+            for slave_id in slave_ids:
+                if self._cancel.is_set():
+                    progress["state"] = DiscoveryState.CANCELLED
+                    break
+                if not self.master.connected:
+                    raise ConnectionError("Not connected")
+                progress["current"] = slave_id
+                if self.check(slave_id):
+                    progress["found"] += 1
+                progress["scanned"] += 1
+            else:
+                progress["state"] = DiscoveryState.DONE
+        except Exception as e:
+            logger.error(f"Discovery on {self.master.port} failed: {e}")
+            progress["state"] = DiscoveryState.FAILED
+            progress["error"] = str(e)
+        progress["current"] = None
+        progress["finished"] = time.time()
+        logger.info(f"Discovery on {self.master.port} {progress['state']}: "
+                    f"{progress['found']} of {progress['scanned']} addresses responded")
+
+    def check(self, slave_id: int) -> bool:
+        """Проверить один адрес и обновить кэш; возвращает True, если устройство ответило"""
+        probe = self._probe(slave_id)
+        now = time.time()
+        with self.lock:
+            cached = self.devices.get(slave_id)
+        if probe is None:
+            if cached is not None:
+                with self.lock:
+                    cached["status"] = DeviceStatus.MISSING
+            return False
+
+        if cached is not None and cached["probe"] == probe and cached["status"] != DeviceStatus.MISSING:
+            identity, status = cached["identity"], DeviceStatus.KNOWN
+        else:
+            identity = self._identify(slave_id)
+            if cached is None:
+                status = DeviceStatus.NEW
+            elif cached["probe"] == probe and cached["identity"] == identity:
+                status = DeviceStatus.KNOWN
+            else:
+                status = DeviceStatus.CHANGED
+
+        with self.lock:
+            self.devices[slave_id] = {
+                "slave_id": slave_id,
+                "status": status,
+                "probe": probe,
+                "identity": identity,
+                "fingerprint": self._fingerprint(identity, probe),
+                "first_seen": cached["first_seen"] if cached else now,
+                "last_seen": now
+            }
+        return True
+
+    def _probe(self, slave_id: int) -> Optional[Dict[str, Any]]:
+        """Пробное чтение: None - нет ответа, иначе данные или код исключения Modbus"""
+        result = self.master.probe(slave_id, 'read_' + self.probe_function,
+                                   self.probe_address, self.probe_count, timeout=self.probe_timeout)
+        if not result.get('success'):
+            return None
+        response = result['response']
+        if response.function_code > 0x80:
+            return {"exception": getattr(response, 'exception_code', None)}
+        attr = 'bits' if self.probe_function in ('coils', 'discrete_inputs') else 'registers'
+        return {"data": list(getattr(response, attr, []))[:self.probe_count]}
+
+    def _identify(self, slave_id: int) -> Optional[Dict[str, str]]:
+        """Базовая идентификация устройства через FC43 (None - не поддерживается)"""
+        result = self.master.probe(slave_id, 'read_device_information', timeout=self.probe_timeout)
+        if not result.get('success'):
+            return None
+        information = getattr(result['response'], 'information', None)
+        if not information:
+            return None
+        identity = {}
+        for object_id, name in IDENTITY_OBJECTS.items():
+            value = information.get(object_id)
+            if isinstance(value, bytes):
+                value = value.decode('ascii', errors='replace')
+            if value is not None:
+                identity[name] = value
+        return identity or None
+
+    @staticmethod
+    def _fingerprint(identity: Optional[Dict[str, str]], probe: Dict[str, Any]) -> str:
+        if identity:
+            return '/'.join(identity.get(name, '') for name in IDENTITY_OBJECTS.values())
+        if 'exception' in probe:
+            return f"exception:{probe['exception']}"
+        return 'probe:' + ','.join(str(int(v)) for v in probe['data'])
+
+    def forget(self, slave_id: Optional[int] = None):
+        """Удалить сохраненные результаты (None - все)"""
+        with self.lock:
+            if slave_id is None:
+                self.devices.clear()
+            else:
+                self.devices.pop(slave_id, None)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получить прогресс сканирования и найденные устройства"""
+        progress = dict(self.progress)
+        progress["percent"] = round(100.0 * progress["scanned"] / progress["total"], 1) \
+            if progress["total"] else 0.0
+        with self.lock:
+            devices = {str(s): dict(d) for s, d in sorted(self.devices.items())}
+        return {
+            "progress": progress,
+            "devices": devices
+        }
@@ -0,0 +1,324 @@
+"""
+Modbus Gateway - хранилище TCP сервера, которое отдает опрошенные значения RTU устройств
+"""
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from pymodbus.datastore import ModbusServerContext
+from pymodbus.exceptions import NoSuchSlaveException, ModbusException
+from pymodbus.interfaces import IModbusSlaveContext
+from app.modbus.datastore import PagedDataBlock, DEFAULT_PAGE_SIZE, ADDRESS_SPACE
+from app.modbus.block_planner import plan_reads
+from app.modbus.decoder import FieldSpec, TABLES
+
+logger = logging.getLogger(__name__)
+
+# Таблица pymodbus (результат decode(fc)) -> тип регистра в конфигурации
+TABLE_TYPES = {
+    'c': 'coil',
+    'd': 'discrete_input',
+    'h': 'holding_register',
+    'i': 'input_register',
+}
+
+# Функции записи: пересылаются на шину RTU
+WRITE_FUNCTIONS = (5, 6, 15, 16, 22, 23)
+
+# Ключ контекста: (линия RTU или None, адрес slave)
+SlaveKey = Tuple[Optional[str], int]
+
+
+class _MapItem:
+    """Регистр карты устройства для расчета диапазонов адресов"""
+
+    def __init__(self, slave_id: int, field: FieldSpec):
+        self.slave_id = slave_id
+        self.type = field.type
+        self.address = field.address
+        self.count = field.count
+
+
+def register_ranges(slave_id: int, registers: List[Dict[str, Any]], max_gap: int = 8,
+                    max_bit_gap: int = 32) -> Dict[str, List[tuple]]:
+    """
+    Диапазоны адресов, которые обслуживает контекст slave: блоки опроса карты регистров
+
+    Returns:
+        Таблица pymodbus (c, d, h, i) -> отсортированный список (start, end), end не включается
+    """
+    items = []
+    for register in registers:
+        if register.get('type', 'holding_register') not in TABLES:
+            continue
+        try:
+            items.append(_MapItem(slave_id, FieldSpec(register)))
+        except ValueError:
+            continue
+    ranges: Dict[str, List[tuple]] = {}
+    types = {name: table for table, name in TABLE_TYPES.items()}
+    for block in plan_reads(items, max_gap, max_bit_gap):
+        table_ranges = ranges.setdefault(types[block.type], [])
+        if table_ranges and block.start <= table_ranges[-1][1]:
+            table_ranges[-1] = (table_ranges[-1][0], max(table_ranges[-1][1], block.end))
+        else:
+            table_ranges.append((block.start, block.end))
+    return ranges
+
+
+class GatewaySlaveContext(IModbusSlaveContext):
+    """
+    Контекст одного unit id TCP сервера
+
+    Чтения обслуживаются из последних опрошенных значений без обращения к шине;
+    адреса, которые не опрашиваются, возвращают исключение Illegal Data Address
+    (или 0 при strict=False). Записи пересылаются на slave через общий RTU мастер.
+    """
+
+    def __init__(self, slave_id: int, master, page_size: int = DEFAULT_PAGE_SIZE, strict: bool = True,
+                 bus: Optional[str] = None):
+        """
+        Args:
+            slave_id: Адрес slave на линии RTU
+            master: RTUBusManager или ModbusRTUMaster для пересылки записей
+            page_size: Размер страницы хранилища
+            strict: Отвечать исключением на чтение неопрашиваемых адресов
+            bus: Линия RTU устройства (None - по таблице маршрутизации)
+        """
+        self.slave_id = slave_id
+        self.bus = bus
+        self.master = master
+        self.ranges: Optional[Dict[str, List[tuple]]] = None   # None - все адреса
+        self.page_size = page_size
+        self.strict = strict
+        self.store = {table: self._new_block(table) for table in TABLE_TYPES}
+        self.lock = threading.Lock()
+
+    def _new_block(self, table: str) -> PagedDataBlock:
+        return PagedDataBlock(bits=table in ('c', 'd'), page_size=self.page_size, strict=self.strict)
+
+    def __str__(self):
+        if self.bus:
+            return f"Gateway context for slave {self.slave_id} on bus {self.bus}"
+        return f"Gateway context for slave {self.slave_id}"
+
+    def reset(self):
+        """Забыть все значения"""
+        with self.lock:
+            for block in self.store.values():
+                block.reset()
+
+    def set_ranges(self, ranges: Optional[Dict[str, List[tuple]]]):
+        """Ограничить обслуживаемые адреса диапазонами карты регистров (None - без ограничений)"""
+        with self.lock:
+            self.ranges = ranges
+
+    def in_ranges(self, table: str, address: int, count: int = 1) -> bool:
+        """Попадает ли диапазон целиком в один из диапазонов карты регистров"""
+        ranges = self.ranges
+        if ranges is None:
+            return True
+        return any(start <= address and address + count <= end for start, end in ranges.get(table, ()))
+
+    def update(self, register_type: str, address: int, values: List):
+        """Обновить значения таблицы (вызывается опросчиком после чтения блока)"""
+        for table, name in TABLE_TYPES.items():
+            if name == register_type:
+                with self.lock:
+                    self.store[table].setValues(address, list(values))
+                return
+
+    def validate(self, fx, address, count=1):
+        table = self.decode(fx)
+        if not self.in_ranges(table, address, count):
+            return False
+        if fx in WRITE_FUNCTIONS:
+            return count > 0 and 0 <= address and address + count <= ADDRESS_SPACE
+        with self.lock:
+            return self.store[table].validate(address, count)
+
+    def getValues(self, fx, address, count=1):
+        with self.lock:
+            return self.store[self.decode(fx)].getValues(address, count)
+
+    def _bus_master(self):
+        """Мастер линии устройства: запись уходит на ту же линию, с которой опрашивается slave"""
+        if self.master is None:
+            raise ModbusException("RTU not initialized")
+        if not self.bus or not hasattr(self.master, 'resolve'):
+            return self.master
+        master = self.master.resolve(self.slave_id, self.bus)
+        if master is None:
+            raise ModbusException(f"RTU bus {self.bus} not found")
+        return master
+
+    def setValues(self, fx, address, values):
+        table = self.decode(fx)
+        master = self._bus_master()
+        if table == 'c':
+            if fx == 5:
+                result = master.write_coil(self.slave_id, address, bool(values[0]))
+            else:
+                result = master.write_coils(self.slave_id, address, [bool(v) for v in values])
+        elif fx in (6, 22):
+            result = master.write_register(self.slave_id, address, values[0])
+        else:
+            result = master.write_registers(self.slave_id, address, list(values))
+        if not result.get('success'):
+            # Исключение превращается сервером в ответ Slave Device Failure
+            raise ModbusException(f"Write to slave {self.slave_id} failed: {result.get('error')}")
+        with self.lock:
+            self.store[table].setValues(address, list(values))
+
+
+class GatewayServerContext(ModbusServerContext):
+    """
+    Набор контекстов TCP сервера с таблицей unit id -> slave
+
+    Для каждого slave из секции devices создается контекст, обслуживающий диапазоны
+    адресов его карты регистров; контексты различаются парой (линия, адрес slave),
+    поэтому одинаковые адреса на разных линиях не смешиваются. По умолчанию unit id
+    совпадает с адресом slave (при совпадении адресов на нескольких линиях - первое
+    устройство); секция modbus_tcp.units позволяет задать другое соответствие
+    ({"10": 1} - unit 10 обслуживает slave 1, {"11": ["rs485-2", 1]} - slave 1 линии
+    rs485-2). Изменения конфигурации применяются к работающему серверу
+    без перезапуска: неизмененные контексты сохраняются вместе со значениями.
+    """
+
+    def __init__(self, master=None, devices: Optional[List[Dict[str, Any]]] = None,
+                 units: Optional[Dict[str, Any]] = None, page_size: int = DEFAULT_PAGE_SIZE,
+                 strict: bool = True, max_gap: int = 8, max_bit_gap: int = 32):
+        super().__init__(slaves={}, single=False)
+        self.master = master
+        self.page_size = page_size
+        self.strict = strict
+        self.max_gap = max_gap
+        self.max_bit_gap = max_bit_gap
+        self.units: Dict[int, SlaveKey] = {}
+        self.by_slave: Dict[SlaveKey, GatewaySlaveContext] = {}
+        self.lock = threading.Lock()
+        self.load_units(devices or [], units or {})
+
+    @staticmethod
+    def _unit_key(target, first_bus: Dict[int, Optional[str]]) -> SlaveKey:
+        """
+        Ключ контекста для значения modbus_tcp.units
+
+        Число - адрес slave (линия первого устройства с этим адресом), пара
+        [bus, slave_id] или {"bus": ..., "slave_id": ...} - slave на указанной линии.
+        """
+        if isinstance(target, dict):
+            return target.get('bus') or None, int(target['slave_id'])
+        if isinstance(target, (list, tuple)):
+            bus, slave_id = target
+            return bus or None, int(slave_id)
+        slave_id = int(target)
+        return first_bus.get(slave_id), slave_id
+
+    def load_units(self, devices: List[Dict[str, Any]], units: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """
+        Применить конфигурацию устройств и таблицу unit id
+
+        Returns:
+            Число добавленных, удаленных и измененных контекстов slave
+        """
+        registers: Dict[SlaveKey, List[Dict[str, Any]]] = {}
+        first_bus: Dict[int, Optional[str]] = {}
+        mapping: Dict[int, SlaveKey] = {}
+        for device in devices:
+            if device.get('type', 'rtu') == 'rtu' and device.get('slave_id') is not None:
+                slave_id = int(device['slave_id'])
+                key = (device.get('bus') or None, slave_id)
+                bus = first_bus.setdefault(slave_id, key[0])
+                if bus != key[0]:
+                    logger.warning(f"Slave {slave_id} is configured on buses {bus} and {key[0]}; "
+                                   f"unit {slave_id} serves bus {bus}, map the other one in modbus_tcp.units")
+                mapping.setdefault(slave_id, (bus, slave_id))
+                registers.setdefault(key, []).extend(device.get('registers', []))
+        for unit_id, target in (units or {}).items():
+            try:
+                mapping[int(unit_id)] = self._unit_key(target, first_bus)
+            except (TypeError, ValueError, KeyError):
+                logger.warning(f"Invalid modbus_tcp.units entry {unit_id}: {target}")
+
+        # Slave без карты регистров (или только из modbus_tcp.units) не обслуживает
+        # ни одного адреса: пустой набор диапазонов, а не все адресное пространство
+        ranges = {
+            key: register_ranges(key[1], slave_registers, self.max_gap, self.max_bit_gap)
+            for key, slave_registers in registers.items()
+        }
+        # Контексты всех устройств, в том числе не получивших unit id (обновления опроса принимаются)
+        keys = set(registers) | set(mapping.values())
+        changes = {"added": 0, "removed": 0, "updated": 0}
+        with self.lock:
+            by_slave = {}
+            for key in keys:
+                context = self.by_slave.get(key)
+                if context is None:
+                    context = GatewaySlaveContext(key[1], self.master, self.page_size, self.strict, bus=key[0])
+                    changes["added"] += 1
+                elif context.ranges != ranges.get(key, {}):
+                    changes["updated"] += 1
+                context.set_ranges(ranges.get(key, {}))
+                by_slave[key] = context
+            changes["removed"] = len(set(self.by_slave) - set(by_slave))
+            self.units = mapping
+            self.by_slave = by_slave
+            # Новая таблица подменяется целиком: запросы видят либо старую, либо новую
+            self._slaves = {unit_id: by_slave[key] for unit_id, key in mapping.items()}
+        logger.info(f"Gateway serves {len(mapping)} unit ids for {len(by_slave)} slaves "
+                    f"({changes['added']} added, {changes['removed']} removed, {changes['updated']} updated)")
+        return changes
+
+    def set_master(self, master):
+        """Заменить мастер для пересылки записей"""
+        self.master = master
+        with self.lock:
+            for context in self.by_slave.values():
+                context.master = master
+
+    def update(self, slave_id: int, register_type: str, address: int, values: List,
+               bus: Optional[str] = None):
+        """Принять результат чтения блока от опросчика (bus - поле bus устройства)"""
+        context = self.by_slave.get((bus or None, slave_id))
+        if context is not None:
+            context.update(register_type, address, values)
+
+    def __getitem__(self, unit_id):
+        context = self._slaves.get(unit_id)
+        if context is None:
+            raise NoSuchSlaveException(f"unit {unit_id} is not mapped to a slave")
+        return context
+
+    def get_status(self) -> Dict[str, Any]:
+        """Таблица unit id -> (линия, slave) и обслуживаемые диапазоны адресов"""
+        with self.lock:
+            units = sorted(self.units.items())
+            by_slave = dict(self.by_slave)
+        result = {}
+        for unit_id, key in units:
+            ranges = by_slave[key].ranges
+            result[str(unit_id)] = {
+                "bus": key[0],
+                "slave_id": key[1],
+                "ranges": None if ranges is None else {
+                    TABLE_TYPES[table]: [[start, end - start] for start, end in table_ranges]
+                    for table, table_ranges in ranges.items()
+                }
+            }
+        return result
+
+    def get_memory_stats(self) -> Dict[str, Any]:
+        """Память, занятая хранилищем шлюза"""
+        with self.lock:
+            contexts = list(self.by_slave.values())
+        pages = total = 0
+        for context in contexts:
+            with context.lock:
+                for block in context.store.values():
+                    pages += len(block.pages)
+                    total += block.memory_bytes()
+        return {
+            "slaves": len(contexts),
+            "pages": pages,
+            "bytes": total
+        }
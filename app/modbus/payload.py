@@ -0,0 +1,81 @@
+"""
+Payload - компактное представление регистров и битов Modbus
+"""
+import base64
+import sys
+from array import array
+from typing import List, Iterable, Union
+
+BIT_FUNCTIONS = ('coils', 'discrete_inputs')
+
+# Поддерживаемые кодировки данных в ответах API
+ENCODINGS = ('list', 'base64', 'hex')
+
+
+def pack_registers(values: Iterable[int]) -> array:
+    """Регистры в массив array('H') (2 байта на значение вместо объекта int)"""
+    return array('H', values)
+
+
+def registers_to_bytes(registers: Union[array, Iterable[int]]) -> bytes:
+    """Регистры в байты в порядке Modbus (big-endian)"""
+    packed = registers if isinstance(registers, array) else pack_registers(registers)
+    if sys.byteorder == 'little':
+        packed = array('H', packed)
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def bytes_to_registers(data: bytes) -> array:
+    """Байты в порядке Modbus в массив регистров"""
+    registers = array('H')
+    registers.frombytes(data)
+    if sys.byteorder == 'little':
+        registers.byteswap()
+    return registers
+
+
+def pack_bits(bits: Iterable[bool]) -> bytearray:
+    """Биты в битовое поле (младший бит первого байта - первый адрес, как в Modbus)"""
+    bits = list(bits)
+    packed = bytearray((len(bits) + 7) // 8)
+    for index, bit in enumerate(bits):
+        if bit:
+            packed[index >> 3] |= 1 << (index & 7)
+    return packed
+
+
+def unpack_bits(packed: Union[bytes, bytearray], start: int, count: int) -> List[bool]:
+    """Прочитать count битов из битового поля начиная с позиции start"""
+    return [bool(packed[i >> 3] & (1 << (i & 7))) for i in range(start, start + count)]
+
+
+def set_bit(packed: bytearray, index: int, value: bool):
+    """Установить бит в битовом поле"""
+    if value:
+        packed[index >> 3] |= 1 << (index & 7)
+    else:
+        packed[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+
+def to_bytes(function: str, data: List) -> bytes:
+    """Сырые данные ответа: битовое поле для битов, big-endian слова для регистров"""
+    if function in BIT_FUNCTIONS:
+        return bytes(pack_bits(data))
+    return registers_to_bytes(data)
+
+
+def encode_data(function: str, data: List, encoding: str = 'list'):
+    """
+    Закодировать данные чтения для ответа API
+
+    Args:
+        function: Тип чтения (coils, discrete_inputs, holding_registers, input_registers)
+        data: Прочитанные значения
+        encoding: list - JSON список, base64/hex - сырые байты ответа
+    """
+    if encoding == 'base64':
+        return base64.b64encode(to_bytes(function, data)).decode('ascii')
+    if encoding == 'hex':
+        return to_bytes(function, data).hex()
+    return data
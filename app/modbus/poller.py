@@ -0,0 +1,402 @@
+"""
+Modbus Poller - фоновый опрос регистров устройств из секции devices конфигурации
+"""
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable
+from app.modbus.block_planner import plan_reads, describe_plan
+from app.modbus.bus_scheduler import BusPriority, bus_context
+from app.modbus.decoder import RegisterMapDecoder, TABLES
+
+logger = logging.getLogger(__name__)
+
+
+class PointQuality:
+    """Флаги качества значения точки опроса"""
+    INIT = 'init'      # Значение еще ни разу не было прочитано
+    GOOD = 'good'      # Последний опрос успешен и значение свежее
+    BAD = 'bad'        # Последний опрос завершился ошибкой
+    STALE = 'stale'    # Значение не обновлялось дольше допустимого
+
+
+# Тип регистра в конфигурации -> метод чтения ModbusRTUMaster
+READ_METHODS = {
+    'coil': 'read_coils',
+    'discrete_input': 'read_discrete_inputs',
+    'holding_register': 'read_holding_registers',
+    'input_register': 'read_input_registers',
+}
+
+
+class PollPoint:
+    """Одна опрашиваемая точка (регистр устройства)"""
+
+    def __init__(self, device: Dict[str, Any], register: Dict[str, Any], interval: float,
+                 count: int = 1):
+        self.device_id = device.get('id')
+        self.bus = device.get('bus')
+        self.slave_id = device.get('slave_id')
+        self.name = register.get('name')
+        self.address = register.get('address', 0)
+        self.type = register.get('type', 'holding_register')
+        self.count = count
+        self.interval = float(interval)
+
+        self.raw = None
+        self.value = None
+        self.quality = PointQuality.INIT
+        self.timestamp = None       # время последнего успешного чтения
+        self.last_poll = None       # время последней попытки чтения
+        self.error = None
+
+    @property
+    def key(self) -> tuple:
+        return (self.device_id, self.name)
+
+    def update(self, raw: Any, value: Any, now: float):
+        """Сохранить успешно прочитанное значение (raw - слово или список слов, value - инженерное значение)"""
+        self.raw = raw
+        self.value = value
+        self.quality = PointQuality.GOOD
+        self.timestamp = now
+        self.last_poll = now
+        self.error = None
+
+    def fail(self, error: str, now: float):
+        """Отметить неудачный опрос, сохранив последнее известное значение"""
+        self.quality = PointQuality.BAD
+        self.last_poll = now
+        self.error = error
+
+    def to_dict(self, now: float, stale_after: float) -> Dict[str, Any]:
+        quality = self.quality
+        if quality == PointQuality.GOOD and now - self.timestamp > stale_after:
+            quality = PointQuality.STALE
+        return {
+            "value": self.value,
+            "raw": self.raw,
+            "quality": quality,
+            "timestamp": self.timestamp,
+            "last_poll": self.last_poll,
+            "error": self.error
+        }
+
+
+class ModbusPoller:
+    """Фоновый опрос настроенных регистров с хранением последних значений в памяти"""
+
+    def __init__(self, rtu_master, devices: List[Dict[str, Any]],
+                 default_interval: float = 1.0, stale_factor: float = 3.0,
+                 max_gap: int = 8, max_bit_gap: int = 32):
+        """
+        Инициализация опросчика
+
+        Args:
+            rtu_master: Экземпляр ModbusRTUMaster для выполнения чтений
+            devices: Список устройств из секции devices конфигурации
+            default_interval: Интервал опроса по умолчанию в секундах
+            stale_factor: Через сколько интервалов без обновления значение считается устаревшим
+            max_gap: Сколько неиспользуемых регистров можно прочитать ради объединения запросов
+            max_bit_gap: То же для катушек и дискретных входов
+        """
+        self.rtu_master = rtu_master
+        self.default_interval = default_interval
+        self.stale_factor = stale_factor
+        self.max_gap = max_gap
+        self.max_bit_gap = max_bit_gap
+        self.devices: Dict[Any, Dict[str, Any]] = {}
+        self.points: Dict[tuple, PollPoint] = {}
+        self.decoders: Dict[Any, RegisterMapDecoder] = {}
+        self.listeners: List[Callable[[int, str, int, list], None]] = []
+        self.change_listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self.lock = threading.Lock()
+        self.running = False
+        self.poll_thread = None
+        self._stop_event = threading.Event()
+        self._wakeup = threading.Event()
+        self._schedule: List[tuple] = []
+        self.cycles = 0
+        self.errors = 0
+        self.frames = 0
+        self._executor = None
+        self._executor_size = 0
+        self.load_devices(devices)
+
+    def load_devices(self, devices: List[Dict[str, Any]]):
+        """Построить список точек опроса из конфигурации устройств"""
+        points = {}
+        device_info = {}
+        decoders = {}
+        for device in devices or []:
+            if device.get('type', 'rtu') != 'rtu' or device.get('slave_id') is None:
+                continue
+            device_interval = device.get('poll_interval', self.default_interval)
+            device_info[device.get('id')] = {
+                "name": device.get('name'),
+                "slave_id": device.get('slave_id')
+            }
+            decoder = decoders[device.get('id')] = RegisterMapDecoder(device.get('registers', []))
+            for register in device.get('registers', []):
+                if register.get('type', 'holding_register') not in READ_METHODS:
+                    logger.warning(f"Unknown register type '{register.get('type')}' "
+                                   f"in device {device.get('id')}, skipped")
+                    continue
+                field = decoder.field(register.get('name'))
+                if field is None:
+                    continue
+                interval = register.get('poll_interval', device_interval)
+                point = PollPoint(device, register, interval, field.count)
+                points[point.key] = point
+
+        now = time.monotonic()
+        with self.lock:
+            # Сохранить значения точек, которые остались в конфигурации
+            for key, point in points.items():
+                old = self.points.get(key)
+                if (old is not None and old.address == point.address and old.type == point.type
+                        and old.count == point.count and old.bus == point.bus
+                        and old.slave_id == point.slave_id):
+                    point.raw, point.value = old.raw, old.value
+                    point.quality, point.timestamp = old.quality, old.timestamp
+                    point.last_poll, point.error = old.last_poll, old.error
+            self.points = points
+            self.devices = device_info
+            self.decoders = decoders
+            self._schedule = [(now, key) for key in points]
+            heapq.heapify(self._schedule)
+        self._wakeup.set()
+        logger.info(f"Poller configured with {len(points)} points on {len(device_info)} devices")
+
+    def add_listener(self, callback: Callable[[int, str, int, list, Optional[str]], None]):
+        """Подписаться на результаты чтения блоков: callback(slave_id, type, start, data, bus)"""
+        self.listeners.append(callback)
+
+    def add_change_listener(self, callback: Callable[[List[Dict[str, Any]]], None]):
+        """
+        Подписаться на изменения значений: callback([{device_id, name, value, quality, timestamp}])
+
+        Вызывается после чтения блока только для точек, у которых изменилось
+        значение или качество.
+        """
+        self.change_listeners.append(callback)
+
+    def set_master(self, rtu_master):
+        """Заменить RTU мастер (например, после переподключения)"""
+        self.rtu_master = rtu_master
+        self._wakeup.set()
+
+    def start(self) -> bool:
+        """Запуск фонового опроса"""
+        if self.running:
+            return True
+        self._stop_event.clear()
+        self.poll_thread = threading.Thread(target=self._run, name='modbus-poller', daemon=True)
+        self.running = True
+        self.poll_thread.start()
+        logger.info("Started Modbus poller")
+        return True
+
+    def stop(self):
+        """Остановка фонового опроса"""
+        self.running = False
+        self._stop_event.set()
+        self._wakeup.set()
+        if self.poll_thread and self.poll_thread is not threading.current_thread():
+            self.poll_thread.join(timeout=5)
+        self.poll_thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        logger.info("Stopped Modbus poller")
+
+    def _run(self):
+        """Основной цикл опроса"""
+        while not self._stop_event.is_set():
+            try:
+                delay = self.poll_due()
+            except Exception as e:
+                logger.error(f"Poller error: {e}")
+                delay = self.default_interval
+            self._wakeup.wait(timeout=delay)
+            self._wakeup.clear()
+
+    def poll_due(self, now: Optional[float] = None) -> float:
+        """
+        Опросить все точки, срок опроса которых наступил
+
+        Returns:
+            Время в секундах до следующего запланированного опроса
+        """
+        now = time.monotonic() if now is None else now
+        due = []
+        with self.lock:
+            while self._schedule and self._schedule[0][0] <= now:
+                _, key = heapq.heappop(self._schedule)
+                if key in self.points:
+                    due.append(self.points[key])
+
+        if due:
+            self._poll_points(due)
+            self.cycles += 1
+
+        with self.lock:
+            finished = time.monotonic()
+            for point in due:
+                if self.points.get(point.key) is point:
+                    heapq.heappush(self._schedule, (finished + point.interval, point.key))
+            if not self._schedule:
+                return self.default_interval
+            return max(0.0, self._schedule[0][0] - time.monotonic())
+
+    def _poll_points(self, points: List[PollPoint]):
+        """Прочитать значения точек, объединяя соседние адреса; линии опрашиваются параллельно"""
+        master = self.rtu_master
+        blocks = plan_reads(points, self.max_gap, self.max_bit_gap)
+        if not hasattr(master, 'bus_for'):
+            groups = [(master, blocks)]
+        else:
+            # Линия блока - поле bus устройства или маршрут slave_id
+            by_bus: Dict[Any, list] = {}
+            for block in blocks:
+                by_bus.setdefault(block.bus or master.bus_for(block.slave_id), []).append(block)
+            groups = [(master.resolve(group[0].slave_id, bus), group) for bus, group in by_bus.items()]
+
+        if len(groups) > 1:
+            if self._executor is None or self._executor_size < len(groups):
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = ThreadPoolExecutor(max_workers=len(groups),
+                                                    thread_name_prefix='modbus-poller-bus')
+                self._executor_size = len(groups)
+            results = list(self._executor.map(lambda g: self._read_blocks(*g), groups))
+        else:
+            results = [self._read_blocks(line, group) for line, group in groups]
+
+        for frames, errors in results:
+            self.frames += frames
+            self.errors += errors
+
+    def _read_blocks(self, master, blocks) -> tuple:
+        """Прочитать блоки одной линии; возвращает (число запросов, число ошибок)"""
+        frames = errors = 0
+        with bus_context(priority=BusPriority.POLL):
+            for block in blocks:
+                if master is None:
+                    now = time.time()
+                    for point in block.items:
+                        point.fail("RTU not initialized", now)
+                    continue
+                read = getattr(master, READ_METHODS[block.type])
+                result = read(block.slave_id, block.start, block.quantity, use_cache=False)
+                frames += 1
+                now = time.time()
+                data = result.get('data') if result.get('success') else None
+                values = self._decode_block(block, data) if data is not None else {}
+                if data is not None:
+                    self._notify(block, data)
+                changed = []
+                for point in block.items:
+                    before = (point.value, point.quality)
+                    offset = block.offset(point.address)
+                    device_values = values.get(point.device_id, {})
+                    if data is not None and point.name in device_values:
+                        raw = data[offset] if point.count == 1 else list(data[offset:offset + point.count])
+                        point.update(raw, device_values[point.name], now)
+                    else:
+                        errors += 1
+                        point.fail(result.get('error', 'Empty response'), now)
+                    if (point.value, point.quality) != before:
+                        changed.append(point)
+                if changed and self.change_listeners:
+                    self._notify_changes(changed)
+        return frames, errors
+
+    def _notify_changes(self, points: List[PollPoint]):
+        changes = [{
+            "device_id": point.device_id,
+            "name": point.name,
+            "value": point.value,
+            "quality": point.quality,
+            "timestamp": point.timestamp
+        } for point in points]
+        for listener in self.change_listeners:
+            try:
+                listener(changes)
+            except Exception as e:
+                logger.error(f"Poll change listener error: {e}")
+
+    def _notify(self, block, data):
+        for listener in self.listeners:
+            try:
+                listener(block.slave_id, block.type, block.start, data, block.bus)
+            except Exception as e:
+                logger.error(f"Poll listener error: {e}")
+
+    def _decode_block(self, block, data) -> Dict[Any, Dict[str, Any]]:
+        """Преобразовать результат чтения блока в значения точек за один проход по устройствам"""
+        values = {}
+        for device_id in {point.device_id for point in block.items}:
+            decoder = self.decoders.get(device_id)
+            if decoder is not None:
+                values[device_id] = decoder.decode(TABLES[block.type], block.start, data)
+        return values
+
+    def get_plan(self) -> Dict[str, Any]:
+        """Получить план полного цикла опроса (все точки)"""
+        with self.lock:
+            points = list(self.points.values())
+        return describe_plan(plan_reads(points, self.max_gap, self.max_bit_gap))
+
+    def get_snapshot(self) -> Dict[str, Any]:
+        """Получить последние значения всех устройств"""
+        now = time.time()
+        snapshot = {}
+        with self.lock:
+            for device_id, info in self.devices.items():
+                snapshot[str(device_id)] = {
+                    "name": info["name"],
+                    "slave_id": info["slave_id"],
+                    "points": {}
+                }
+            for point in self.points.values():
+                stale_after = point.interval * self.stale_factor
+                snapshot[str(point.device_id)]["points"][point.name] = point.to_dict(now, stale_after)
+        return snapshot
+
+    def get_device_values(self, device_id) -> Optional[Dict[str, Any]]:
+        """Получить инженерные значения устройства по именам (None - устройство не опрашивается)"""
+        now = time.time()
+        with self.lock:
+            info = self.devices.get(device_id)
+            if info is None:
+                return None
+            values = {}
+            for point in self.points.values():
+                if point.device_id != device_id:
+                    continue
+                data = point.to_dict(now, point.interval * self.stale_factor)
+                values[point.name] = {
+                    "value": data["value"],
+                    "quality": data["quality"],
+                    "timestamp": data["timestamp"]
+                }
+        return {
+            "id": device_id,
+            "name": info["name"],
+            "slave_id": info["slave_id"],
+            "values": values
+        }
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получить статус опросчика"""
+        return {
+            "running": self.running,
+            "points": len(self.points),
+            "devices": len(self.devices),
+            "cycles": self.cycles,
+            "frames": self.frames,
+            "errors": self.errors
+        }
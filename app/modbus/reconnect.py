@@ -0,0 +1,151 @@
+"""
+Reconnect Supervisor - автоматическое переподключение RTU линий после потери связи
+"""
+import logging
+import random
+import threading
+import time
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _LinkState:
+    """Состояние переподключения одной линии"""
+
+    def __init__(self, master):
+        self.master = master
+        self.failures = 0           # неудачных попыток подряд
+        self.next_attempt = 0.0
+        self.attempts = 0
+        self.reconnects = 0
+        self.last_error_time = None
+
+
+class ReconnectSupervisor:
+    """
+    Фоновый поток, который следит за состоянием линий и переподключает потерянные
+
+    Переподключение выполняется только в потоке супервизора: пока линия не
+    восстановлена, запросы к ней сразу получают "Not connected" и не ждут.
+    Линии, отключенные вручную (disconnect), не переподключаются.
+    """
+
+    def __init__(self, buses, interval: float = 5.0, max_interval: float = 60.0,
+                 jitter: float = 0.2, check_interval: float = 1.0):
+        """
+        Инициализация супервизора
+
+        Args:
+            buses: RTUBusManager с линиями
+            interval: Пауза перед второй попыткой переподключения в секундах (первая - сразу)
+            max_interval: Максимальная пауза между попытками
+            jitter: Доля случайного уменьшения паузы (0.2 - до 20%)
+            check_interval: Период проверки состояния линий
+        """
+        self.buses = buses
+        self.interval = interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.check_interval = check_interval
+        self.links: Dict[str, _LinkState] = {}
+        self.running = False
+        self.thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        """Запуск супервизора"""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='rtu-reconnect', daemon=True)
+        self.thread.start()
+        logger.info("Started RTU reconnect supervisor")
+
+    def stop(self):
+        """Остановка супервизора"""
+        self.running = False
+        self._stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+        self.thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                delay = self.check()
+            except Exception as e:
+                logger.error(f"Reconnect supervisor error: {e}")
+                delay = self.check_interval
+            self._stop_event.wait(timeout=delay)
+
+    def backoff(self, failures: int) -> float:
+        """Пауза после failures неудачных попыток: экспоненциальный рост со случайным разбросом"""
+        delay = min(self.max_interval, self.interval * (2 ** max(0, failures - 1)))
+        return delay * (1 - self.jitter * random.random())
+
+    def check(self, now: Optional[float] = None) -> float:
+        """
+        Проверить линии и переподключить потерянные, срок попытки для которых наступил
+
+        Returns:
+            Время в секундах до следующей проверки
+        """
+        now = time.monotonic() if now is None else now
+        wait = self.check_interval
+        for name, master in list(self.buses.buses.items()):
+            state = self.links.get(name)
+            if state is None or state.master is not master:
+                state = self.links[name] = _LinkState(master)
+
+            if master.connected or not getattr(master, 'keep_connected', True):
+                if state.failures:
+                    state.failures = 0
+                state.next_attempt = 0.0
+                continue
+
+            if now < state.next_attempt:
+                wait = min(wait, state.next_attempt - now)
+                continue
+
+            state.attempts += 1
+            try:
+                success = master.reconnect()
+            except Exception as e:
+                logger.error(f"Error reconnecting RTU bus '{name}': {e}")
+                success = False
+            if success:
+                logger.info(f"RTU bus '{name}' reconnected after {state.failures + 1} attempt(s)")
+                state.reconnects += 1
+                state.failures = 0
+                state.next_attempt = 0.0
+            else:
+                state.failures += 1
+                state.last_error_time = time.time()
+                delay = self.backoff(state.failures)
+                state.next_attempt = now + delay
+                wait = min(wait, delay)
+                logger.warning(f"RTU bus '{name}' reconnect failed, next attempt in {delay:.1f}s")
+        for name in list(self.links):
+            if name not in self.buses.buses:
+                del self.links[name]
+        return max(0.0, wait)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получить состояние переподключения линий"""
+        now = time.monotonic()
+        buses = {}
+        for name, state in list(self.links.items()):
+            buses[name] = {
+                "connected": bool(state.master.connected),
+                "failures": state.failures,
+                "attempts": state.attempts,
+                "reconnects": state.reconnects,
+                "next_attempt_in": round(max(0.0, state.next_attempt - now), 1) if state.failures else None,
+                "last_error_time": state.last_error_time
+            }
+        return {
+            "running": self.running,
+            "buses": buses
+        }
@@ -0,0 +1,153 @@
+"""
+Register Cache - кэш результатов чтения Modbus с TTL и LRU вытеснением
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+from app.modbus.payload import BIT_FUNCTIONS, pack_registers, pack_bits, unpack_bits, set_bit
+
+# Функции записи -> функция чтения, кэш которой они затрагивают
+WRITE_TARGETS = {
+    'coil': 'coils',
+    'coils': 'coils',
+    'register': 'holding_registers',
+    'registers': 'holding_registers',
+}
+
+DEFAULT_TTL = {
+    'coils': 0.5,
+    'discrete_inputs': 0.5,
+    'holding_registers': 1.0,
+    'input_registers': 0.5,
+}
+
+# Примерные накладные расходы на одну запись кэша в байтах
+ENTRY_OVERHEAD = 200
+
+
+def _pack(function: str, data: List):
+    """Регистры хранятся в array('H'), биты - в битовом поле"""
+    if function in BIT_FUNCTIONS:
+        return pack_bits(data)
+    return pack_registers(data)
+
+
+def _unpack(function: str, packed, offset: int, quantity: int) -> List:
+    if function in BIT_FUNCTIONS:
+        return unpack_bits(packed, offset, quantity)
+    return packed[offset:offset + quantity].tolist()
+
+
+class RegisterCache:
+    """Кэш чтений по ключу (slave_id, function, start, quantity)"""
+
+    def __init__(self, ttl: Optional[Dict[str, float]] = None, max_bytes: int = 1024 * 1024):
+        """
+        Инициализация кэша
+
+        Args:
+            ttl: Время жизни записей в секундах для каждого типа чтения
+            max_bytes: Ограничение оценочного объема памяти кэша
+        """
+        self.ttl = dict(DEFAULT_TTL)
+        self.ttl.update(ttl or {})
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[tuple, list]" = OrderedDict()
+        self.ranges: Dict[tuple, set] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _size(function: str, quantity: int) -> int:
+        if function in BIT_FUNCTIONS:
+            return ENTRY_OVERHEAD + (quantity + 7) // 8
+        return ENTRY_OVERHEAD + quantity * 2
+
+    def get(self, slave_id: int, function: str, start: int, quantity: int) -> Optional[List]:
+        """Найти данные в кэше, в том числе внутри большего закэшированного блока"""
+        now = time.monotonic()
+        with self.lock:
+            key = (slave_id, function, start, quantity)
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return _unpack(function, entry[1], 0, quantity)
+                self._remove(key)
+
+            for other in self.ranges.get((slave_id, function), ()):
+                other_start, other_quantity = other[2], other[3]
+                if other_start <= start and start + quantity <= other_start + other_quantity:
+                    entry = self.entries[other]
+                    if entry[0] > now:
+                        self.entries.move_to_end(other)
+                        self.hits += 1
+                        return _unpack(function, entry[1], start - other_start, quantity)
+
+            self.misses += 1
+            return None
+
+    def put(self, slave_id: int, function: str, start: int, quantity: int, data: List):
+        """Сохранить результат чтения"""
+        ttl = self.ttl.get(function, 0)
+        if ttl <= 0:
+            return
+        key = (slave_id, function, start, quantity)
+        size = self._size(function, quantity)
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = [time.monotonic() + ttl, _pack(function, data[:quantity]), size]
+            self.ranges.setdefault((slave_id, function), set()).add(key)
+            self.bytes += size
+            while self.bytes > self.max_bytes and self.entries:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def apply_write(self, slave_id: int, write_function: str, start: int, values: List):
+        """Обновить закэшированные диапазоны, пересекающиеся с успешной записью"""
+        function = WRITE_TARGETS.get(write_function)
+        if function is None:
+            return
+        end = start + len(values)
+        with self.lock:
+            for key in self.ranges.get((slave_id, function), ()):
+                entry_start, entry_end = key[2], key[2] + key[3]
+                if entry_start < end and start < entry_end:
+                    packed = self.entries[key][1]
+                    for address in range(max(start, entry_start), min(end, entry_end)):
+                        value = values[address - start]
+                        if function in BIT_FUNCTIONS:
+                            set_bit(packed, address - entry_start, value)
+                        else:
+                            packed[address - entry_start] = int(value)
+
+    def invalidate(self, slave_id: Optional[int] = None):
+        """Сбросить кэш целиком или для одного slave"""
+        with self.lock:
+            for key in [k for k in self.entries if slave_id is None or k[0] == slave_id]:
+                self._remove(key)
+
+    def _remove(self, key: tuple):
+        entry = self.entries.pop(key)
+        self.bytes -= entry[2]
+        keys = self.ranges.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.ranges[key[:2]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Получить статистику кэша"""
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
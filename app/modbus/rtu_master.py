@@ -2,19 +2,34 @@
 Modbus RTU Master - взаимодействие с RTU устройствами через последовательный порт
 """
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pymodbus.client import ModbusSerialClient
-from pymodbus.exceptions import ModbusException
+from pymodbus.exceptions import ModbusException, ConnectionException
+from app.modbus.register_cache import RegisterCache
+from app.modbus.single_flight import SingleFlight
+from app.modbus.bus_scheduler import BusScheduler, BusPriority, current_priority, DEADLINE_EXCEEDED
+from app.modbus.slave_health import SlaveHealthTracker
+from app.modbus.write_batcher import WriteBatcher
+from app.modbus.discovery import SlaveDiscovery
+from concurrent.futures import Future
 import threading
 import time
 
 logger = logging.getLogger(__name__)
 
+BIT_FUNCTIONS = ('coils', 'discrete_inputs')
+
+SLAVE_UNAVAILABLE = "Slave {} is unavailable (circuit open)"
+
 
 class ModbusRTUMaster:
     """Клиент для работы с Modbus RTU устройствами"""
     
-    def __init__(self, port: str, baudrate: int = 9600, timeout: int = 1):
+    def __init__(self, port: str, baudrate: int = 9600, timeout: int = 1,
+                 cache: Optional[RegisterCache] = None,
+                 health: Optional[SlaveHealthTracker] = None,
+                 write_batch_window: float = 0.0,
+                 discovery: Optional[Dict[str, Any]] = None):
         """
         Инициализация Modbus RTU мастера
         
@@ -22,16 +37,29 @@ class ModbusRTUMaster:
             port: Последовательный порт (/dev/ttyUSB0, COM3 и т.д.)
             baudrate: Скорость передачи
             timeout: Таймаут ответа в секундах
+            cache: Кэш результатов чтения (None - кэширование выключено)
+            health: Трекер времени отклика и доступности slave устройств
+            write_batch_window: Окно объединения одиночных записей в секундах (0 - выключено)
+            discovery: Параметры обнаружения устройств (probe_timeout, probe_function, probe_address)
         """
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
         self.client = None
         self.connected = False
-        self.lock = threading.Lock()
+        self.keep_connected = False     # False после ручного отключения - не переподключать
+        # Начатая транзакция: ответ и до 3 повторов pymodbus
+        self.scheduler = BusScheduler(name=port, transaction_timeout=timeout * 4)
+        self.cache = cache
+        self.single_flight = SingleFlight()
+        self.health = health or SlaveHealthTracker(base_timeout=timeout)
+        self.batcher = WriteBatcher(self._write, write_batch_window, self.scheduler.transaction_timeout) \
+            if write_batch_window > 0 else None
+        self.discovery = SlaveDiscovery(self, **(discovery or {}))
         
     def connect(self) -> bool:
         """Подключение к RTU устройствам"""
+        self.keep_connected = True
         try:
             self.client = ModbusSerialClient(
                 method='rtu',
@@ -49,145 +77,303 @@ class ModbusRTUMaster:
             logger.error(f"Error connecting to Modbus RTU: {e}")
             return False
     
+    def reconnect(self) -> bool:
+        """
+        Переоткрыть порт после потери связи
+        
+        Вызывается супервизором переподключения; пока порт открывается, connected = False
+        и запросы сразу завершаются ошибкой, не дожидаясь порта. Порт закрывается и
+        открывается заявкой шины с наивысшим приоритетом - между транзакциями, а не
+        посреди начатой в рабочем потоке.
+        """
+        self.connected = False
+        return self.scheduler.run(self._reopen, BusPriority.WRITE) is True
+
+    def _reopen(self) -> bool:
+        """Закрыть старый клиент и подключиться заново (выполняется в рабочем потоке шины)"""
+        old_client = self.client
+        if old_client:
+            try:
+                old_client.close()
+            except Exception as e:
+                logger.debug(f"Error closing RTU client on {self.port}: {e}")
+        return self.connect()
+    
+    def _link_lost(self, error: Exception):
+        """Отметить потерю связи с адаптером (порт закрыт или устройство пропало)"""
+        if self.connected:
+            logger.warning(f"Lost connection to Modbus RTU on {self.port}: {error}")
+        self.connected = False
+        if self.cache is not None:
+            self.cache.invalidate()
+    
     def disconnect(self):
         """Отключение от RTU устройств"""
+        self.keep_connected = False
+        self.discovery.cancel()
         if self.client:
             self.client.close()
             self.connected = False
+            self.scheduler.stop()
+            if self.cache is not None:
+                self.cache.invalidate()
             logger.info("Disconnected from Modbus RTU")
     
-    def read_coils(self, slave_id: int, start_addr: int, quantity: int) -> Dict[str, Any]:
+    def read_coils(self, slave_id: int, start_addr: int, quantity: int,
+                   use_cache: bool = True) -> Dict[str, Any]:
         """Чтение дискретных выходов (катушек)"""
-        with self.lock:
-            try:
-                if not self.connected:
-                    return {"success": False, "error": "Not connected"}
-                
-                result = self.client.read_coils(start_addr, quantity, slave_id=slave_id)
-                if hasattr(result, 'bits'):
-                    return {"success": True, "data": result.bits}
-                else:
-                    return {"success": False, "error": str(result)}
-            except Exception as e:
-                logger.error(f"Error reading coils: {e}")
-                return {"success": False, "error": str(e)}
+        return self._read('coils', slave_id, start_addr, quantity, use_cache)
     
-    def read_discrete_inputs(self, slave_id: int, start_addr: int, quantity: int) -> Dict[str, Any]:
+    def read_discrete_inputs(self, slave_id: int, start_addr: int, quantity: int,
+                             use_cache: bool = True) -> Dict[str, Any]:
         """Чтение дискретных входов"""
-        with self.lock:
-            try:
-                if not self.connected:
-                    return {"success": False, "error": "Not connected"}
-                
-                result = self.client.read_discrete_inputs(start_addr, quantity, slave_id=slave_id)
-                if hasattr(result, 'bits'):
-                    return {"success": True, "data": result.bits}
-                else:
-                    return {"success": False, "error": str(result)}
-            except Exception as e:
-                logger.error(f"Error reading discrete inputs: {e}")
-                return {"success": False, "error": str(e)}
+        return self._read('discrete_inputs', slave_id, start_addr, quantity, use_cache)
     
-    def read_holding_registers(self, slave_id: int, start_addr: int, quantity: int) -> Dict[str, Any]:
+    def read_holding_registers(self, slave_id: int, start_addr: int, quantity: int,
+                               use_cache: bool = True) -> Dict[str, Any]:
         """Чтение регистров удержания"""
-        with self.lock:
-            try:
-                if not self.connected:
-                    return {"success": False, "error": "Not connected"}
-                
-                result = self.client.read_holding_registers(start_addr, quantity, slave_id=slave_id)
-                if hasattr(result, 'registers'):
-                    return {"success": True, "data": result.registers}
-                else:
-                    return {"success": False, "error": str(result)}
-            except Exception as e:
-                logger.error(f"Error reading holding registers: {e}")
-                return {"success": False, "error": str(e)}
+        return self._read('holding_registers', slave_id, start_addr, quantity, use_cache)
     
-    def read_input_registers(self, slave_id: int, start_addr: int, quantity: int) -> Dict[str, Any]:
+    def read_input_registers(self, slave_id: int, start_addr: int, quantity: int,
+                             use_cache: bool = True) -> Dict[str, Any]:
         """Чтение входных регистров"""
-        with self.lock:
-            try:
-                if not self.connected:
-                    return {"success": False, "error": "Not connected"}
-                
-                result = self.client.read_input_registers(start_addr, quantity, slave_id=slave_id)
-                if hasattr(result, 'registers'):
-                    return {"success": True, "data": result.registers}
-                else:
-                    return {"success": False, "error": str(result)}
-            except Exception as e:
-                logger.error(f"Error reading input registers: {e}")
-                return {"success": False, "error": str(e)}
+        return self._read('input_registers', slave_id, start_addr, quantity, use_cache)
     
     def write_coil(self, slave_id: int, addr: int, value: bool) -> Dict[str, Any]:
         """Запись одной катушки"""
-        with self.lock:
-            try:
-                if not self.connected:
-                    return {"success": False, "error": "Not connected"}
-                
-                result = self.client.write_coil(addr, value, slave_id=slave_id)
-                if hasattr(result, 'function_code'):
-                    return {"success": True}
-                else:
-                    return {"success": False, "error": str(result)}
-            except Exception as e:
-                logger.error(f"Error writing coil: {e}")
-                return {"success": False, "error": str(e)}
+        if self.batcher is not None and self.connected:
+            return self.batcher.submit('coil', slave_id, addr, value)
+        return self._write('coil', slave_id, addr, value)
     
     def write_register(self, slave_id: int, addr: int, value: int) -> Dict[str, Any]:
         """Запись одного регистра"""
-        with self.lock:
-            try:
-                if not self.connected:
-                    return {"success": False, "error": "Not connected"}
-                
-                result = self.client.write_register(addr, value, slave_id=slave_id)
-                if hasattr(result, 'function_code'):
-                    return {"success": True}
-                else:
-                    return {"success": False, "error": str(result)}
-            except Exception as e:
-                logger.error(f"Error writing register: {e}")
-                return {"success": False, "error": str(e)}
+        if self.batcher is not None and self.connected:
+            return self.batcher.submit('register', slave_id, addr, value)
+        return self._write('register', slave_id, addr, value)
     
     def write_coils(self, slave_id: int, start_addr: int, values: List[bool]) -> Dict[str, Any]:
         """Запись нескольких катушек"""
-        with self.lock:
-            try:
-                if not self.connected:
-                    return {"success": False, "error": "Not connected"}
-                
-                result = self.client.write_coils(start_addr, values, slave_id=slave_id)
-                if hasattr(result, 'function_code'):
-                    return {"success": True}
-                else:
-                    return {"success": False, "error": str(result)}
-            except Exception as e:
-                logger.error(f"Error writing coils: {e}")
-                return {"success": False, "error": str(e)}
+        return self._write('coils', slave_id, start_addr, values)
     
     def write_registers(self, slave_id: int, start_addr: int, values: List[int]) -> Dict[str, Any]:
         """Запись нескольких регистров"""
-        with self.lock:
-            try:
-                if not self.connected:
-                    return {"success": False, "error": "Not connected"}
-                
-                result = self.client.write_registers(start_addr, values, slave_id=slave_id)
-                if hasattr(result, 'function_code'):
-                    return {"success": True}
+        return self._write('registers', slave_id, start_addr, values)
+    
+    def _read(self, function: str, slave_id: int, start_addr: int, quantity: int,
+              use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Выполнить чтение через кэш (если включен) или по шине
+        
+        Args:
+            function: Тип чтения (coils, discrete_inputs, holding_registers, input_registers)
+            use_cache: False - всегда читать по шине (результат все равно попадет в кэш)
+        """
+        if use_cache and self.cache is not None and self.connected:
+            data = self.cache.get(slave_id, function, start_addr, quantity)
+            if data is not None:
+                return {"success": True, "data": data}
+        
+        # Одновременные одинаковые (или вложенные) чтения разделяют одну транзакцию
+        priority = current_priority(BusPriority.READ)
+        return self.single_flight.do(
+            slave_id, function, start_addr, quantity,
+            lambda: self._read_bus(function, slave_id, start_addr, quantity, priority),
+            priority
+        )
+    
+    def _read_bus(self, function: str, slave_id: int, start_addr: int, quantity: int,
+                  priority: int = BusPriority.READ) -> Dict[str, Any]:
+        """Поставить транзакцию чтения в очередь шины и дождаться результата"""
+        if not self.connected:
+            return {"success": False, "error": "Not connected"}
+        if self.health.is_open(slave_id):
+            return {"success": False, "error": SLAVE_UNAVAILABLE.format(slave_id)}
+        return self.scheduler.run(
+            lambda: self._do_read(function, slave_id, start_addr, quantity),
+            priority
+        )
+    
+    def _do_read(self, function: str, slave_id: int, start_addr: int, quantity: int) -> Dict[str, Any]:
+        """Транзакция чтения (выполняется в рабочем потоке шины)"""
+        try:
+            if not self.connected:
+                return {"success": False, "error": "Not connected"}
+            if not self.health.allow(slave_id):
+                return {"success": False, "error": SLAVE_UNAVAILABLE.format(slave_id)}
+            
+            result = self._execute(slave_id, getattr(self.client, 'read_' + function), start_addr, quantity)
+            attr = 'bits' if function in BIT_FUNCTIONS else 'registers'
+            if hasattr(result, attr):
+                # Биты в ответе дополнены до кратного 8 количества
+                data = getattr(result, attr)[:quantity]
+                if self.cache is not None:
+                    self.cache.put(slave_id, function, start_addr, quantity, data)
+                return {"success": True, "data": data}
+            else:
+                return {"success": False, "error": str(result)}
+        except Exception as e:
+            logger.error(f"Error reading {function.replace('_', ' ')}: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def _write(self, function: str, slave_id: int, addr: int, value: Any) -> Dict[str, Any]:
+        """
+        Поставить запись в очередь шины с приоритетом пользовательской команды
+        
+        Args:
+            function: Тип записи (coil, register, coils, registers)
+        """
+        if not self.connected:
+            return {"success": False, "error": "Not connected"}
+        if self.health.is_open(slave_id):
+            return {"success": False, "error": SLAVE_UNAVAILABLE.format(slave_id)}
+        return self.scheduler.run(
+            lambda: self._do_write(function, slave_id, addr, value),
+            current_priority(BusPriority.WRITE)
+        )
+    
+    def _do_write(self, function: str, slave_id: int, addr: int, value: Any) -> Dict[str, Any]:
+        """Транзакция записи (выполняется в рабочем потоке шины)"""
+        try:
+            if not self.connected:
+                return {"success": False, "error": "Not connected"}
+            if not self.health.allow(slave_id):
+                return {"success": False, "error": SLAVE_UNAVAILABLE.format(slave_id)}
+            
+            result = self._execute(slave_id, getattr(self.client, 'write_' + function), addr, value)
+            if hasattr(result, 'function_code'):
+                if self.cache is not None:
+                    values = value if isinstance(value, (list, tuple)) else [value]
+                    self.cache.apply_write(slave_id, function, addr, values)
+                return {"success": True}
+            else:
+                return {"success": False, "error": str(result)}
+        except Exception as e:
+            logger.error(f"Error writing {function}: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def submit_batch(self, operations: List[tuple], priority: Optional[int] = None,
+                     deadline: Optional[float] = None) -> Future:
+        """
+        Поставить несколько транзакций в очередь шины одной заявкой
+        
+        Транзакции выполняются подряд в рабочем потоке шины, другие заявки между ними
+        не вклиниваются. Чтения сначала ищутся в кэше. Транзакции, не начатые до
+        крайнего срока, не выполняются.
+        
+        Args:
+            operations: [(function, slave_id, addr, quantity или value)],
+                        function - read_<тип чтения> или write_<тип записи>
+            priority: Класс приоритета заявки (по умолчанию - чтение)
+            deadline: Крайний срок по time.monotonic()
+        
+        Returns:
+            Future со списком результатов в порядке operations
+            (или одним результатом с ошибкой, если заявка отброшена планировщиком)
+        """
+        if not self.connected:
+            future = Future()
+            future.set_result([{"success": False, "error": "Not connected"} for _ in operations])
+            return future
+        if priority is None:
+            priority = current_priority(BusPriority.READ)
+        return self.scheduler.submit(lambda: self._do_batch(operations, deadline), priority, deadline)
+    
+    def _do_batch(self, operations: List[tuple], deadline: Optional[float]) -> List[Dict[str, Any]]:
+        """Пакет транзакций (выполняется в рабочем потоке шины)"""
+        results = []
+        for function, slave_id, addr, arg in operations:
+            if deadline is not None and time.monotonic() > deadline:
+                results.append({"success": False, "error": DEADLINE_EXCEEDED})
+            elif function.startswith('read_'):
+                function = function[5:]
+                data = self.cache.get(slave_id, function, addr, arg) if self.cache is not None else None
+                if data is not None:
+                    results.append({"success": True, "data": data})
                 else:
-                    return {"success": False, "error": str(result)}
-            except Exception as e:
-                logger.error(f"Error writing registers: {e}")
-                return {"success": False, "error": str(e)}
+                    results.append(self._do_read(function, slave_id, addr, arg))
+            else:
+                results.append(self._do_write(function[6:], slave_id, addr, arg))
+        return results
+    
+    def probe(self, slave_id: int, call: str, *args, timeout: float = 0.1) -> Dict[str, Any]:
+        """
+        Пробный запрос для обнаружения устройств
+        
+        Выполняется с приоритетом обнаружения, коротким таймаутом и без повторов;
+        не учитывается в статистике slave и не влияет на автомат защиты.
+        
+        Args:
+            call: Метод клиента pymodbus (read_holding_registers, read_device_information и т.д.)
+            timeout: Таймаут ответа в секундах
+        
+        Returns:
+            {"success": True, "response": ответ pymodbus} или {"success": False, "error": ...}
+        """
+        if not self.connected:
+            return {"success": False, "error": "Not connected"}
+        return self.scheduler.run(
+            lambda: self._do_probe(slave_id, call, args, timeout),
+            current_priority(BusPriority.DISCOVERY)
+        )
+    
+    def _do_probe(self, slave_id: int, call: str, args: tuple, timeout: float) -> Dict[str, Any]:
+        """Пробная транзакция (выполняется в рабочем потоке шины)"""
+        if not self.connected:
+            return {"success": False, "error": "Not connected"}
+        params = getattr(self.client, 'params', None)
+        retries = getattr(params, 'retries', None)
+        try:
+            if params is not None:
+                params.timeout = timeout
+                params.retries = 0
+            result = getattr(self.client, call)(*args, slave=slave_id)
+        except (ConnectionException, OSError) as e:
+            self._link_lost(e)
+            return {"success": False, "error": str(e)}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        finally:
+            if params is not None and retries is not None:
+                params.retries = retries
+        if hasattr(result, 'function_code'):
+            return {"success": True, "response": result}
+        return {"success": False, "error": str(result)}
+    
+    def _execute(self, slave_id: int, call, *args):
+        """Вызвать метод клиента с адаптивным таймаутом slave и учесть результат в статистике"""
+        if hasattr(self.client, 'params'):
+            self.client.params.timeout = self.health.timeout_for(slave_id)
+        started = time.monotonic()
+        try:
+            result = call(*args, slave=slave_id)
+        except (ConnectionException, OSError) as e:
+            # Проблема с портом, а не с устройством - неответ не засчитывается,
+            # только освобождается пробная транзакция недоступного slave
+            self._link_lost(e)
+            self.health.release_probe(slave_id)
+            raise
+        except Exception:
+            self.health.record_failure(slave_id)
+            raise
+        # Ответ с исключением Modbus тоже означает, что устройство на связи
+        if hasattr(result, 'function_code'):
+            self.health.record_success(slave_id, time.monotonic() - started)
+        else:
+            self.health.record_failure(slave_id)
+        return result
     
     def get_status(self) -> Dict[str, Any]:
         """Получить статус соединения"""
-        return {
+        status = {
             "connected": self.connected,
             "port": self.port,
             "baudrate": self.baudrate
         }
+        status["coalescing"] = self.single_flight.get_stats()
+        status["queue"] = self.scheduler.get_stats()
+        status["slaves"] = self.health.get_status()
+        if self.batcher is not None:
+            status["write_batching"] = self.batcher.get_stats()
+        if self.cache is not None:
+            status["cache"] = self.cache.get_stats()
+        return status
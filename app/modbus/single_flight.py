@@ -0,0 +1,109 @@
+"""
+Single Flight - объединение одновременных одинаковых чтений в одну транзакцию на шине
+"""
+import threading
+from typing import Dict, Any, Callable, List, Optional
+from app.modbus.bus_scheduler import current_deadline, remaining_time, DEADLINE_EXCEEDED
+
+
+class _Flight:
+    """Выполняющееся чтение, результат которого могут разделить другие вызовы"""
+
+    def __init__(self, start: int, quantity: int, priority: Optional[int] = None,
+                 deadline: Optional[float] = None):
+        self.start = start
+        self.quantity = quantity
+        self.priority = priority
+        self.deadline = deadline
+        self.event = threading.Event()
+        self.result: Dict[str, Any] = None
+        self.waiters = 0
+
+    def contains(self, start: int, quantity: int) -> bool:
+        return self.start <= start and start + quantity <= self.start + self.quantity
+
+    def can_join(self, priority: Optional[int], deadline: Optional[float]) -> bool:
+        """
+        Присоединиться можно только к транзакции не ниже своего приоритета и с тем
+        же или более поздним крайним сроком: иначе ведущий получит Deadline exceeded
+        раньше, чем истечет срок присоединившегося
+        """
+        if priority is not None and self.priority is not None and self.priority > priority:
+            return False
+        return self.deadline is None or (deadline is not None and self.deadline >= deadline)
+
+
+class SingleFlight:
+    """
+    Первый вызов выполняет транзакцию, а одновременные вызовы с тем же
+    (или вложенным) диапазоном ждут и получают его результат. Вызов не ждет
+    транзакцию более низкого приоритета (чтение API - фоновый опрос): она
+    стоит в очереди шины позади своего класса, - и транзакцию с более ранним
+    крайним сроком (bus_context), которая может быть отброшена до его срока.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights: Dict[tuple, List[_Flight]] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, slave_id: int, function: str, start: int, quantity: int,
+           fn: Callable[[], Dict[str, Any]], priority: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Выполнить чтение или присоединиться к уже выполняющемуся
+
+        Args:
+            fn: Функция, выполняющая чтение по шине и возвращающая результат в формате мастера
+            priority: Класс приоритета BusPriority, с которым fn ставит чтение в очередь
+        """
+        key = (slave_id, function)
+        deadline = current_deadline()
+        with self.lock:
+            for flight in self.flights.get(key, ()):
+                if flight.contains(start, quantity) and flight.can_join(priority, deadline):
+                    flight.waiters += 1
+                    self.shared += 1
+                    leader = False
+                    break
+            else:
+                flight = _Flight(start, quantity, priority, deadline)
+                self.flights.setdefault(key, []).append(flight)
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            # Ожидание чужой транзакции ограничено крайним сроком своего запроса
+            if not flight.event.wait(remaining_time()):
+                return {"success": False, "error": DEADLINE_EXCEEDED}
+            return self._slice(flight, start, quantity)
+
+        try:
+            flight.result = fn()
+        except Exception as e:
+            flight.result = {"success": False, "error": str(e)}
+        finally:
+            with self.lock:
+                flights = self.flights.get(key, [])
+                if flight in flights:
+                    flights.remove(flight)
+                if not flights:
+                    self.flights.pop(key, None)
+            flight.event.set()
+        return flight.result
+
+    @staticmethod
+    def _slice(flight: _Flight, start: int, quantity: int) -> Dict[str, Any]:
+        result = dict(flight.result)
+        data = result.get('data')
+        if data is not None:
+            offset = start - flight.start
+            result['data'] = list(data[offset:offset + quantity])
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Получить статистику объединения чтений"""
+        return {
+            "executed": self.executed,
+            "shared": self.shared
+        }
@@ -0,0 +1,177 @@
+"""
+Slave Health - время отклика slave устройств, адаптивные таймауты и автомат защиты (circuit breaker)
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+
+class BreakerState:
+    """Состояния автомата защиты"""
+    CLOSED = 'closed'          # Устройство отвечает, запросы идут как обычно
+    OPEN = 'open'              # Устройство считается недоступным, запросы отклоняются
+    HALF_OPEN = 'half_open'    # Выполняется пробный запрос
+
+
+class SlaveHealth:
+    """Статистика одного slave устройства"""
+
+    def __init__(self, window: int):
+        self.rtts = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)   # True - ответил, False - нет ответа
+        self.consecutive_failures = 0
+        self.state = BreakerState.CLOSED
+        self.backoff = 0.0
+        self.next_probe = 0.0
+        self.probe_in_flight = False
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.rtts:
+            return None
+        ordered = sorted(self.rtts)
+        index = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+
+class SlaveHealthTracker:
+    """Отслеживание времени отклика и доступности slave устройств одной линии"""
+
+    def __init__(self, base_timeout: float = 1.0, min_timeout: float = 0.05,
+                 timeout_multiplier: float = 3.0, min_samples: int = 10,
+                 failure_threshold: int = 3, backoff_initial: float = 5.0,
+                 backoff_max: float = 300.0, window: int = 100):
+        """
+        Инициализация трекера
+
+        Args:
+            base_timeout: Таймаут по умолчанию и верхняя граница адаптивного таймаута
+            min_timeout: Нижняя граница адаптивного таймаута
+            timeout_multiplier: Таймаут = p99 времени отклика * множитель
+            min_samples: Сколько измерений нужно, прежде чем использовать адаптивный таймаут
+            failure_threshold: Число подряд неответов, после которого slave считается недоступным
+            backoff_initial: Пауза перед первой пробой недоступного slave в секундах
+            backoff_max: Максимальная пауза между пробами
+            window: Размер окна статистики
+        """
+        self.base_timeout = base_timeout
+        self.min_timeout = min_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.min_samples = min_samples
+        self.failure_threshold = failure_threshold
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.window = window
+        self.slaves: Dict[int, SlaveHealth] = {}
+        self.lock = threading.Lock()
+
+    def _get(self, slave_id: int) -> SlaveHealth:
+        health = self.slaves.get(slave_id)
+        if health is None:
+            health = self.slaves[slave_id] = SlaveHealth(self.window)
+        return health
+
+    def timeout_for(self, slave_id: int) -> float:
+        """Таймаут ответа для slave на основе наблюдаемого времени отклика"""
+        with self.lock:
+            health = self.slaves.get(slave_id)
+            if health is None or len(health.rtts) < self.min_samples:
+                return self.base_timeout
+            p99 = health.percentile(99)
+        return max(self.min_timeout, min(self.base_timeout, p99 * self.timeout_multiplier))
+
+    def is_open(self, slave_id: int, now: Optional[float] = None) -> bool:
+        """Slave недоступен и время пробы еще не наступило"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            health = self.slaves.get(slave_id)
+            if health is None or health.state == BreakerState.CLOSED:
+                return False
+            return health.probe_in_flight or now < health.next_probe
+
+    def allow(self, slave_id: int, now: Optional[float] = None) -> bool:
+        """
+        Можно ли выполнить транзакцию с slave
+
+        Для недоступного slave по истечении паузы разрешается ровно одна пробная транзакция.
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            health = self._get(slave_id)
+            if health.state == BreakerState.CLOSED:
+                return True
+            if health.probe_in_flight or now < health.next_probe:
+                return False
+            health.state = BreakerState.HALF_OPEN
+            health.probe_in_flight = True
+            return True
+
+    def record_success(self, slave_id: int, rtt: float):
+        """Slave ответил (в том числе исключением Modbus)"""
+        with self.lock:
+            health = self._get(slave_id)
+            health.rtts.append(rtt)
+            health.outcomes.append(True)
+            health.consecutive_failures = 0
+            health.state = BreakerState.CLOSED
+            health.backoff = 0.0
+            health.probe_in_flight = False
+
+    def record_failure(self, slave_id: int, now: Optional[float] = None):
+        """Slave не ответил"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            health = self._get(slave_id)
+            health.outcomes.append(False)
+            health.consecutive_failures += 1
+            if health.state == BreakerState.HALF_OPEN:
+                health.backoff = min(self.backoff_max, max(self.backoff_initial, health.backoff * 2))
+            elif health.consecutive_failures >= self.failure_threshold:
+                health.backoff = self.backoff_initial
+            else:
+                return
+            health.state = BreakerState.OPEN
+            health.next_probe = now + health.backoff
+            health.probe_in_flight = False
+
+    def release_probe(self, slave_id: int, now: Optional[float] = None):
+        """
+        Пробная транзакция не состоялась из-за потери связи с адаптером
+
+        Неответ не засчитывается: slave остается недоступным, но следующая проба
+        разрешается сразу (после переподключения порта).
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            health = self.slaves.get(slave_id)
+            if health is None or not health.probe_in_flight:
+                return
+            health.state = BreakerState.OPEN
+            health.next_probe = now
+            health.probe_in_flight = False
+
+    def get_status(self) -> Dict[str, Any]:
+        """Получить состояние всех slave устройств"""
+        result = {}
+        with self.lock:
+            slave_ids = sorted(self.slaves)
+        for slave_id in slave_ids:
+            timeout = self.timeout_for(slave_id)
+            with self.lock:
+                health = self.slaves[slave_id]
+                p50, p99 = health.percentile(50), health.percentile(99)
+                result[str(slave_id)] = {
+                    "state": health.state,
+                    "rtt_p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+                    "rtt_p99_ms": round(p99 * 1000, 2) if p99 is not None else None,
+                    "error_rate": round(health.error_rate, 3),
+                    "timeout_ms": round(timeout * 1000, 1),
+                    "consecutive_failures": health.consecutive_failures
+                }
+        return result
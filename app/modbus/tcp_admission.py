@@ -0,0 +1,285 @@
+"""
+TCP Admission - ограничение соединений, скорости запросов и очереди клиентов Modbus TCP сервера
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Any, Optional
+from pymodbus.server.async_io import ModbusConnectedRequestHandler
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Бюджет запросов клиента: rate запросов в секунду с запасом burst
+
+    Баланс может уйти в минус (несколько запросов в одном пакете) - тогда
+    следующее чтение от клиента откладывается, пока долг не будет погашен.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def consume(self, amount: float = 1.0, now: Optional[float] = None):
+        self._refill(time.monotonic() if now is None else now)
+        self.tokens -= amount
+
+    def delay(self, now: Optional[float] = None) -> float:
+        """Сколько ждать, пока баланс станет положительным"""
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens >= 1 or self.rate <= 0:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class ClientStats:
+    """Статистика одного клиента (IP адреса)"""
+
+    def __init__(self, rate: float, burst: float):
+        self.connections = 0
+        self.total_connections = 0
+        self.rejected = 0
+        self.requests = 0
+        self.pipelined = 0
+        self.max_inflight = 0
+        self.throttled = 0
+        self.throttle_time = 0.0
+        self.paused = 0
+        self.idle_closed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.last_activity = None
+        self.bucket = TokenBucket(rate, burst) if rate > 0 else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "connections": self.connections,
+            "total_connections": self.total_connections,
+            "rejected_connections": self.rejected,
+            "requests": self.requests,
+            "pipelined": self.pipelined,
+            "max_inflight": self.max_inflight,
+            "throttled": self.throttled,
+            "throttle_time": round(self.throttle_time, 3),
+            "paused": self.paused,
+            "idle_closed": self.idle_closed,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "last_activity": self.last_activity
+        }
+
+
+class AdmissionController:
+    """Лимиты TCP сервера и статистика клиентов"""
+
+    def __init__(self, max_connections: int = 10, max_connections_per_client: int = 0,
+                 rate_limit: float = 0.0, rate_burst: float = 0.0, idle_timeout: float = 0.0,
+                 max_pending_bytes: int = 65536, max_pipeline: int = 16,
+                 max_clients_tracked: int = 1024):
+        """
+        Инициализация
+
+        Args:
+            max_connections: Максимум одновременных соединений (0 - без ограничения)
+            max_connections_per_client: Максимум соединений с одного IP (0 - без ограничения)
+            rate_limit: Запросов в секунду на клиента (0 - без ограничения)
+            rate_burst: Допустимая пачка запросов сверх rate_limit (по умолчанию = rate_limit)
+            idle_timeout: Закрывать соединения без запросов дольше стольких секунд (0 - не закрывать)
+            max_pending_bytes: Необработанных байт от соединения, после которых чтение приостанавливается
+            max_pipeline: Запросов одного соединения, выполняемых одновременно
+            max_clients_tracked: Сколько отключившихся клиентов хранить в статистике
+        """
+        self.max_connections = max_connections
+        self.max_connections_per_client = max_connections_per_client
+        self.rate_limit = rate_limit
+        self.rate_burst = rate_burst or rate_limit
+        self.idle_timeout = idle_timeout
+        self.max_pending_bytes = max_pending_bytes
+        self.max_pipeline = max_pipeline
+        self.max_clients_tracked = max_clients_tracked
+        self.clients: Dict[str, ClientStats] = {}
+        self.connections = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def client(self, host: str) -> ClientStats:
+        stats = self.clients.get(host)
+        if stats is None:
+            stats = self.clients[host] = ClientStats(self.rate_limit, self.rate_burst)
+        return stats
+
+    def admit(self, host: str) -> bool:
+        """Принять новое соединение клиента или отказать"""
+        with self.lock:
+            stats = self.client(host)
+            if self.max_connections and self.connections >= self.max_connections:
+                reason = "server connection limit"
+            elif self.max_connections_per_client and stats.connections >= self.max_connections_per_client:
+                reason = "per-client connection limit"
+            else:
+                self.connections += 1
+                stats.connections += 1
+                stats.total_connections += 1
+                stats.last_activity = time.time()
+                return True
+            self.rejected += 1
+            stats.rejected += 1
+        logger.warning(f"Rejected Modbus TCP connection from {host}: {reason}")
+        return False
+
+    def release(self, host: str):
+        """Соединение клиента закрыто"""
+        with self.lock:
+            self.connections = max(0, self.connections - 1)
+            stats = self.clients.get(host)
+            if stats is not None:
+                stats.connections = max(0, stats.connections - 1)
+            self._trim()
+
+    def _trim(self):
+        # Забыть самых давних отключившихся клиентов
+        idle = [h for h, s in self.clients.items() if s.connections == 0]
+        excess = len(idle) - self.max_clients_tracked
+        if excess > 0:
+            idle.sort(key=lambda h: self.clients[h].last_activity or 0)
+            for host in idle[:excess]:
+                del self.clients[host]
+
+    def get_status(self) -> Dict[str, Any]:
+        """Лимиты, число соединений и статистика по клиентам"""
+        with self.lock:
+            clients = {host: stats.to_dict() for host, stats in self.clients.items()}
+        return {
+            "connections": self.connections,
+            "rejected_connections": self.rejected,
+            "limits": {
+                "max_connections": self.max_connections,
+                "max_connections_per_client": self.max_connections_per_client,
+                "rate_limit": self.rate_limit,
+                "rate_burst": self.rate_burst,
+                "idle_timeout": self.idle_timeout,
+                "max_pending_bytes": self.max_pending_bytes,
+                "max_pipeline": self.max_pipeline
+            },
+            "clients": dict(sorted(clients.items(), key=lambda c: -c[1]["requests"]))
+        }
+
+
+class AdmissionRequestHandler(ModbusConnectedRequestHandler):
+    """
+    Обработчик TCP соединения с контролем допуска
+
+    Лимиты берутся из AdmissionController, присвоенного серверу pymodbus (server.admission).
+    Клиент, превысивший бюджет запросов, замедляется: чтение из его сокета
+    приостанавливается, и TCP окно передает давление обратно клиенту, не затрагивая
+    остальных. Необработанные данные соединения ограничены max_pending_bytes.
+    """
+
+    def __init__(self, owner):
+        super().__init__(owner)
+        self.admission: AdmissionController = getattr(owner, 'admission', None) or AdmissionController()
+        self.admitted = False
+        self.host = None
+        self.stats: Optional[ClientStats] = None
+        self.pending_bytes = 0
+        self.reading_paused = False
+
+    def connection_made(self, transport):
+        peer = transport.get_extra_info('peername') or ('unknown',)
+        self.host = str(peer[0])
+        if not self.admission.admit(self.host):
+            self.client_address = peer
+            self.transport = transport
+            transport.close()
+            return
+        self.admitted = True
+        self.stats = self.admission.client(self.host)
+        super().connection_made(transport)
+
+    def connection_lost(self, call_exc):
+        if not self.admitted:
+            return
+        self.admitted = False
+        self.admission.release(self.host)
+        super().connection_lost(call_exc)
+
+    def data_received(self, data):
+        self.pending_bytes += len(data)
+        if self.stats is not None:
+            self.stats.bytes_in += len(data)
+            self.stats.last_activity = time.time()
+        if self.pending_bytes > self.admission.max_pending_bytes and not self.reading_paused:
+            # Очередь не растет без ограничения: ждем, пока обработчик ее разберет
+            self._pause_reading()
+        super().data_received(data)
+
+    def _pause_reading(self):
+        self.reading_paused = True
+        self.stats.paused += 1
+        self.transport.pause_reading()
+
+    def _backlogged(self) -> bool:
+        return self.pending_bytes > self.admission.max_pending_bytes // 2
+
+    def _resume_reading(self):
+        if self.reading_paused and not self.transport.is_closing() and not self._backlogged():
+            self.reading_paused = False
+            self.transport.resume_reading()
+
+    async def _recv_(self):
+        bucket = self.stats.bucket if self.stats else None
+        if bucket is not None:
+            delay = bucket.delay()
+            if delay > 0:
+                self.stats.throttled += 1
+                self.stats.throttle_time += delay
+                if not self.reading_paused:
+                    self.reading_paused = True
+                    self.transport.pause_reading()
+                await asyncio.sleep(delay)
+                self._resume_reading()
+
+        idle_timeout = self.admission.idle_timeout
+        try:
+            if idle_timeout:
+                data = await asyncio.wait_for(self.receive_queue.get(), idle_timeout)
+            else:
+                data = await self.receive_queue.get()
+        except asyncio.TimeoutError:
+            logger.info(f"Closing idle Modbus TCP connection from {self.host}")
+            self.stats.idle_closed += 1
+            self.running = False
+            self.transport.close()
+            raise asyncio.CancelledError()
+        except RuntimeError:
+            logger.error("Event loop is closed")
+            return None
+
+        self.pending_bytes -= len(data)
+        self._resume_reading()
+        return data
+
+    def _account(self):
+        """Учесть запрос в статистике и бюджете клиента"""
+        if self.stats is not None:
+            self.stats.requests += 1
+            if self.stats.bucket is not None:
+                self.stats.bucket.consume()
+
+    def execute(self, request, *addr):
+        self._account()
+        super().execute(request, *addr)
+
+    def _send_(self, data):
+        if self.stats is not None:
+            self.stats.bytes_out += len(data)
+        super()._send_(data)
@@ -0,0 +1,106 @@
+"""
+TCP Pipeline - параллельное выполнение запросов Modbus TCP, отправленных без ожидания ответов
+"""
+import asyncio
+import logging
+from typing import Dict, Optional
+from pymodbus.exceptions import NoSuchSlaveException
+from pymodbus.pdu import ModbusExceptions
+from app.modbus.gateway import WRITE_FUNCTIONS
+from app.modbus.tcp_admission import AdmissionRequestHandler
+
+logger = logging.getLogger(__name__)
+
+
+class PipelinedRequestHandler(AdmissionRequestHandler):
+    """
+    Обработчик соединения, выполняющий запросы клиента параллельно
+
+    Modbus TCP клиент может отправить несколько запросов с разными transaction id,
+    не дожидаясь ответов. Чтения обслуживаются из хранилища шлюза сразу в event loop.
+    Записи уходят на RTU шину и выполняются в пуле потоков сервера: записи на разные
+    шины идут одновременно, на одну шину - по очереди в ее планировщике. Ответ
+    отправляется по готовности с transaction id запроса, поэтому ответы могут
+    прийти не в порядке запросов.
+
+    Запросы одного соединения к одному unit id выполняются в порядке поступления
+    (чтение после записи видит записанное значение). Одновременно выполняется
+    не больше admission.max_pipeline запросов соединения; дальше новые данные
+    не читаются, и срабатывает ограничение max_pending_bytes.
+    """
+
+    def __init__(self, owner):
+        super().__init__(owner)
+        self.inflight = 0
+        self.slot_free = asyncio.Event()
+        self.unit_tails: Dict[int, asyncio.Future] = {}
+
+    async def _recv_(self):
+        while self.inflight >= self.admission.max_pipeline:
+            self.slot_free.clear()
+            await self.slot_free.wait()
+        return await super()._recv_()
+
+    def execute(self, request, *addr):
+        if self.server.broadcast_enable and not request.unit_id:
+            # Широковещательные запросы - без ответа, как в pymodbus
+            super().execute(request, *addr)
+            return
+
+        self._account()
+        unit_id = request.unit_id
+        tail = self.unit_tails.get(unit_id)
+        blocking = request.function_code in WRITE_FUNCTIONS
+        if tail is None and not blocking:
+            # Быстрый путь: значение из хранилища, очереди к этому unit нет
+            self._respond(request, self._process(request), addr)
+            return
+
+        task = asyncio.ensure_future(self._dispatch(request, tail, blocking, addr))
+        self.unit_tails[unit_id] = task
+        self.inflight += 1
+        if self.stats is not None:
+            self.stats.pipelined += 1
+            self.stats.max_inflight = max(self.stats.max_inflight, self.inflight)
+        task.add_done_callback(lambda done: self._dispatched(unit_id, done))
+
+    async def _dispatch(self, request, tail: Optional[asyncio.Future], blocking: bool, addr):
+        if tail is not None:
+            await asyncio.wait([tail])
+        if blocking:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(None, self._process, request)
+        else:
+            response = self._process(request)
+        self._respond(request, response, addr)
+
+    def _dispatched(self, unit_id: int, task: asyncio.Future):
+        self.inflight -= 1
+        if self.unit_tails.get(unit_id) is task:
+            del self.unit_tails[unit_id]
+        self.slot_free.set()
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error executing pipelined request from {self.host}: {task.exception()}")
+
+    def _process(self, request):
+        """Выполнить запрос над хранилищем сервера и вернуть ответ (None - не отвечать)"""
+        try:
+            return request.execute(self.server.context[request.unit_id])
+        except NoSuchSlaveException:
+            logger.error(f"Requested slave does not exist: {request.unit_id}")
+            if self.server.ignore_missing_slaves:
+                return None
+            return request.doException(ModbusExceptions.GatewayNoResponse)
+        except Exception as e:
+            logger.error(f"Datastore unable to fulfill request: {e}")
+            return request.doException(ModbusExceptions.SlaveFailure)
+
+    def _respond(self, request, response, addr):
+        if response is None or self.transport.is_closing():
+            return
+        response.transaction_id = request.transaction_id
+        response.unit_id = request.unit_id
+        skip_encoding = False
+        if self.server.response_manipulator:
+            response, skip_encoding = self.server.response_manipulator(response)
+        self.send(response, *addr, skip_encoding=skip_encoding)
@@ -2,12 +2,16 @@
 Modbus TCP Server - предоставление доступа к RTU устройствам через TCP
 """
 import logging
-from typing import Dict, Any
-from pymodbus.datastore import ModbusSequentialDataBlock, ModbusSlaveContext, ModbusServerContext
+from typing import Dict, Any, Optional
+from pymodbus.datastore import ModbusSlaveContext, ModbusServerContext
 from pymodbus.device import ModbusDeviceIdentification
+from pymodbus.server.async_io import ModbusTcpServer
+from app.modbus.datastore import PagedDataBlock
+from app.modbus.tcp_admission import AdmissionController
+from app.modbus.tcp_pipeline import PipelinedRequestHandler
 import asyncio
 import threading
-import time
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -15,105 +19,179 @@ logger = logging.getLogger(__name__)
 class ModbusTCPServer:
     """TCP сервер для предоставления доступа к RTU устройствам"""
     
-    def __init__(self, host: str = '0.0.0.0', port: int = 502):
+    def __init__(self, host: str = '0.0.0.0', port: int = 502,
+                 context: Optional[ModbusServerContext] = None,
+                 admission: Optional[Dict[str, Any]] = None, workers: int = 8):
         """
         Инициализация Modbus TCP сервера
         
         Args:
             host: IP адрес для прослушивания
             port: TCP порт (502 для стандартного Modbus, обычно используют 5020-5030 если нет прав)
+            context: Хранилище сервера (GatewayServerContext - значения RTU устройств);
+                     None - один slave, все адреса которого читаются как 0
+            admission: Лимиты соединений и клиентов (параметры AdmissionController)
+            workers: Потоков для выполнения записей на RTU шины (записи на разные шины
+                     идут параллельно)
         """
         self.host = host
         self.port = port
+        self.context = context
+        self.admission = AdmissionController(**(admission or {}))
+        self.workers = workers
         self.server = None
         self.running = False
         self.server_thread = None
+        self.loop = None
+        self.stop_event = None
+        self.ready = threading.Event()
+        self.error = None
+        self.lock = threading.Lock()
         
-    def start(self) -> bool:
-        """Запуск TCP сервера"""
+    def start(self, timeout: float = 5.0) -> bool:
+        """
+        Запуск TCP сервера
+
+        Возвращает управление, когда сервер слушает порт (True) или привязка
+        к порту не удалась (False).
+        """
+        with self.lock:
+            if self.running:
+                return True
+            try:
+                context = self.context
+                if context is None:
+                    # Создание data stores (память выделяется страницами при записи)
+                    store = ModbusSlaveContext(
+                        di=PagedDataBlock(bits=True, strict=False),
+                        co=PagedDataBlock(bits=True, strict=False),
+                        hr=PagedDataBlock(strict=False),
+                        ir=PagedDataBlock(strict=False),
+                        zero_mode=True
+                    )
+                    context = ModbusServerContext(slaves={1: store}, single=False)
+
+                # Информация об устройстве
+                identity = ModbusDeviceIdentification(
+                    info={
+                        0x00: 'Smart Home Controller',
+                        0x01: 0x01,
+                        0x02: 'Modbus TCP Gateway for RTU Devices',
+                        0x03: 'SmartHome',
+                        0x04: 'SH-CTRL-001',
+                        0x05: 'http://localhost:8000',
+                        0x06: 'Smart Home Controller',
+                        0x07: 'v1.0',
+                    }
+                )
+
+                # Запуск сервера в отдельном потоке со своим event loop
+                self.ready = threading.Event()
+                self.error = None
+                self.server_thread = threading.Thread(
+                    target=self._run_server,
+                    args=(context, identity),
+                    name="ModbusTCPServer",
+                    daemon=True
+                )
+                self.server_thread.start()
+                if not self.ready.wait(timeout):
+                    self.error = f"Server did not start within {timeout} s"
+                    self._shutdown(timeout)
+                if self.error:
+                    self.server_thread.join(timeout)
+                    self.server_thread = None
+                    logger.error(f"Error starting Modbus TCP Server: {self.error}")
+                    return False
+
+                self.running = True
+                logger.info(f"Started Modbus TCP Server on {self.host}:{self.port}")
+                return True
+
+            except Exception as e:
+                logger.error(f"Error starting Modbus TCP Server: {e}")
+                return False
+
+    def _run_server(self, context, identity):
+        """Поток сервера: event loop живет до вызова stop()"""
         try:
-            # Создание data stores
-            store = ModbusSlaveContext(
-                di=ModbusSequentialDataBlock(0, [0] * 100),
-                co=ModbusSequentialDataBlock(0, [0] * 100),
-                hr=ModbusSequentialDataBlock(0, [0] * 100),
-                ir=ModbusSequentialDataBlock(0, [0] * 100)
-            )
-            
-            context = ModbusServerContext(slaves={1: store}, single=False)
-            
-            # Информация об устройстве
-            identity = ModbusDeviceIdentification(
-                info={
-                    0x00: 'Smart Home Controller',
-                    0x01: 0x01,
-                    0x02: 'Modbus TCP Gateway for RTU Devices',
-                    0x03: 'SmartHome',
-                    0x04: 'SH-CTRL-001',
-                    0x05: 'http://localhost:8000',
-                    0x06: 'Smart Home Controller',
-                    0x07: 'v1.0',
-                }
-            )
-            
-            # Запуск сервера в отдельном потоке
-            self.server_thread = threading.Thread(
-                target=self._run_server,
-                args=(context, identity),
-                daemon=True
-            )
-            self.server_thread.start()
-            self.running = True
-            time.sleep(0.5)  # Даем серверу время на запуск
-            logger.info(f"Started Modbus TCP Server on {self.host}:{self.port}")
-            return True
-            
+            asyncio.run(self._serve(context, identity))
         except Exception as e:
-            logger.error(f"Error starting Modbus TCP Server: {e}")
-            return False
-    
-    def _run_server(self, context, identity):
-        """Запуск сервера"""
+            if self.ready.is_set():
+                logger.error(f"Server error: {e}")
+            self.error = str(e)
+        finally:
+            self.running = False
+            self.loop = None
+            self.stop_event = None
+            self.ready.set()
+
+    async def _serve(self, context, identity):
+        """Слушать порт до stop(), затем закрыть все соединения клиентов"""
+        self.loop = asyncio.get_running_loop()
+        self.loop.set_default_executor(ThreadPoolExecutor(self.workers, thread_name_prefix="ModbusTCPWorker"))
+        self.stop_event = asyncio.Event()
+        self.server = ModbusTcpServer(
+            context,
+            identity=identity,
+            address=(self.host, self.port),
+            handler=PipelinedRequestHandler,
+            allow_reuse_address=True
+        )
+        self.server.admission = self.admission
+        serve_task = asyncio.create_task(self.server.serve_forever())
+        stop_task = asyncio.create_task(self.stop_event.wait())
         try:
-            # Использовать правильный импорт для версии pymodbus
-            try:
-                from pymodbus.server.async_io import StartAsyncTcpServer as AsyncServer
-            except ImportError:
-                # Fallback для старых версий
-                from pymodbus.server import StartAsyncTcpServer as AsyncServer
-            
-            async def run_async_server():
-                await AsyncServer(
-                    context=context,
-                    identity=identity,
-                    address=(self.host, self.port),
-                    allow_reuse_address=True
-                )
-            
-            # Попытка запустить с asyncio.run
+            # Готовность - сокет привязан; ошибка привязки завершает serve_task
+            await asyncio.wait([serve_task, self.server.serving], return_when=asyncio.FIRST_COMPLETED)
+            if serve_task.done():
+                serve_task.result()
+            if self.port == 0:
+                self.port = self.server.server.sockets[0].getsockname()[1]
+            self.ready.set()
+
+            await asyncio.wait([serve_task, stop_task], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop_task.cancel()
+            for handler in list(self.server.active_connections.values()):
+                handler.transport.close()
+            # Дать соединениям обработать connection_lost до закрытия сервера
+            await asyncio.sleep(0)
+            await self.server.server_close()
+            serve_task.cancel()
+            await asyncio.gather(serve_task, stop_task, return_exceptions=True)
+            self.server = None
+
+    def _shutdown(self, timeout: float):
+        loop, stop_event = self.loop, self.stop_event
+        if loop is not None and stop_event is not None:
             try:
-                asyncio.run(run_async_server())
-            except RuntimeError as e:
-                # Если есть проблема с event loop, используем альтернативный способ
-                if "asyncio.run() cannot be called from a running event loop" in str(e):
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    loop.run_until_complete(run_async_server())
-                else:
-                    raise
-        except Exception as e:
-            logger.error(f"Server error: {e}")
+                loop.call_soon_threadsafe(stop_event.set)
+            except RuntimeError:
+                # Event loop уже закрыт
+                pass
+        if self.server_thread is not None:
+            self.server_thread.join(timeout)
+
+    def stop(self, timeout: float = 5.0):
+        """Остановка TCP сервера: закрыть порт и все соединения клиентов"""
+        with self.lock:
+            if self.server_thread is None:
+                return
+            self._shutdown(timeout)
+            self.server_thread = None
             self.running = False
-    
-    def stop(self):
-        """Остановка TCP сервера"""
-        self.running = False
         logger.info("Stopped Modbus TCP Server")
-    
+
     def get_status(self) -> Dict[str, Any]:
         """Получить статус сервера"""
-        return {
+        status = {
             "running": self.running,
             "host": self.host,
-            "port": self.port
+            "port": self.port,
+            "admission": self.admission.get_status()
         }
+        if hasattr(self.context, 'get_status'):
+            status["units"] = self.context.get_status()
+            status["datastore"] = self.context.get_memory_stats()
+        return status
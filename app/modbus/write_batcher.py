@@ -0,0 +1,143 @@
+"""
+Write Batcher - объединение одиночных записей в соседние адреса в запросы FC15/FC16
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Dict, Any, Callable, List
+from app.modbus.bus_scheduler import (
+    bus_context, current_deadline, remaining_time, DEADLINE_EXCEEDED, OUTCOME_UNKNOWN
+)
+
+logger = logging.getLogger(__name__)
+
+# Протокольные ограничения на количество элементов в одном запросе записи
+MAX_WRITE_REGISTERS = 123
+MAX_WRITE_COILS = 1968
+
+# Одиночная запись -> (множественная запись, ограничение размера)
+BATCHED_FUNCTIONS = {
+    'register': ('registers', MAX_WRITE_REGISTERS),
+    'coil': ('coils', MAX_WRITE_COILS),
+}
+
+
+class WriteBatcher:
+    """
+    Придерживает одиночные записи на короткое окно и отправляет непрерывные
+    диапазоны одного slave одним запросом; каждый вызывающий получает свой результат
+    """
+
+    def __init__(self, write: Callable[[str, int, int, Any], Dict[str, Any]], window: float = 0.02,
+                 transaction_timeout: float = 0.0):
+        """
+        Инициализация
+
+        Args:
+            write: Функция записи на шину (function, slave_id, addr, value) -> результат
+            window: Окно накопления записей в секундах
+            transaction_timeout: Сколько ждать результата уже отправленного пакета
+                                 после крайнего срока записи
+        """
+        self.write = write
+        self.window = window
+        self.transaction_timeout = transaction_timeout
+        self.pending: Dict[tuple, List[tuple]] = {}
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.frames = 0
+
+    def submit(self, function: str, slave_id: int, addr: int, value: Any) -> Dict[str, Any]:
+        """
+        Поставить одиночную запись (coil/register) в пакет и дождаться результата
+
+        Запись, крайний срок которой (bus_context) истек до отправки пакета,
+        не выполняется (DEADLINE_EXCEEDED). Если пакет уже отправлен, его результат
+        ждется еще transaction_timeout секунд, затем - OUTCOME_UNKNOWN: запись
+        может быть выполнена.
+        """
+        future = Future()
+        key = (slave_id, function)
+        with self.lock:
+            self.writes += 1
+            batch = self.pending.get(key)
+            if batch is None:
+                batch = self.pending[key] = []
+                timer = threading.Timer(self.window, self._flush, args=(key,))
+                timer.daemon = True
+                timer.start()
+            entry = (addr, value, future, current_deadline())
+            batch.append(entry)
+        try:
+            return future.result(remaining_time())
+        except FutureTimeout:
+            pass
+        with self.lock:
+            batch = self.pending.get(key)
+            if batch is not None and entry in batch:
+                # Пакет еще не отправлен - запись снимается
+                batch.remove(entry)
+                return {"success": False, "error": DEADLINE_EXCEEDED}
+        try:
+            return future.result(self.transaction_timeout)
+        except FutureTimeout:
+            return {"success": False, "error": OUTCOME_UNKNOWN}
+
+    def _flush(self, key: tuple):
+        with self.lock:
+            batch = self.pending.pop(key, [])
+        slave_id, function = key
+        now = time.monotonic()
+        live, deadlines = [], []
+        for addr, value, future, deadline in batch:
+            if deadline is not None and now > deadline:
+                future.set_result({"success": False, "error": DEADLINE_EXCEEDED})
+            else:
+                live.append((addr, value, future))
+                deadlines.append(deadline)
+        # Пакет ждет в очереди шины до самого позднего срока своих записей
+        deadline = None if None in deadlines or not deadlines else max(deadlines)
+        for start, values, futures in self._runs(function, live):
+            try:
+                with bus_context(deadline=deadline):
+                    if len(values) == 1:
+                        result = self.write(function, slave_id, start, values[0])
+                    else:
+                        result = self.write(BATCHED_FUNCTIONS[function][0], slave_id, start, values)
+            except Exception as e:
+                logger.error(f"Error writing batch to slave {slave_id}: {e}")
+                result = {"success": False, "error": str(e)}
+            with self.lock:
+                self.frames += 1
+            for future in futures:
+                future.set_result(dict(result))
+
+    @staticmethod
+    def _runs(function: str, batch: List[tuple]):
+        """Разбить пакет на непрерывные диапазоны адресов (повторная запись адреса - последняя побеждает)"""
+        limit = BATCHED_FUNCTIONS[function][1]
+        latest: Dict[int, Any] = {}
+        waiters: Dict[int, list] = {}
+        for addr, value, future in batch:
+            latest[addr] = value
+            waiters.setdefault(addr, []).append(future)
+
+        run_start, values, futures = None, [], []
+        for addr in sorted(latest):
+            if run_start is not None and (addr != run_start + len(values) or len(values) >= limit):
+                yield run_start, values, futures
+                run_start, values, futures = None, [], []
+            if run_start is None:
+                run_start = addr
+            values.append(latest[addr])
+            futures.extend(waiters[addr])
+        if run_start is not None:
+            yield run_start, values, futures
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Получить статистику объединения записей"""
+        return {
+            "writes": self.writes,
+            "frames": self.frames
+        }
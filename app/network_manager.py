@@ -3,6 +3,7 @@
 """
 import logging
 import subprocess
+import time
 from typing import Dict, Any
 import socket
 import ipaddress
@@ -13,14 +14,24 @@ logger = logging.getLogger(__name__)
 class NetworkManager:
     """Управление сетевыми настройками"""
     
+    # Имя хоста кэшируется: set_hostname обновляет кэш сразу,
+    # изменение в обход контроллера видно через HOSTNAME_TTL секунд
+    HOSTNAME_TTL = 60.0
+    
     def __init__(self):
         """Инициализация менеджера сети"""
-        pass
+        self._hostname = None
+        self._hostname_at = 0.0
     
     def get_hostname(self) -> str:
         """Получить имя хоста"""
+        now = time.monotonic()
+        if self._hostname is not None and now - self._hostname_at < self.HOSTNAME_TTL:
+            return self._hostname
         try:
-            return socket.gethostname()
+            self._hostname = socket.gethostname()
+            self._hostname_at = now
+            return self._hostname
         except Exception as e:
             logger.error(f"Error getting hostname: {e}")
             return "unknown"
@@ -38,6 +49,8 @@ class NetworkManager:
                 capture_output=True
             )
             logger.info(f"Hostname changed to: {hostname}")
+            self._hostname = hostname
+            self._hostname_at = time.monotonic()
             return True
         except Exception as e:
             logger.error(f"Error setting hostname: {e}")
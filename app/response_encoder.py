@@ -0,0 +1,153 @@
+"""
+Response Encoder - сериализация и сжатие ответов API
+
+JSON кодируется через orjson, если он установлен (иначе стандартный json).
+Клиент может запросить MessagePack или CBOR заголовком Accept (нужны пакеты
+msgpack / cbor2). Большие ответы сжимаются gzip или deflate по заголовку
+Accept-Encoding.
+"""
+import gzip
+import json
+import logging
+import zlib
+from typing import Any, Dict, Optional
+from flask import request, has_request_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+logger = logging.getLogger(__name__)
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+CBOR_MIMETYPE = 'application/cbor'
+
+# Сжимаемые ответы (кроме text/*); поток событий не сжимается - он передается частями
+COMPRESSIBLE = {JSON_MIMETYPE, CBOR_MIMETYPE, 'application/javascript', *MSGPACK_MIMETYPES}
+
+
+def json_dumps(data: Any, default=None) -> bytes:
+    """Компактный JSON самым быстрым доступным кодировщиком"""
+    if orjson is not None:
+        return orjson.dumps(data, default=default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=default, separators=(',', ':')).encode()
+
+
+def json_loads(data) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def available_mimetypes() -> list:
+    """Форматы ответа в порядке предпочтения (JSON - по умолчанию)"""
+    mimetypes = [JSON_MIMETYPE]
+    if msgpack is not None:
+        mimetypes.extend(MSGPACK_MIMETYPES)
+    if cbor2 is not None:
+        mimetypes.append(CBOR_MIMETYPE)
+    return mimetypes
+
+
+def preferred_mimetype() -> str:
+    """Формат ответа по заголовку Accept текущего запроса"""
+    if not has_request_context():
+        return JSON_MIMETYPE
+    return request.accept_mimetypes.best_match(available_mimetypes(), default=JSON_MIMETYPE)
+
+
+class ResponseJSONProvider(DefaultJSONProvider):
+    """
+    JSON провайдер Flask: jsonify кодирует ответ в формат из заголовка Accept
+
+    Args:
+        backend: auto - orjson, если установлен; json - стандартный модуль
+    """
+
+    def __init__(self, app, backend: str = 'auto'):
+        super().__init__(app)
+        self.fast = backend != 'json' and orjson is not None
+
+    def encode(self, obj: Any, mimetype: str) -> bytes:
+        if mimetype in MSGPACK_MIMETYPES:
+            return msgpack.packb(obj, default=self.default)
+        if mimetype == CBOR_MIMETYPE:
+            return cbor2.dumps(obj, default=lambda encoder, value: encoder.encode(self.default(value)))
+        if self._app.debug:
+            return self.dumps(obj, indent=2).encode()
+        if self.fast:
+            return json_dumps(obj, default=self.default)
+        return self.dumps(obj, separators=(',', ':')).encode()
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        mimetype = preferred_mimetype()
+        response = self._app.response_class(self.encode(obj, mimetype), mimetype=mimetype)
+        if len(available_mimetypes()) > 1:
+            response.vary.add('Accept')
+        return response
+
+
+def compress_response(response, min_size: int = 1024, level: int = 1):
+    """
+    Сжать ответ gzip или deflate, если клиент их принимает (after_request)
+
+    Ответы меньше min_size байт, потоковые, файлы и уже сжатые не изменяются.
+    ETag сжатого ответа становится слабым: представление отличается байтами.
+    """
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+    if response.mimetype not in COMPRESSIBLE and not response.mimetype.startswith('text/'):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+    accept = request.accept_encodings
+    if accept['gzip'] and accept['gzip'] >= accept['deflate']:
+        encoding, data = 'gzip', gzip.compress(data, compresslevel=level, mtime=0)
+    elif accept['deflate']:
+        encoding, data = 'deflate', zlib.compress(data, level)
+    else:
+        return response
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app, config: Optional[Dict[str, Any]] = None):
+    """
+    Подключить кодировщик и сжатие к приложению Flask
+
+    Args:
+        config: Раздел http конфигурации: json_backend, compress_min_size,
+                compress_level (0 - без сжатия)
+    """
+    config = config or {}
+    app.json = ResponseJSONProvider(app, backend=config.get('json_backend', 'auto'))
+    min_size = config.get('compress_min_size', 1024)
+    level = config.get('compress_level', 1)
+    if level:
+        app.after_request(lambda response: compress_response(response, min_size, level))
+    logger.info(f"Response encoding: json={'orjson' if app.json.fast else 'json'}, "
+                f"formats={available_mimetypes()}, compression level={level}")
@@ -0,0 +1,121 @@
+"""
+State Versions - версии состояния для ETag, условных GET и long-poll
+"""
+import threading
+import time
+import uuid
+from typing import Dict, Any, Callable, Iterable, Optional
+from app.response_encoder import json_dumps
+
+
+class VersionedState:
+    """
+    Состояние одного домена (config, rtu, tcp, system) с номером версии
+
+    Состояние собирается не чаще refresh_interval секунд (None - только после
+    invalidate) и сериализуется только при изменении; номер версии растет с
+    каждым изменением. ETag - имя домена, epoch и версия, поэтому ответ 304
+    не требует ни сборки, ни сериализации состояния.
+    """
+
+    def __init__(self, name: str, build: Callable[[], Any], epoch: str,
+                 refresh_interval: Optional[float] = 1.0):
+        self.name = name
+        self.build = build
+        self.epoch = epoch
+        self.refresh_interval = refresh_interval
+        self.version = 0
+        self.data = None
+        self.body = None
+        self.etag = None
+        self.built_at = None
+        self.stale = True
+        self.cond = threading.Condition()
+
+    def invalidate(self):
+        """Состояние изменено - собрать заново при следующем обращении"""
+        with self.cond:
+            self.stale = True
+            self.cond.notify_all()
+
+    def _expired(self, now: float) -> bool:
+        if self.stale:
+            return True
+        return self.refresh_interval is not None and now - self.built_at >= self.refresh_interval
+
+    def _refresh(self, now: float):
+        data = self.build()
+        self.built_at = now
+        self.stale = False
+        if self.version and data == self.data:
+            return
+        self.data = data
+        self.body = json_dumps(data).decode()
+        self.version += 1
+        self.etag = f"{self.name}-{self.epoch}-{self.version}"
+
+    def current(self) -> tuple:
+        """(etag, version, body) актуального состояния"""
+        with self.cond:
+            now = time.monotonic()
+            if self._expired(now):
+                self._refresh(now)
+            return self.etag, self.version, self.body
+
+    def wait(self, etags: Iterable[str], timeout: float) -> tuple:
+        """
+        Дождаться версии с ETag не из etags (не дольше timeout)
+
+        Returns:
+            (etag, version, body) - новое состояние или текущее по истечении timeout
+        """
+        etags = set(etags)
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                if self._expired(now):
+                    self._refresh(now)
+                remaining = deadline - now
+                if self.etag not in etags or remaining <= 0:
+                    return self.etag, self.version, self.body
+                if self.refresh_interval is not None:
+                    remaining = min(remaining, self.built_at + self.refresh_interval - now)
+                self.cond.wait(max(remaining, 0.0))
+
+
+class StateVersions:
+    """Версионированные состояния по именам доменов"""
+
+    def __init__(self, refresh_interval: Optional[float] = 1.0):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.refresh_interval = refresh_interval
+        self.states: Dict[str, VersionedState] = {}
+        self.lock = threading.Lock()
+
+    def register(self, name: str, build: Callable[[], Any], periodic: bool = True) -> VersionedState:
+        """
+        Зарегистрировать домен
+
+        Args:
+            periodic: False - состояние меняется только через invalidate (конфигурация)
+        """
+        with self.lock:
+            state = self.states.get(name)
+            if state is None:
+                state = VersionedState(name, build, self.epoch,
+                                       self.refresh_interval if periodic else None)
+                self.states[name] = state
+            return state
+
+    def get(self, name: str) -> Optional[VersionedState]:
+        return self.states.get(name)
+
+    def invalidate(self, *prefixes: str):
+        """Сбросить домены, имена которых начинаются с prefixes"""
+        for name, state in list(self.states.items()):
+            if name.startswith(prefixes):
+                state.invalidate()
+
+    def get_status(self) -> Dict[str, Any]:
+        return {name: state.version for name, state in sorted(self.states.items())}
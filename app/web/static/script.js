@@ -215,17 +215,19 @@ function writeRTU() {
 function updateRTUStatus() {
     fetch('/api/modbus/rtu/status')
     .then(response => response.json())
-    .then(data => {
-        const statusDiv = document.getElementById('rtu-status');
-        if (data.connected) {
-            statusDiv.innerHTML = `RTU: <span class="badge online">Подключено</span>`;
-        } else {
-            statusDiv.innerHTML = `RTU: <span class="badge offline">Отключено</span>`;
-        }
-    })
+    .then(renderRTUStatus)
     .catch(error => console.error('Error:', error));
 }
 
+function renderRTUStatus(data) {
+    const statusDiv = document.getElementById('rtu-status');
+    if (data.connected) {
+        statusDiv.innerHTML = `RTU: <span class="badge online">Подключено</span>`;
+    } else {
+        statusDiv.innerHTML = `RTU: <span class="badge offline">Отключено</span>`;
+    }
+}
+
 // Функции для Modbus TCP
 function startTCPServer() {
     const host = document.getElementById('tcp-host').value;
@@ -278,33 +280,35 @@ function stopTCPServer() {
 function refreshTCPStatus() {
     fetch('/api/modbus/tcp/status')
     .then(response => response.json())
-    .then(data => {
-        let html = '';
-        
-        if (data.error) {
-            html = 'Ошибка загрузки статуса';
-        } else {
-            html = `<div><strong>Статус:</strong> ${data.running ? 'Запущен' : 'Остановлен'}</div>`;
-            html += `<div><strong>Хост:</strong> ${data.host}</div>`;
-            html += `<div><strong>Порт:</strong> ${data.port}</div>`;
-        }
-        
-        document.getElementById('tcp-status-info').innerHTML = html;
-
-        // Обновить статус в шапке
-        const statusDiv = document.getElementById('tcp-status');
-        if (data.running) {
-            statusDiv.innerHTML = `TCP: <span class="badge online">Запущено</span>`;
-        } else {
-            statusDiv.innerHTML = `TCP: <span class="badge offline">Остановлено</span>`;
-        }
-    })
+    .then(renderTCPStatus)
     .catch(error => {
         console.error('Error:', error);
         document.getElementById('tcp-status-info').innerHTML = 'Ошибка загрузки данных';
     });
 }
 
+function renderTCPStatus(data) {
+    let html = '';
+    
+    if (data.error) {
+        html = 'Ошибка загрузки статуса';
+    } else {
+        html = `<div><strong>Статус:</strong> ${data.running ? 'Запущен' : 'Остановлен'}</div>`;
+        html += `<div><strong>Хост:</strong> ${data.host}</div>`;
+        html += `<div><strong>Порт:</strong> ${data.port}</div>`;
+    }
+    
+    document.getElementById('tcp-status-info').innerHTML = html;
+
+    // Обновить статус в шапке
+    const statusDiv = document.getElementById('tcp-status');
+    if (data.running) {
+        statusDiv.innerHTML = `TCP: <span class="badge online">Запущено</span>`;
+    } else {
+        statusDiv.innerHTML = `TCP: <span class="badge offline">Остановлено</span>`;
+    }
+}
+
 // Функции для конфигурации
 function loadConfig() {
     fetch('/api/config/get')
@@ -355,15 +359,32 @@ function showStatus(message, type) {
     alert(message);
 }
 
+// Подписка на изменения статуса (Server-Sent Events)
+function subscribeEvents() {
+    // Сервер присылает текущий статус сразу после подключения, затем только изменения;
+    // после обрыва браузер переподключается сам и передает Last-Event-ID
+    const events = new EventSource('/api/events?topics=status');
+    events.addEventListener('status', event => {
+        const data = JSON.parse(event.data);
+        if (data.rtu) {
+            renderRTUStatus(data.rtu);
+        }
+        if (data.tcp) {
+            renderTCPStatus(data.tcp);
+        }
+    });
+    events.onerror = () => console.warn('Event stream disconnected, reconnecting...');
+    return events;
+}
+
 // Инициализация при загрузке страницы
 document.addEventListener('DOMContentLoaded', function() {
-    updateRTUStatus();
-    refreshTCPStatus();
     refreshNetworkConfig();
 
-    // Обновлять статус каждые 5 секунд
-    setInterval(() => {
+    if (window.EventSource) {
+        subscribeEvents();
+    } else {
         updateRTUStatus();
         refreshTCPStatus();
-    }, 5000);
+    }
 });
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Сравнение памяти и времени обработки запроса для хранилищ Modbus TCP сервера
+
+Запуск из корня проекта:
+    python benchmarks/datastore_benchmark.py --units 64
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymodbus.datastore import ModbusSequentialDataBlock, ModbusSlaveContext  # noqa: E402
+from pymodbus.register_read_message import ReadHoldingRegistersRequest  # noqa: E402
+from app.modbus.gateway import GatewayServerContext  # noqa: E402
+
+ADDRESS_SPACE = 65536
+
+
+def measure(build):
+    """Построить хранилище и вернуть (объект, выделенные байты)"""
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current
+
+
+def sequential_context():
+    """Контекст pymodbus на списках Python на все адресное пространство"""
+    return ModbusSlaveContext(
+        di=ModbusSequentialDataBlock(0, [False] * ADDRESS_SPACE),
+        co=ModbusSequentialDataBlock(0, [False] * ADDRESS_SPACE),
+        hr=ModbusSequentialDataBlock(0, [0] * ADDRESS_SPACE),
+        ir=ModbusSequentialDataBlock(0, [0] * ADDRESS_SPACE),
+        zero_mode=True
+    )
+
+
+def gateway_context(units: int, registers: int):
+    """Шлюз с units slave устройствами и registers опрашиваемыми регистрами на каждом"""
+    devices = [{"slave_id": unit} for unit in range(1, units + 1)]
+    gateway = GatewayServerContext(None, devices)
+    for unit in range(1, units + 1):
+        # Типичная карта: разнесенные блоки по 125 регистров, первый пересекает границу страницы
+        for block in range(0, registers, 125):
+            start = 200 + block * 8
+            gateway.update(unit, 'holding_register', start, list(range(min(125, registers - block))))
+        gateway.update(unit, 'coil', 0, [True] * 32)
+    return gateway
+
+
+def per_request(context, address: int, count: int, iterations: int) -> float:
+    """Среднее время выполнения FC3 над хранилищем в микросекундах"""
+    request = ReadHoldingRegistersRequest(address, count)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        request.execute(context)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--units', type=int, default=64, help='Число unit id')
+    parser.add_argument('--registers', type=int, default=250, help='Опрашиваемых регистров на устройство')
+    parser.add_argument('--iterations', type=int, default=20000, help='Запросов для замера времени')
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    sequential, sequential_bytes = measure(sequential_context)
+    gateway, gateway_bytes = measure(lambda: gateway_context(args.units, args.registers))
+    stats = gateway.get_memory_stats()
+
+    print(f"Units: {args.units}, polled registers per unit: {args.registers}")
+    print()
+    print("Memory")
+    print(f"  ModbusSequentialDataBlock, 65536 addresses x 4 tables:")
+    print(f"    per unit:  {sequential_bytes / 1024:10.1f} KiB")
+    print(f"    all units: {sequential_bytes * args.units / 1024 / 1024:10.1f} MiB (projected)")
+    print(f"  PagedDataBlock gateway ({stats['pages']} pages):")
+    print(f"    buffers:   {stats['bytes'] / 1024:10.1f} KiB")
+    print(f"    total:     {gateway_bytes / 1024:10.1f} KiB")
+    print()
+    print("CPU per FC3 request (125 registers, crossing a page boundary)")
+    print(f"  sequential: {per_request(sequential, 200, 125, args.iterations):8.2f} us")
+    print(f"  paged:      {per_request(gateway[args.units], 200, 125, args.iterations):8.2f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Сравнение кодировщиков и сжатия ответов на снимках опроса
+
+Снимок - values значений в формате /api/poll/snapshot (значение, качество,
+метка времени) и дамп регистров того же размера (/api/modbus/rtu/read).
+Недоступные пакеты (orjson, msgpack, cbor2) пропускаются.
+
+Запуск из корня проекта:
+    python benchmarks/encoder_benchmark.py --values 10000
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.response_encoder import orjson, msgpack, cbor2  # noqa: E402
+
+
+def snapshot(values: int, points_per_device: int = 100) -> dict:
+    """Снимок опроса: values точек по points_per_device на устройство"""
+    devices = {}
+    for index in range(values):
+        device = devices.setdefault(str(index // points_per_device + 1), {})
+        device[f"point_{index % points_per_device}"] = {
+            "value": round(index * 0.1, 1),
+            "raw": index % 65536,
+            "quality": "good",
+            "timestamp": 1734270000.0 + index / 1000
+        }
+    return {"success": True, "devices": devices}
+
+
+def register_dump(values: int) -> dict:
+    return {"success": True, "data": [(index * 37) % 65536 for index in range(values)]}
+
+
+def encoders() -> dict:
+    result = {
+        "json": lambda data: json.dumps(data).encode(),
+        "json compact": lambda data: json.dumps(data, separators=(',', ':')).encode(),
+    }
+    if orjson is not None:
+        result["orjson"] = orjson.dumps
+    if msgpack is not None:
+        result["msgpack"] = msgpack.packb
+    if cbor2 is not None:
+        result["cbor2"] = cbor2.dumps
+    return result
+
+
+def timed(fn, data, iterations: int) -> tuple:
+    """(результат, среднее время в миллисекундах)"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        result = fn(data)
+    return result, (time.perf_counter() - started) / iterations * 1000
+
+
+def report(name: str, data, iterations: int):
+    print(name)
+    print(f"  {'encoder':<14}{'encode ms':>11}{'bytes':>10}"
+          f"{'gzip-1 ms':>11}{'bytes':>9}{'gzip-6 ms':>11}{'bytes':>9}{'deflate-6 ms':>14}{'bytes':>9}")
+    for encoder_name, encode in encoders().items():
+        body, encode_ms = timed(encode, data, iterations)
+        _, gzip1_ms = timed(lambda b: gzip.compress(b, compresslevel=1, mtime=0), body, iterations)
+        gzip6, gzip6_ms = timed(lambda b: gzip.compress(b, compresslevel=6, mtime=0), body, iterations)
+        deflate6, deflate6_ms = timed(lambda b: zlib.compress(b, 6), body, iterations)
+        gzip1 = gzip.compress(body, compresslevel=1, mtime=0)
+        print(f"  {encoder_name:<14}{encode_ms:>11.2f}{len(body):>10}"
+              f"{gzip1_ms:>11.2f}{len(gzip1):>9}{gzip6_ms:>11.2f}{len(gzip6):>9}"
+              f"{deflate6_ms:>14.2f}{len(deflate6):>9}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--values', type=int, default=10000, help='Значений в снимке')
+    parser.add_argument('--iterations', type=int, default=50, help='Повторов для замера времени')
+    args = parser.parse_args()
+
+    missing = [name for name, module in (('orjson', orjson), ('msgpack', msgpack), ('cbor2', cbor2))
+               if module is None]
+    if missing:
+        print(f"Not installed (skipped): {', '.join(missing)}")
+        print()
+    report(f"Poll snapshot, {args.values} values", snapshot(args.values), args.iterations)
+    report(f"Register dump, {args.values} registers", register_dump(args.values), args.iterations)
+
+
+if __name__ == '__main__':
+    main()
@@ -173,6 +173,50 @@ class SmartHomeClient:
         """Остановить TCP сервер"""
         response = requests.post(f"{self.base_url}/modbus/tcp/stop")
         return response.json()
+    
+    def tcp_status_changed(self, etag=None, wait: float = 25):
+        """
+        Дождаться изменения статуса TCP сервера (long-poll)
+        
+        Возвращает (статус, etag); статус None - за wait секунд изменений не было.
+        """
+        headers = {'If-None-Match': etag} if etag else {}
+        response = requests.get(f"{self.base_url}/modbus/tcp/status", params={'wait': wait},
+                                headers=headers, timeout=wait + 5)
+        if response.status_code == 304:
+            return None, etag
+        return response.json(), response.headers.get('ETag')
+    
+    # ==================== Events ====================
+    
+    def events(self, topics=None, devices=None, last_event_id=None):
+        """
+        Подписка на изменения (Server-Sent Events)
+        
+        Возвращает генератор (event, data, id). Сначала приходит текущее состояние,
+        затем только изменения. Для продолжения после обрыва передайте id
+        последнего события в last_event_id.
+        """
+        params = {}
+        if topics:
+            params['topics'] = ','.join(topics)
+        if devices:
+            params['devices'] = ','.join(str(d) for d in devices)
+        headers = {'Last-Event-ID': last_event_id} if last_event_id else {}
+        with requests.get(f"{self.base_url}/events", params=params, headers=headers,
+                          stream=True, timeout=(5, 60)) as response:
+            event, data, event_id = 'message', [], None
+            for line in response.iter_lines(decode_unicode=True):
+                if line == '':
+                    if data:
+                        yield event, json.loads('\n'.join(data)), event_id
+                    event, data = 'message', []
+                elif line.startswith('event:'):
+                    event = line[6:].strip()
+                elif line.startswith('data:'):
+                    data.append(line[5:].strip())
+                elif line.startswith('id:'):
+                    event_id = line[3:].strip()
 
 
 def main():
@@ -229,13 +273,22 @@ def main():
     status = client.tcp_status()
     print(json.dumps(status, indent=2))
     
-    # Пример 8: Мониторинг в реальном времени
+    # Пример 8: Мониторинг в реальном времени (сервер присылает только изменения)
     print("\n[8] Real-time Monitoring (10 seconds)")
     print("-" * 50)
-    for i in range(5):
-        status = client.rtu_status()
-        print(f"[{i+1}] RTU Connected: {status.get('connected')}")
-        time.sleep(2)
+    started = time.time()
+    try:
+        for event, data, event_id in client.events():
+            if event == 'status' and 'rtu' in data:
+                print(f"RTU Connected: {data['rtu'].get('connected')}")
+            elif event == 'values':
+                for device_id, values in data['devices'].items():
+                    for name, point in values.items():
+                        print(f"Device {device_id} {name} = {point['value']} ({point['quality']})")
+            if time.time() - started > 10:
+                break
+    except requests.exceptions.ReadTimeout:
+        pass
 
 
 if __name__ == '__main__':
@@ -4,13 +4,14 @@
 """
 import os
 import sys
+import signal
 import logging
 from pathlib import Path
 
 # Добавить корневую директорию в путь
 sys.path.insert(0, str(Path(__file__).parent))
 
-from app import create_app
+from app import create_app, create_bus_service
 
 # Настройка логирования
 log_dir = Path(__file__).parent / 'logs'
@@ -28,11 +29,35 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+
+def run_bus_service():
+    """Процесс-владелец шины (APP_ROLE=bus): RTU, опрос, Modbus TCP и IPC сокет"""
+    # SIGTERM (systemd stop) завершает так же, как Ctrl+C - с освобождением портов
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    service, server = create_bus_service()
+    logger.info(f"Bus service listening on {server.path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping bus service...")
+    finally:
+        server.stop()
+        service.stop()
+
+
 if __name__ == '__main__':
     try:
+        # all - все в одном процессе; bus - только владелец шины;
+        # web - веб-сервер, работающий с шиной через процесс bus
+        role = os.environ.get('APP_ROLE', 'all')
+        if role == 'bus':
+            logger.info("Starting Smart Home bus service...")
+            run_bus_service()
+            sys.exit(0)
+        
         logger.info("Starting Smart Home Controller...")
         
-        controller = create_app()
+        controller = create_app(remote_bus=(role == 'web'))
         
         # Получить хост и порт из переменных окружения или использовать дефолты
         host = os.environ.get('APP_HOST', '0.0.0.0')
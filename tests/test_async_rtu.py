@@ -0,0 +1,226 @@
+"""
+Тесты для асинхронного Modbus RTU мастера
+"""
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import Mock, AsyncMock, patch
+from pymodbus.exceptions import ConnectionException
+from app.modbus.async_rtu_master import (
+    AsyncModbusRTUMaster, AsyncRTUMasterFacade, EventLoopThread, SLAVE_UNAVAILABLE
+)
+from app.modbus.bus_scheduler import BusPriority, bus_context, DEADLINE_EXCEEDED
+from app.modbus.slave_health import SlaveHealthTracker
+
+
+class TestAsyncModbusRTUMaster(unittest.IsolatedAsyncioTestCase):
+    """Тестирование асинхронного мастера"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.rtu = AsyncModbusRTUMaster(port='/dev/ttyUSB0', baudrate=9600)
+        self.rtu.client = AsyncMock()
+        self.rtu.connected = True
+
+    @patch('app.modbus.async_rtu_master.AsyncModbusSerialClient')
+    async def test_connect(self, mock_client):
+        """Тест подключения"""
+        instance = AsyncMock()
+        instance.connected = True
+        mock_client.return_value = instance
+        rtu = AsyncModbusRTUMaster(port='/dev/ttyUSB0')
+
+        self.assertTrue(await rtu.connect())
+        self.assertTrue(rtu.connected)
+
+    async def test_read_registers(self):
+        """Тест чтения регистров"""
+        self.rtu.client.read_holding_registers.return_value = Mock(registers=[1, 2])
+        result = await self.rtu.read_holding_registers(3, 0, 2)
+
+        self.assertEqual(result, {"success": True, "data": [1, 2]})
+        self.rtu.client.read_holding_registers.assert_awaited_once_with(0, 2, slave=3)
+
+    async def test_concurrent_reads_coalesced(self):
+        """Тест объединения одновременных чтений"""
+        async def slow_read(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return Mock(registers=[1, 2, 3, 4])
+
+        self.rtu.client.read_holding_registers.side_effect = slow_read
+        results = await asyncio.gather(*[self.rtu.read_holding_registers(1, 0, 4) for _ in range(10)],
+                                       self.rtu.read_holding_registers(1, 2, 2))
+
+        self.assertEqual(self.rtu.client.read_holding_registers.await_count, 1)
+        self.assertEqual(results[-1]['data'], [3, 4])
+
+    async def test_priority_order(self):
+        """Тест: освободившаяся шина достается записи раньше опроса, поставленного первым"""
+        order = []
+        release = asyncio.Event()
+
+        async def read(*args, **kwargs):
+            order.append(('read', kwargs['slave']))
+            if kwargs['slave'] == 1:
+                await release.wait()
+            return Mock(registers=[0])
+
+        async def write(*args, **kwargs):
+            order.append(('write', kwargs['slave']))
+            return Mock(function_code=6)
+
+        self.rtu.client.read_holding_registers.side_effect = read
+        self.rtu.client.write_register.side_effect = write
+        first = asyncio.create_task(self.rtu.read_holding_registers(1, 0, 1))
+        await asyncio.sleep(0)
+        poll = asyncio.create_task(self.rtu.read_holding_registers(2, 0, 1, priority=BusPriority.POLL))
+        write_task = asyncio.create_task(self.rtu.write_register(3, 0, 5))
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(first, poll, write_task)
+
+        self.assertEqual(order, [('read', 1), ('write', 3), ('read', 2)])
+
+    @patch.dict('app.modbus.async_rtu_master.DEFAULT_MAX_WAIT', {BusPriority.READ: 0.0})
+    async def test_write_not_starved_by_aged_reads(self):
+        """Тест: просроченные чтения не обгоняют ожидающую запись"""
+        order = []
+        release = asyncio.Event()
+
+        async def read(*args, **kwargs):
+            order.append('read')
+            if kwargs['slave'] == 1:
+                await release.wait()
+            return Mock(registers=[0])
+
+        async def write(*args, **kwargs):
+            order.append('write')
+            return Mock(function_code=6)
+
+        self.rtu.client.read_holding_registers.side_effect = read
+        self.rtu.client.write_register.side_effect = write
+        first = asyncio.create_task(self.rtu.read_holding_registers(1, 0, 1))
+        await asyncio.sleep(0)
+        reads = [asyncio.create_task(self.rtu.read_holding_registers(slave, 0, 1))
+                 for slave in range(2, 22)]
+        await asyncio.sleep(0.05)
+        write_task = asyncio.create_task(self.rtu.write_register(30, 0, 5))
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(first, write_task, *reads)
+
+        self.assertEqual(order.index('write'), 1)
+
+    async def test_no_join_lower_priority(self):
+        """Тест: чтение API не присоединяется к чтению опроса"""
+        async def slow_read(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return Mock(registers=[1, 2])
+
+        self.rtu.client.read_holding_registers.side_effect = slow_read
+        await asyncio.gather(self.rtu.read_holding_registers(1, 0, 2, priority=BusPriority.POLL),
+                             self.rtu.read_holding_registers(1, 0, 2))
+
+        self.assertEqual(self.rtu.client.read_holding_registers.await_count, 2)
+
+    async def test_circuit_open(self):
+        """Тест: после нескольких неответов slave отсекается без обращения к шине"""
+        self.rtu.client.read_holding_registers.side_effect = asyncio.TimeoutError()
+        for _ in range(3):
+            self.assertFalse((await self.rtu.read_holding_registers(1, 0, 1, use_cache=False))['success'])
+        result = await self.rtu.read_holding_registers(1, 0, 1)
+
+        self.assertEqual(result['error'], SLAVE_UNAVAILABLE.format(1))
+        self.assertEqual(self.rtu.client.read_holding_registers.await_count, 3)
+        self.assertTrue(self.rtu.connected)
+        self.assertEqual(self.rtu.get_status()['slaves']['1']['state'], 'open')
+
+    async def test_link_lost(self):
+        """Тест: ошибка порта сбрасывает connected для супервизора переподключения"""
+        self.rtu.client.write_register.side_effect = ConnectionException('port closed')
+        result = await self.rtu.write_register(1, 0, 5)
+
+        self.assertFalse(result['success'])
+        self.assertFalse(self.rtu.connected)
+
+    async def test_probe_after_link_loss(self):
+        """Тест: ошибка порта во время пробы не оставляет slave недоступным навсегда"""
+        self.rtu.health = SlaveHealthTracker(backoff_initial=0.0)
+        self.rtu.client.read_holding_registers.side_effect = asyncio.TimeoutError()
+        for _ in range(3):
+            await self.rtu.read_holding_registers(1, 0, 1)
+        self.rtu.client.read_holding_registers.side_effect = ConnectionException('port gone')
+        await self.rtu.read_holding_registers(1, 0, 1)
+
+        self.rtu.connected = True
+        self.rtu.client.read_holding_registers.side_effect = None
+        self.rtu.client.read_holding_registers.return_value = Mock(registers=[9])
+        self.assertEqual(await self.rtu.read_holding_registers(1, 0, 1), {"success": True, "data": [9]})
+        self.assertEqual(self.rtu.get_status()['slaves']['1']['state'], 'closed')
+
+    async def test_write_not_connected(self):
+        """Тест записи без подключения"""
+        self.rtu.connected = False
+        result = await self.rtu.write_register(1, 0, 5)
+        self.assertFalse(result['success'])
+
+
+class TestAsyncRTUMasterFacade(unittest.TestCase):
+    """Тестирование синхронного фасада"""
+
+    def test_sync_calls(self):
+        """Тест вызова асинхронного мастера из обычного потока"""
+        loop_thread = EventLoopThread()
+        master = AsyncModbusRTUMaster(port='/dev/ttyUSB0')
+        master.client = AsyncMock()
+        master.client.write_coil.return_value = Mock(function_code=5)
+        master.connected = True
+        facade = AsyncRTUMasterFacade(master, loop_thread)
+        try:
+            self.assertEqual(facade.write_coil(1, 0, True), {"success": True})
+            self.assertEqual(facade.port, '/dev/ttyUSB0')
+            self.assertEqual(facade.get_status()['mode'], 'async')
+        finally:
+            loop_thread.stop()
+
+    def test_deadline(self):
+        """Тест: срок ограничивает ожидание шины, начатая транзакция доводится до конца"""
+        loop_thread = EventLoopThread()
+        master = AsyncModbusRTUMaster(port='/dev/ttyUSB0', timeout=0.5)
+        master.client = AsyncMock()
+        master.connected = True
+
+        async def slow_read(*args, **kwargs):
+            await asyncio.sleep(0.3)
+            return Mock(registers=[1, 2])
+
+        master.client.read_holding_registers.side_effect = slow_read
+        facade = AsyncRTUMasterFacade(master, loop_thread)
+        try:
+            first = {}
+            thread = threading.Thread(target=lambda: first.update(facade.read_holding_registers(1, 0, 2)))
+            thread.start()
+            time.sleep(0.05)
+
+            # Шина занята дольше срока - транзакция не выполняется
+            with bus_context(deadline=time.monotonic() + 0.1):
+                result = facade.write_register(1, 0, 5)
+            self.assertEqual(result, {"success": False, "error": DEADLINE_EXCEEDED})
+            master.client.write_register.assert_not_awaited()
+
+            # Начатая транзакция завершается после срока и возвращает результат
+            thread.join(2)
+            self.assertEqual(first, {"success": True, "data": [1, 2]})
+            with bus_context(deadline=time.monotonic() + 0.1):
+                result = facade.read_holding_registers(2, 0, 2)
+            self.assertEqual(result, {"success": True, "data": [1, 2]})
+
+            with bus_context(deadline=time.monotonic() - 1):
+                self.assertEqual(facade.read_holding_registers(1, 0, 2)['error'], DEADLINE_EXCEEDED)
+            self.assertEqual(master.client.read_holding_registers.await_count, 2)
+        finally:
+            loop_thread.stop()
+
+if __name__ == '__main__':
+    unittest.main()
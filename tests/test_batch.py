@@ -0,0 +1,130 @@
+"""
+Тесты для пакетного выполнения операций чтения и записи
+"""
+import time
+import unittest
+from unittest.mock import MagicMock, Mock, patch
+from app.modbus.batch import run_batch, MAX_JOB_FRAMES
+from app.modbus.bus_manager import RTUBusManager
+from app.modbus.bus_scheduler import BusPriority, bus_context, DEADLINE_EXCEEDED
+from app.modbus.rtu_master import ModbusRTUMaster
+
+
+def registers(start_addr, quantity, slave=1):
+    """Ответ устройства: значение регистра равно его адресу"""
+    return Mock(registers=list(range(start_addr, start_addr + quantity)))
+
+
+class TestRunBatch(unittest.TestCase):
+    """Тестирование пакетов операций"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.master = ModbusRTUMaster(port='/dev/ttyUSB0')
+        self.master.client = MagicMock()
+        self.master.client.read_holding_registers.side_effect = registers
+        self.master.client.read_coils.return_value = Mock(bits=[True, False, True, False] + [False] * 4)
+        self.master.connected = True
+        self.addCleanup(self.master.scheduler.stop)
+        self.buses = RTUBusManager()
+        self.buses.add_bus('line1', self.master)
+
+    def test_reads_merged(self):
+        """Тест: соседние чтения одного slave - один запрос, каждый получает свой диапазон"""
+        result = run_batch(self.buses, [
+            {"slave_id": 1, "type": "holding_registers", "start_addr": 4, "quantity": 2},
+            {"slave_id": 1, "type": "coils", "start_addr": 0, "quantity": 3},
+            {"slave_id": 1, "type": "holding_registers", "start_addr": 0, "quantity": 2,
+             "encoding": "hex"}
+        ])
+
+        self.assertEqual(result['frames'], 2)
+        self.assertEqual(result['failed'], 0)
+        self.master.client.read_holding_registers.assert_called_once_with(0, 6, slave=1)
+        self.assertEqual(result['results'], [
+            {"success": True, "data": [4, 5]},
+            {"success": True, "data": [True, False, True]},
+            {"success": True, "encoding": "hex", "data": "00000001"}
+        ])
+
+    def test_writes_merged_before_following_read(self):
+        """Тест: соседние записи - один FC16, чтение после записей выполняется после них"""
+        result = run_batch(self.buses, [
+            {"slave_id": 1, "type": "register", "addr": 10, "value": 1},
+            {"slave_id": 1, "type": "register", "addr": 11, "value": 2},
+            {"slave_id": 1, "type": "coil", "addr": 3, "value": True},
+            {"slave_id": 1, "type": "holding_registers", "start_addr": 10, "quantity": 2}
+        ])
+
+        self.assertEqual(result['frames'], 3)
+        calls = [call[0] for call in self.master.client.mock_calls]
+        self.assertEqual(calls, ['write_registers', 'write_coil', 'read_holding_registers'])
+        self.master.client.write_registers.assert_called_once_with(10, [1, 2], slave=1)
+        self.assertEqual([r['success'] for r in result['results']], [True] * 4)
+
+    def test_phase_priorities_and_job_size(self):
+        """Тест: запись и чтения - отдельные заявки со своим приоритетом, не больше MAX_JOB_FRAMES транзакций"""
+        operations = [{"slave_id": 1, "type": "register", "addr": 0, "value": 1}]
+        operations += [{"slave_id": 1, "type": "holding_registers", "start_addr": addr, "quantity": 1}
+                       for addr in range(MAX_JOB_FRAMES + 4)]
+        with patch.object(self.master, 'submit_batch', wraps=self.master.submit_batch) as submit:
+            result = run_batch(self.buses, operations, merge=False)
+
+        self.assertEqual(result['failed'], 0)
+        jobs = [(len(call.args[0]), call.args[1]) for call in submit.call_args_list]
+        self.assertEqual(jobs, [(1, BusPriority.WRITE), (MAX_JOB_FRAMES, BusPriority.READ), (4, BusPriority.READ)])
+
+    def test_partial_failure(self):
+        """Тест: ошибка одной операции не мешает остальным"""
+        def read(start_addr, quantity, slave):
+            if slave == 2:
+                raise Exception("No response")
+            return registers(start_addr, quantity)
+
+        self.master.client.read_holding_registers.side_effect = read
+        result = run_batch(self.buses, [
+            {"slave_id": 1, "type": "holding_registers", "start_addr": 0, "quantity": 1},
+            {"slave_id": 2, "type": "holding_registers", "start_addr": 0, "quantity": 1},
+            {"slave_id": 1, "type": "unknown"}
+        ])
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['failed'], 2)
+        self.assertEqual(result['results'][0], {"success": True, "data": [0]})
+        self.assertEqual(result['results'][1], {"success": False, "error": "No response"})
+        self.assertEqual(result['results'][2], {"success": False, "error": "Unknown operation type"})
+
+    def test_deadline(self):
+        """Тест: транзакции, не начатые до крайнего срока, не выполняются"""
+        def slow_read(start_addr, quantity, slave):
+            time.sleep(0.2)
+            return registers(start_addr, quantity)
+
+        self.master.client.read_holding_registers.side_effect = slow_read
+        result = run_batch(self.buses, [
+            {"slave_id": 1, "type": "holding_registers", "start_addr": 0, "quantity": 1},
+            {"slave_id": 2, "type": "holding_registers", "start_addr": 0, "quantity": 1}
+        ], timeout=0.1)
+
+        self.assertEqual(result['results'][0], {"success": True, "data": [0]})
+        self.assertEqual(result['results'][1], {"success": False, "error": DEADLINE_EXCEEDED})
+        self.assertEqual(self.master.client.read_holding_registers.call_count, 1)
+
+    def test_request_deadline(self):
+        """Тест: крайний срок запроса (bus_context) ограничивает пакет без timeout"""
+        with bus_context(deadline=time.monotonic() - 1):
+            result = run_batch(self.buses, [
+                {"slave_id": 1, "type": "holding_registers", "start_addr": 0, "quantity": 1}
+            ], timeout=10)
+
+        self.assertEqual(result['results'], [{"success": False, "error": DEADLINE_EXCEEDED}])
+        self.master.client.read_holding_registers.assert_not_called()
+
+    def test_operation_limit(self):
+        """Тест ограничения размера пакета"""
+        operations = [{"slave_id": 1, "type": "coils", "start_addr": 0, "quantity": 1}] * 1000
+        self.assertFalse(run_batch(self.buses, operations)['success'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Тесты для планировщика блочного чтения
+"""
+import unittest
+from types import SimpleNamespace
+from app.modbus.block_planner import plan_reads, describe_plan, MAX_READ_REGISTERS
+
+
+def point(slave_id, type, address, count=1):
+    return SimpleNamespace(slave_id=slave_id, type=type, address=address, count=count)
+
+
+class TestBlockPlanner(unittest.TestCase):
+    """Тестирование объединения чтений"""
+
+    def test_merges_adjacent_addresses(self):
+        """Тест объединения соседних регистров в один запрос"""
+        items = [point(1, 'holding_register', a) for a in (5, 0, 1, 2)]
+        blocks = plan_reads(items, max_gap=3)
+
+        self.assertEqual(len(blocks), 1)
+        self.assertEqual((blocks[0].start, blocks[0].quantity), (0, 6))
+        self.assertEqual(len(blocks[0].items), 4)
+
+    def test_gap_limit(self):
+        """Тест разбиения при превышении допустимого пропуска"""
+        items = [point(1, 'holding_register', 0), point(1, 'holding_register', 20)]
+        self.assertEqual(len(plan_reads(items, max_gap=8)), 2)
+        self.assertEqual(len(plan_reads(items, max_gap=19)), 1)
+
+    def test_groups_by_slave_and_type(self):
+        """Тест группировки по slave и функции"""
+        items = [
+            point(1, 'holding_register', 0),
+            point(1, 'input_register', 1),
+            point(2, 'holding_register', 1),
+            point(1, 'coil', 0),
+        ]
+        self.assertEqual(len(plan_reads(items)), 4)
+
+    def test_protocol_limits(self):
+        """Тест соблюдения ограничения 125 регистров и 2000 катушек"""
+        registers = [point(1, 'holding_register', a) for a in range(300)]
+        blocks = plan_reads(registers)
+        self.assertTrue(all(b.quantity <= MAX_READ_REGISTERS for b in blocks))
+        self.assertEqual(len(blocks), 3)
+
+        coils = [point(1, 'coil', a) for a in range(0, 4000, 10)]
+        self.assertEqual(len(plan_reads(coils)), 2)
+
+    def test_multi_register_points(self):
+        """Тест точек, занимающих несколько регистров"""
+        items = [point(1, 'holding_register', 0, count=2), point(1, 'holding_register', 2, count=2)]
+        blocks = plan_reads(items, max_gap=0)
+        self.assertEqual((blocks[0].start, blocks[0].quantity), (0, 4))
+
+    def test_describe_plan(self):
+        """Тест сводки плана"""
+        items = [point(1, 'holding_register', a) for a in range(10)]
+        plan = describe_plan(plan_reads(items))
+        self.assertEqual(plan['frames'], 1)
+        self.assertEqual(plan['points'], 10)
+        self.assertEqual(plan['registers'], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+Тесты для IPC между процессом шины и процессами веб-сервера
+"""
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from app.bus_ipc import BusClient, BusIPCServer, EventMirror
+from app.bus_service import BusService
+from app.event_stream import EventHub, TOPIC_VALUES
+from app.modbus.bus_scheduler import bus_context, remaining_time, DEADLINE_EXCEEDED
+
+
+class TestBusIPC(unittest.TestCase):
+    """Тестирование вызовов BusService через Unix сокет"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'bus.sock')
+        self.service = BusService(MagicMock())
+        self.server = self._start_server()
+        self.client = BusClient(self.path, timeout=5)
+        self.addCleanup(self.client.close)
+
+    def _start_server(self) -> BusIPCServer:
+        server = BusIPCServer(self.service, self.path)
+        server.start()
+        self.addCleanup(server.stop)
+        return server
+
+    def test_call(self):
+        """Тест: методы сервиса вызываются как методы клиента"""
+        self.assertEqual(self.client.poll_status(), {'error': 'Poller not initialized'})
+        result = self.client.rtu_read(slave_id=1, read_type='coils', start_addr=0, quantity=1,
+                                      encoding='bad')
+        self.assertEqual(result, {'success': False, 'error': 'Unknown encoding'})
+        with self.assertRaises(AttributeError):
+            self.client.stop
+
+    def test_method_error(self):
+        """Тест: исключение метода возвращается ошибкой, соединение остается рабочим"""
+        self.service.poll_plan = MagicMock(side_effect=RuntimeError("boom"))
+        self.assertEqual(self.client.poll_plan(), {'success': False, 'error': 'boom'})
+        self.assertEqual(self.client.call('shutdown'), {'success': False, 'error': 'Unknown method: shutdown'})
+        self.assertEqual(self.client.poll_status(), {'error': 'Poller not initialized'})
+        self.assertEqual(len(self.client.pool), 1)
+
+    def test_deadline_forwarded(self):
+        """Тест: крайний срок вызывающего потока действует и в процессе шины"""
+        self.service.poll_plan = lambda: {'remaining': remaining_time()}
+        self.assertEqual(self.client.poll_plan(), {'remaining': None})
+        with bus_context(deadline=time.monotonic() + 2):
+            remaining = self.client.poll_plan()['remaining']
+        self.assertTrue(0 < remaining <= 2)
+
+        # Истекший срок - запрос не отправляется
+        self.service.poll_plan = MagicMock()
+        with bus_context(deadline=time.monotonic() - 1):
+            self.assertEqual(self.client.poll_plan(), {'success': False, 'error': DEADLINE_EXCEEDED})
+        self.service.poll_plan.assert_not_called()
+
+    def test_concurrent_calls(self):
+        """Тест: запросы разных потоков выполняются параллельно по отдельным соединениям"""
+        def slow_plan():
+            time.sleep(0.3)
+            return {'success': True}
+
+        self.service.poll_plan = slow_plan
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.client.poll_plan())) for _ in range(4)]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLess(time.monotonic() - started, 0.9)
+        self.assertEqual(results, [{'success': True}] * 4)
+        self.assertEqual(len(self.client.pool), 4)
+
+    def test_service_restart(self):
+        """Тест: после перезапуска сервиса клиент переподключается, пока сервиса нет - ошибка"""
+        self.assertIn('error', self.client.poll_status())
+        self.server.stop()
+        result = self.client.poll_status()
+        self.assertFalse(result['success'])
+        self.assertIn('unavailable', result['error'])
+
+        self._start_server()
+        self.assertEqual(self.client.poll_status(), {'error': 'Poller not initialized'})
+
+    def test_socket_in_use(self):
+        """Тест: второй сервис не запускается на занятом сокете, сокет завершенного - удаляется"""
+        with self.assertRaises(OSError):
+            BusIPCServer(self.service, self.path)
+
+        self.server.stop()
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.path)
+        stale.close()
+        self._start_server()
+        self.assertEqual(self.client.poll_status(), {'error': 'Poller not initialized'})
+
+
+class TestEventMirror(unittest.TestCase):
+    """Тестирование копии потока событий в процессе веб-сервера"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'bus.sock')
+        self.service = BusService(MagicMock())
+        server = BusIPCServer(self.service, path)
+        server.start()
+        self.addCleanup(server.stop)
+        client = BusClient(path, timeout=5)
+        self.addCleanup(client.close)
+        self.hub = EventHub()
+        self.mirror = EventMirror(client, self.hub, wait=1.0)
+        self.addCleanup(self.mirror.stop)
+
+    def _wait_for(self, condition, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    def test_mirror(self):
+        """Тест: копия получает изменения с токенами сервиса и удаление точек"""
+        events = self.service.events
+        events.publish((TOPIC_VALUES, 1, 't'), {"value": 1})
+        self.mirror.start()
+        self.assertTrue(self._wait_for(lambda: self.hub.token() == events.token()))
+
+        events.publish((TOPIC_VALUES, 2, 't'), {"value": 2})
+        self.assertTrue(self._wait_for(lambda: self.hub.token() == events.token()))
+        self.assertEqual(dict(self.hub.changes_since(0, lambda key: True)[1]), {
+            (TOPIC_VALUES, 1, 't'): {"value": 1},
+            (TOPIC_VALUES, 2, 't'): {"value": 2}
+        })
+
+        # Токен, выданный сервисом, действует в копии
+        token = events.token()
+        events.publish((TOPIC_VALUES, 1, 't'), {"value": 3})
+        self.assertTrue(self._wait_for(lambda: self.hub.token() == events.token()))
+        _, items = self.hub.poll(token, lambda key: True)
+        self.assertEqual(items, [((TOPIC_VALUES, 1, 't'), {"value": 3})])
+
+        events.forget(lambda key: key[1] != 2)
+        self.assertTrue(self._wait_for(lambda: self.hub.epoch == events.epoch))
+        self.assertEqual([key for key, _ in self.hub.changes_since(0, lambda key: True)[1]],
+                         [(TOPIC_VALUES, 1, 't')])
+
+
+if __name__ == '__main__':
+    unittest.main()
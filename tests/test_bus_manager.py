@@ -0,0 +1,123 @@
+"""
+Тесты для нескольких RTU линий и маршрутизации
+"""
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from app.modbus.bus_manager import RTUBusManager, bus_configs, DEFAULT_BUS
+from app.modbus.poller import ModbusPoller
+from app.modbus.rtu_master import ModbusRTUMaster
+
+
+class TestBusConfigs(unittest.TestCase):
+    """Тестирование разбора конфигурации линий"""
+
+    def test_legacy_single_port(self):
+        """Тест старого формата с одним портом"""
+        buses = bus_configs({"port": "/dev/ttyUSB1", "baudrate": 19200})
+        self.assertEqual(len(buses), 1)
+        self.assertEqual(buses[0]['name'], DEFAULT_BUS)
+        self.assertEqual(buses[0]['port'], '/dev/ttyUSB1')
+        self.assertEqual(buses[0]['baudrate'], 19200)
+
+    def test_ports_list(self):
+        """Тест списка портов"""
+        buses = bus_configs({
+            "baudrate": 9600,
+            "ports": [
+                {"name": "line1", "port": "/dev/ttyUSB0", "slaves": [1, 2]},
+                {"port": "/dev/ttyUSB1", "baudrate": 38400}
+            ]
+        })
+        self.assertEqual([b['name'] for b in buses], ['line1', '/dev/ttyUSB1'])
+        self.assertEqual(buses[1]['baudrate'], 38400)
+        self.assertEqual(buses[0]['slaves'], [1, 2])
+
+
+class TestRTUBusManager(unittest.TestCase):
+    """Тестирование маршрутизации"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.line1 = MagicMock(spec=ModbusRTUMaster)
+        self.line2 = MagicMock(spec=ModbusRTUMaster)
+        self.manager = RTUBusManager()
+        self.manager.add_bus('line1', self.line1, slaves=[1])
+        self.manager.add_bus('line2', self.line2, slaves=[2])
+
+    def test_routing(self):
+        """Тест выбора линии по slave_id"""
+        self.manager.read_holding_registers(2, 0, 4)
+        self.line2.read_holding_registers.assert_called_once_with(2, 0, 4)
+        self.line1.read_holding_registers.assert_not_called()
+
+    def test_unknown_slave_goes_to_default(self):
+        """Тест: неизвестный slave - на линию по умолчанию"""
+        self.assertIs(self.manager.resolve(99), self.line1)
+        self.assertIs(self.manager.resolve(1, bus='line2'), self.line2)
+
+    def test_routes_from_devices(self):
+        """Тест маршрутов из поля bus устройств"""
+        self.manager.load_routes([{"slave_id": 7, "bus": "line2"}])
+        self.assertEqual(self.manager.bus_for(7), 'line2')
+
+    def test_routes_rebuilt(self):
+        """Тест: маршруты удаленных устройств не сохраняются, маршруты линий остаются"""
+        self.manager.load_routes([{"slave_id": 7, "bus": "line2"}, {"slave_id": 1, "bus": "line2"}])
+        self.assertEqual(self.manager.bus_for(1), 'line2')
+        self.manager.load_routes([])
+        self.assertEqual(self.manager.routes, {1: 'line1', 2: 'line2'})
+
+    def test_same_slave_on_two_buses(self):
+        """Тест: одинаковый slave_id на разных линиях - разные устройства"""
+        self.line1.read_holding_registers.return_value = {"success": True, "data": [11]}
+        self.line2.read_holding_registers.return_value = {"success": True, "data": [22]}
+        devices = [
+            {"id": 1, "bus": "line1", "slave_id": 5, "registers": [{"name": "a", "address": 0}]},
+            {"id": 2, "bus": "line2", "slave_id": 5, "registers": [{"name": "b", "address": 1}]},
+        ]
+        self.manager.load_routes(devices)
+        poller = ModbusPoller(self.manager, devices)
+        self.assertEqual(poller.get_plan()['frames'], 2)
+        poller.poll_due()
+        poller.stop()
+
+        self.line1.read_holding_registers.assert_called_once_with(5, 0, 1, use_cache=False)
+        self.line2.read_holding_registers.assert_called_once_with(5, 1, 1, use_cache=False)
+        snapshot = poller.get_snapshot()
+        self.assertEqual(snapshot['1']['points']['a']['value'], 11)
+        self.assertEqual(snapshot['2']['points']['b']['value'], 22)
+
+    def test_remove_bus(self):
+        """Тест удаления линии"""
+        self.manager.remove_bus('line1')
+        self.assertEqual(self.manager.default_bus, 'line2')
+        self.assertEqual(self.manager.bus_for(1), 'line2')
+
+    def test_buses_polled_in_parallel(self):
+        """Тест: линии опрашиваются параллельно"""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def slow_read(*args, **kwargs):
+            barrier.wait()
+            time.sleep(0.05)
+            return {"success": True, "data": [1]}
+
+        self.line1.read_holding_registers.side_effect = slow_read
+        self.line2.read_holding_registers.side_effect = slow_read
+        devices = [
+            {"id": 1, "slave_id": 1, "registers": [{"name": "a", "address": 0}]},
+            {"id": 2, "slave_id": 2, "registers": [{"name": "b", "address": 0}]},
+        ]
+        poller = ModbusPoller(self.manager, devices)
+        poller.poll_due()
+        poller.stop()
+
+        snapshot = poller.get_snapshot()
+        self.assertEqual(snapshot['1']['points']['a']['value'], 1)
+        self.assertEqual(snapshot['2']['points']['b']['value'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
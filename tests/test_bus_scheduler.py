@@ -0,0 +1,153 @@
+"""
+Тесты для планировщика транзакций шины
+"""
+import threading
+import time
+import unittest
+from app.modbus.bus_scheduler import (
+    BusScheduler, BusPriority, bus_context, current_priority, DEADLINE_EXCEEDED, OUTCOME_UNKNOWN
+)
+
+
+class TestBusScheduler(unittest.TestCase):
+    """Тестирование очереди с приоритетами"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.scheduler = BusScheduler(name='test')
+        self.order = []
+        self.gate = threading.Event()
+
+    def tearDown(self):
+        """Очистка после тестов"""
+        self.gate.set()
+        self.scheduler.stop()
+
+    def _block_bus(self):
+        """Занять шину, пока не будет открыт gate"""
+        started = threading.Event()
+
+        def blocker():
+            started.set()
+            self.gate.wait(5)
+            return {"success": True}
+
+        future = self.scheduler.submit(blocker, BusPriority.POLL)
+        started.wait(5)
+        return future
+
+    def _job(self, name):
+        def fn():
+            self.order.append(name)
+            return {"success": True, "name": name}
+        return fn
+
+    def test_priority_order(self):
+        """Тест: запись обслуживается раньше чтений и опроса"""
+        blocker = self._block_bus()
+        futures = [
+            self.scheduler.submit(self._job('poll'), BusPriority.POLL),
+            self.scheduler.submit(self._job('read'), BusPriority.READ),
+            self.scheduler.submit(self._job('write'), BusPriority.WRITE),
+        ]
+        self.gate.set()
+        blocker.result(5)
+        for future in futures:
+            future.result(5)
+
+        self.assertEqual(self.order, ['write', 'read', 'poll'])
+
+    def test_starvation_protection(self):
+        """Тест: долго ожидающая заявка обслуживается вне очереди"""
+        self.scheduler.max_wait[BusPriority.DISCOVERY] = 0.0
+        blocker = self._block_bus()
+        discovery = self.scheduler.submit(self._job('discovery'), BusPriority.DISCOVERY)
+        time.sleep(0.01)
+        read = self.scheduler.submit(self._job('read'), BusPriority.READ)
+        self.gate.set()
+        blocker.result(5)
+        discovery.result(5)
+        read.result(5)
+
+        self.assertEqual(self.order, ['discovery', 'read'])
+
+    def test_write_not_starved_by_aged_reads(self):
+        """Тест: просроченные чтения не обгоняют ожидающую запись"""
+        self.scheduler.max_wait[BusPriority.READ] = 0.0
+        blocker = self._block_bus()
+        reads = [self.scheduler.submit(self._job('read'), BusPriority.READ) for _ in range(20)]
+        time.sleep(0.05)
+        write = self.scheduler.submit(self._job('write'), BusPriority.WRITE)
+        self.gate.set()
+        blocker.result(5)
+        write.result(5)
+        for future in reads:
+            future.result(5)
+
+        self.assertEqual(self.order.index('write'), 0)
+
+    def test_expired_deadline_dropped(self):
+        """Тест: заявка с истекшим сроком не выполняется"""
+        blocker = self._block_bus()
+        result = self.scheduler.run(self._job('late'), BusPriority.READ,
+                                    deadline=time.monotonic() + 0.05)
+        self.gate.set()
+        blocker.result(5)
+        self.scheduler.run(self._job('next'), BusPriority.READ)
+
+        self.assertEqual(result['error'], DEADLINE_EXCEEDED)
+        self.assertEqual(self.order, ['next'])
+        self.assertEqual(self.scheduler.get_stats()['read']['dropped'], 1)
+
+    def test_started_transaction_awaited(self):
+        """Тест: транзакция, начатая до крайнего срока, не считается отброшенной"""
+        def slow():
+            time.sleep(0.2)
+            return {"success": True}
+
+        result = self.scheduler.run(slow, BusPriority.WRITE, deadline=time.monotonic() + 0.05)
+        self.assertEqual(result, {"success": True})
+
+        scheduler = BusScheduler(name='short', transaction_timeout=0.05)
+        self.addCleanup(scheduler.stop)
+        result = scheduler.run(slow, BusPriority.WRITE, deadline=time.monotonic() + 0.05)
+        self.assertEqual(result, {"success": False, "error": OUTCOME_UNKNOWN})
+
+    def test_submit_during_stop(self):
+        """Тест: заявка во время остановки не запускает второй рабочий поток"""
+        blocker = self._block_bus()
+        stopper = threading.Thread(target=self.scheduler.stop)
+        stopper.start()
+        time.sleep(0.05)
+
+        threads = []
+        future = self.scheduler.submit(lambda: threads.append(threading.current_thread()) or {"success": True})
+        time.sleep(0.05)
+        self.assertEqual(threads, [])
+        worker = self.scheduler.worker
+        self.gate.set()
+        blocker.result(5)
+        self.assertEqual(future.result(5), {"success": True})
+        stopper.join(5)
+        self.assertEqual(threads, [worker])
+        self.assertEqual([t.name for t in threading.enumerate()].count('bus-test'), 1)
+
+    def test_context_priority(self):
+        """Тест: приоритет из контекста потока"""
+        self.assertEqual(current_priority(BusPriority.READ), BusPriority.READ)
+        with bus_context(priority=BusPriority.POLL):
+            self.assertEqual(current_priority(BusPriority.READ), BusPriority.POLL)
+        self.assertEqual(current_priority(BusPriority.READ), BusPriority.READ)
+
+    def test_stats(self):
+        """Тест статистики очередей"""
+        self.scheduler.run(self._job('write'), BusPriority.WRITE)
+        stats = self.scheduler.get_stats()
+
+        self.assertEqual(stats['write']['submitted'], 1)
+        self.assertEqual(stats['write']['completed'], 1)
+        self.assertEqual(stats['write']['queued'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -41,6 +41,14 @@ class TestConfigManager(unittest.TestCase):
         config = self.config_manager.get_all()
         self.assertIsInstance(config, dict)
         self.assertIn('network', config)
+    
+    def test_update(self):
+        """Тест обновления нескольких значений с сохранением в файл"""
+        self.assertTrue(self.config_manager.update({'network': {'hostname': 'updated'}}))
+        
+        new_config = ConfigManager(config_file=self.config_file)
+        self.assertEqual(new_config.get('network.hostname'), 'updated')
+        self.assertEqual(new_config.get('network.ip_mode'), 'dhcp')
 
 
 if __name__ == '__main__':
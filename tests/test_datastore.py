@@ -0,0 +1,57 @@
+"""
+Тесты для страничного хранилища Modbus
+"""
+import unittest
+from app.modbus.datastore import PagedDataBlock
+
+
+class TestPagedDataBlock(unittest.TestCase):
+    """Тестирование страничного блока данных"""
+
+    def test_range_across_pages(self):
+        """Тест записи и чтения диапазона на границе страниц"""
+        block = PagedDataBlock(page_size=16)
+        block.setValues(10, list(range(20)))
+
+        self.assertEqual(block.getValues(10, 20), list(range(20)))
+        self.assertEqual(len(block.pages), 2)
+        self.assertEqual(block.memory_bytes(), 2 * 16 * 3)
+
+    def test_strict_validation(self):
+        """Тест: в строгом режиме читаются только записанные адреса"""
+        block = PagedDataBlock(page_size=16)
+        block.setValues(100, [1, 2])
+
+        self.assertTrue(block.validate(100, 2))
+        self.assertFalse(block.validate(99, 2))
+        self.assertFalse(block.validate(5000))
+        self.assertFalse(block.validate(65535, 2))
+
+    def test_lenient_full_address_space(self):
+        """Тест: без строгого режима все адресное пространство читается как 0 без выделения памяти"""
+        block = PagedDataBlock(strict=False)
+
+        self.assertTrue(block.validate(65000, 125))
+        self.assertEqual(block.getValues(65530, 6), [0] * 6)
+        self.assertEqual(block.pages, {})
+
+    def test_bits(self):
+        """Тест битового блока"""
+        block = PagedDataBlock(bits=True, page_size=8)
+        block.setValues(6, [True, False, True])
+
+        self.assertEqual(block.getValues(6, 3), [True, False, True])
+        self.assertEqual(list(block), [(i, i in (6, 8)) for i in range(16)])
+
+    def test_reset(self):
+        """Тест освобождения страниц"""
+        block = PagedDataBlock()
+        block.setValues(0, [1])
+        block.reset()
+
+        self.assertFalse(block.validate(0))
+        self.assertEqual(block.memory_bytes(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
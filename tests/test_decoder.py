@@ -0,0 +1,84 @@
+"""
+Тесты для декодера карты регистров
+"""
+import struct
+import unittest
+from app.modbus.decoder import RegisterMapDecoder
+
+
+def words(fmt: str, *values):
+    """Значения в список регистров (big-endian)"""
+    raw = struct.pack('>' + fmt, *values)
+    return [int.from_bytes(raw[i:i + 2], 'big') for i in range(0, len(raw), 2)]
+
+
+class TestRegisterMapDecoder(unittest.TestCase):
+    """Тестирование декодера"""
+
+    def test_scale_and_signed(self):
+        """Тест масштаба, смещения и знаковых значений"""
+        decoder = RegisterMapDecoder([
+            {"name": "temperature", "address": 0, "scale": 0.1},
+            {"name": "delta", "address": 1, "data_type": "int16", "offset": 100}
+        ])
+        values = decoder.decode('holding_registers', 0, [215, 0xFFFE])
+
+        self.assertAlmostEqual(values['temperature'], 21.5)
+        self.assertEqual(values['delta'], 98)
+
+    def test_multi_register_types(self):
+        """Тест 32/64-битных целых и чисел с плавающей точкой в одном блоке"""
+        decoder = RegisterMapDecoder([
+            {"name": "energy", "address": 10, "data_type": "uint32"},
+            {"name": "power", "address": 14, "data_type": "float32"},
+            {"name": "total", "address": 16, "data_type": "int64"},
+            {"name": "precise", "address": 20, "data_type": "float64"}
+        ])
+        data = (words('I', 70000) + [0, 0] + words('f', 1.5) + words('q', -5)
+                + words('d', 3.25))
+        values = decoder.decode('holding_registers', 10, data)
+
+        self.assertEqual(values['energy'], 70000)
+        self.assertEqual(values['power'], 1.5)
+        self.assertEqual(values['total'], -5)
+        self.assertEqual(values['precise'], 3.25)
+
+    def test_word_and_byte_order(self):
+        """Тест порядка слов и байтов"""
+        decoder = RegisterMapDecoder([
+            {"name": "swapped", "address": 0, "type": "input_register",
+             "data_type": "float32", "word_order": "little"},
+            {"name": "bytes", "address": 2, "type": "input_register", "byte_order": "little"}
+        ])
+        high, low = words('f', 2.5)
+        values = decoder.decode('input_registers', 0, [low, high, 0x3412])
+
+        self.assertEqual(values['swapped'], 2.5)
+        self.assertEqual(values['bytes'], 0x1234)
+
+    def test_bit_extraction(self):
+        """Тест извлечения битов из регистра состояния"""
+        decoder = RegisterMapDecoder([
+            {"name": "status", "address": 5},
+            {"name": "alarm", "address": 5, "bit": 3},
+            {"name": "ready", "address": 5, "bit": 0}
+        ])
+        values = decoder.decode('holding_registers', 5, [0b1000])
+
+        self.assertEqual(values['status'], 8)
+        self.assertTrue(values['alarm'])
+        self.assertFalse(values['ready'])
+
+    def test_partial_block_and_coils(self):
+        """Тест значений, не полностью попавших в блок, и битовых таблиц"""
+        decoder = RegisterMapDecoder([
+            {"name": "energy", "address": 1, "data_type": "uint32"},
+            {"name": "relay", "address": 2, "type": "coil"}
+        ])
+
+        self.assertEqual(decoder.decode('holding_registers', 0, [0, 1]), {})
+        self.assertEqual(decoder.decode('coils', 0, [False, False, True]), {"relay": True})
+
+
+if __name__ == '__main__':
+    unittest.main()
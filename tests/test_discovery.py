@@ -0,0 +1,129 @@
+"""
+Тесты для обнаружения slave устройств
+"""
+import threading
+import unittest
+from unittest.mock import MagicMock
+from pymodbus.mei_message import ReadDeviceInformationResponse
+from pymodbus.pdu import ExceptionResponse
+from pymodbus.register_read_message import ReadHoldingRegistersResponse
+from app.modbus.discovery import SlaveDiscovery, DiscoveryState, DeviceStatus
+from app.modbus.rtu_master import ModbusRTUMaster
+
+
+class FakeBus:
+    """Линия с набором отвечающих устройств"""
+
+    def __init__(self, devices):
+        self.devices = devices      # slave_id -> (значение пробного регистра, идентификация или None)
+        self.calls = []
+
+    def probe(self, slave_id, call, *args, timeout=0.1):
+        self.calls.append((slave_id, call))
+        device = self.devices.get(slave_id)
+        if device is None:
+            return {"success": False, "error": "No response"}
+        value, identity = device
+        if call == 'read_device_information':
+            if identity is None:
+                return {"success": True, "response": ExceptionResponse(0x2B, 1)}
+            return {"success": True, "response": ReadDeviceInformationResponse(information=identity)}
+        return {"success": True, "response": ReadHoldingRegistersResponse([value])}
+
+
+class TestSlaveDiscovery(unittest.TestCase):
+    """Тестирование сканирования адресов"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.master = MagicMock()
+        self.master.port = '/dev/ttyUSB0'
+        self.master.connected = True
+        self.bus = FakeBus({
+            3: (100, {0: b'Acme', 1: b'TH-1', 2: b'1.2'}),
+            17: (42, None)
+        })
+        self.master.probe.side_effect = self.bus.probe
+        self.discovery = SlaveDiscovery(self.master)
+
+    def test_full_scan_fingerprints(self):
+        """Тест полного сканирования и идентификации"""
+        self.assertTrue(self.discovery.start(1, 20))
+        self.discovery.wait(5)
+        status = self.discovery.get_status()
+
+        self.assertEqual(status['progress']['state'], DiscoveryState.DONE)
+        self.assertEqual(status['progress']['scanned'], 20)
+        self.assertEqual(status['progress']['found'], 2)
+        self.assertEqual(status['devices']['3']['fingerprint'], 'Acme/TH-1/1.2')
+        self.assertEqual(status['devices']['3']['identity']['product_code'], 'TH-1')
+        self.assertEqual(status['devices']['17']['fingerprint'], 'probe:42')
+        self.assertEqual(status['devices']['17']['status'], DeviceStatus.NEW)
+
+    def test_quick_scan_rechecks_known_only(self):
+        """Тест быстрого повторного сканирования: только известные адреса, без повторной FC43"""
+        self.discovery.scan(list(range(1, 21)))
+        self.bus.calls.clear()
+        self.bus.devices[17] = (43, None)
+        del self.bus.devices[3]
+
+        self.discovery.start(mode='quick')
+        self.discovery.wait(5)
+        devices = self.discovery.get_status()['devices']
+
+        self.assertEqual(sorted({s for s, _ in self.bus.calls}), [3, 17])
+        self.assertEqual(devices['3']['status'], DeviceStatus.MISSING)
+        self.assertEqual(devices['17']['status'], DeviceStatus.CHANGED)
+
+        self.bus.calls.clear()
+        self.discovery.scan([17])
+        self.assertEqual(self.bus.calls, [(17, 'read_holding_registers')])
+        self.assertEqual(self.discovery.devices[17]['status'], DeviceStatus.KNOWN)
+
+    def test_cancel(self):
+        """Тест отмены сканирования"""
+        release = threading.Event()
+
+        def slow_probe(slave_id, call, *args, timeout=0.1):
+            release.wait(5)
+            return {"success": False, "error": "No response"}
+
+        self.master.probe.side_effect = slow_probe
+        self.discovery.start()
+        self.assertFalse(self.discovery.start())
+        self.discovery.cancel()
+        release.set()
+        self.discovery.wait(5)
+
+        progress = self.discovery.get_status()['progress']
+        self.assertEqual(progress['state'], DiscoveryState.CANCELLED)
+        self.assertLess(progress['scanned'], 247)
+
+
+class TestMasterProbe(unittest.TestCase):
+    """Тестирование пробного запроса RTU мастера"""
+
+    def test_probe_uses_short_timeout_without_retries(self):
+        """Тест: короткий таймаут, без повторов, без учета в статистике slave"""
+        rtu = ModbusRTUMaster(port='/dev/ttyUSB0')
+        rtu.client = MagicMock()
+        rtu.client.params.retries = 3
+        seen = {}
+
+        def read(*args, slave):
+            seen.update(timeout=rtu.client.params.timeout, retries=rtu.client.params.retries)
+            return ReadHoldingRegistersResponse([1])
+
+        rtu.client.read_holding_registers.side_effect = read
+        rtu.connected = True
+        result = rtu.probe(5, 'read_holding_registers', 0, 1, timeout=0.05)
+        rtu.scheduler.stop()
+
+        self.assertTrue(result['success'])
+        self.assertEqual(seen, {"timeout": 0.05, "retries": 0})
+        self.assertEqual(rtu.client.params.retries, 3)
+        self.assertEqual(rtu.health.get_status(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+Тесты для потока событий (Server-Sent Events)
+"""
+import json
+import threading
+import unittest
+from unittest.mock import MagicMock
+from app.event_stream import EventHub, subscription_filter, sse_stream
+from app.modbus.poller import ModbusPoller
+from app.modbus.rtu_master import ModbusRTUMaster
+
+ALL = subscription_filter()
+
+
+class TestEventHub(unittest.TestCase):
+    """Тестирование хранилища изменений"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.hub = EventHub()
+
+    def test_unchanged_values_not_published(self):
+        """Тест: повторное значение не создает изменения"""
+        self.assertTrue(self.hub.publish(('status', 'rtu'), {"connected": True}))
+        self.assertFalse(self.hub.publish(('status', 'rtu'), {"connected": True}))
+        self.assertEqual(self.hub.seq, 1)
+
+    def test_forget_renews_epoch_only_on_removal(self):
+        """Тест: epoch меняется, только если ключи действительно удалены"""
+        self.hub.publish(('values', 1, 't'), {"value": 1})
+        epoch = self.hub.epoch
+        self.hub.forget(lambda key: True)
+        self.assertEqual(self.hub.epoch, epoch)
+
+        self.hub.forget(lambda key: key[1] != 1)
+        self.assertNotEqual(self.hub.epoch, epoch)
+        self.assertEqual(self.hub.changes_since(0, ALL)[1], [])
+
+    def test_slow_consumer_gets_latest_value_once(self):
+        """Тест: промежуточные значения схлопываются для отставшего клиента"""
+        cursor, _ = self.hub.changes_since(0, ALL)
+        for value in range(100):
+            self.hub.publish(('values', 1, 't'), {"value": value})
+        self.hub.publish(('values', 1, 'h'), {"value": 50})
+
+        cursor, items = self.hub.changes_since(cursor, ALL)
+        self.assertEqual(items, [(('values', 1, 't'), {"value": 99}), (('values', 1, 'h'), {"value": 50})])
+        self.assertEqual(self.hub.changes_since(cursor, ALL)[1], [])
+
+    def test_resume_token(self):
+        """Тест: после переподключения приходят только изменения после токена"""
+        self.hub.publish(('values', 1, 't'), {"value": 1})
+        token = self.hub.token()
+        self.hub.publish(('values', 2, 't'), {"value": 2})
+
+        _, items = self.hub.changes_since(self.hub.parse_token(token), ALL)
+        self.assertEqual([key for key, _ in items], [('values', 2, 't')])
+
+        # Токен другого запуска сервера - полное состояние
+        _, items = self.hub.changes_since(self.hub.parse_token('deadbeef-1'), ALL)
+        self.assertEqual(len(items), 2)
+
+    def test_filter(self):
+        """Тест фильтра по темам, устройствам и точкам"""
+        self.hub.publish(('values', 1, 't'), 1)
+        self.hub.publish(('values', 1, 'h'), 2)
+        self.hub.publish(('values', 2, 't'), 3)
+        self.hub.publish(('status', 'rtu'), 4)
+
+        match = subscription_filter(['values'], devices=['1'], points=['t'])
+        self.assertEqual(self.hub.changes_since(0, match)[1], [(('values', 1, 't'), 1)])
+        match = subscription_filter(['status'])
+        self.assertEqual(self.hub.changes_since(0, match)[1], [(('status', 'rtu'), 4)])
+
+
+class TestSSEStream(unittest.TestCase):
+    """Тестирование SSE генератора"""
+
+    def test_snapshot_then_changes(self):
+        """Тест: сначала текущее состояние, затем изменения с id для возобновления"""
+        hub = EventHub()
+        hub.publish(('values', 1, 't'), {"value": 21.5})
+        stream = sse_stream(hub, ALL, keepalive=5)
+
+        self.assertEqual(next(stream), "retry: 3000\n\n")
+        snapshot = next(stream)
+        self.assertIn("event: values", snapshot)
+        self.assertIn(f"id: {hub.token()}", snapshot)
+
+        timer = threading.Timer(0.05, hub.publish, args=(('status', 'tcp'), {"running": True}))
+        timer.start()
+        message = next(stream)
+        timer.join()
+        lines = dict(line.split(': ', 1) for line in message.strip().split('\n'))
+        self.assertEqual(lines['event'], 'status')
+        self.assertEqual(json.loads(lines['data']), {"tcp": {"running": True}})
+        self.assertEqual(lines['id'], hub.token())
+
+
+class TestPollerChanges(unittest.TestCase):
+    """Тестирование уведомлений опросчика об изменениях"""
+
+    def test_only_changed_points_reported(self):
+        """Тест: слушатель получает только точки с изменившимся значением"""
+        master = MagicMock(spec=ModbusRTUMaster)
+        master.read_holding_registers.return_value = {"success": True, "data": [10, 20]}
+        poller = ModbusPoller(master, [{
+            "id": 1, "slave_id": 1,
+            "registers": [{"name": "a", "address": 0}, {"name": "b", "address": 1}]
+        }])
+        changes = []
+        poller.add_change_listener(changes.append)
+
+        poller.poll_due(now=float('inf'))
+        self.assertEqual(sorted(c['name'] for c in changes[0]), ['a', 'b'])
+
+        master.read_holding_registers.return_value = {"success": True, "data": [10, 21]}
+        poller.poll_due(now=float('inf'))
+        self.assertEqual(len(changes), 2)
+        self.assertEqual([(c['name'], c['value']) for c in changes[1]], [('b', 21)])
+
+
+if __name__ == '__main__':
+    unittest.main()
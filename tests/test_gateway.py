@@ -0,0 +1,143 @@
+"""
+Тесты для шлюза Modbus TCP -> RTU
+"""
+import unittest
+from unittest.mock import MagicMock
+from pymodbus.bit_write_message import WriteSingleCoilRequest
+from pymodbus.exceptions import NoSuchSlaveException
+from pymodbus.pdu import ExceptionResponse
+from pymodbus.register_read_message import ReadHoldingRegistersRequest
+from pymodbus.register_write_message import WriteMultipleRegistersRequest
+from app.modbus.bus_manager import RTUBusManager
+from app.modbus.gateway import GatewayServerContext
+from app.modbus.poller import ModbusPoller
+from app.modbus.rtu_master import ModbusRTUMaster
+
+
+DEVICES = [{
+    "id": 1, "slave_id": 3,
+    "registers": [
+        {"name": "t", "address": 10},
+        {"name": "energy", "address": 11, "data_type": "uint32"},
+        {"name": "relay", "address": 4, "type": "coil"}
+    ]
+}]
+
+
+class TestGatewayServerContext(unittest.TestCase):
+    """Тестирование хранилища шлюза"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.master = MagicMock(spec=ModbusRTUMaster)
+        self.master.write_registers.return_value = {"success": True}
+        self.master.write_coil.return_value = {"success": True}
+        self.gateway = GatewayServerContext(self.master, DEVICES, {"20": 3})
+
+    def test_reads_served_from_poll(self):
+        """Тест: чтение обслуживается из результатов опроса без обращения к шине"""
+        poller = ModbusPoller(self.master, DEVICES)
+        poller.add_listener(self.gateway.update)
+        self.master.read_holding_registers.return_value = {"success": True, "data": [215, 1, 2]}
+        self.master.read_coils.return_value = {"success": True, "data": [True]}
+        poller.poll_due()
+        self.master.reset_mock()
+
+        for unit_id in (3, 20):
+            response = ReadHoldingRegistersRequest(10, 3).execute(self.gateway[unit_id])
+            self.assertEqual(response.registers, [215, 1, 2])
+        self.master.read_holding_registers.assert_not_called()
+
+    def test_unpolled_address_rejected(self):
+        """Тест: адрес вне карты регистров или еще не опрошенный - Illegal Data Address"""
+        self.gateway.update(3, 'holding_register', 50, [1, 2])
+        for address in (50, 10):
+            response = ReadHoldingRegistersRequest(address, 2).execute(self.gateway[3])
+            self.assertIsInstance(response, ExceptionResponse)
+            self.assertEqual(response.exception_code, 2)
+
+        response = WriteMultipleRegistersRequest(12, [1, 2]).execute(self.gateway[3])
+        self.assertIsInstance(response, ExceptionResponse)
+        self.master.write_registers.assert_not_called()
+
+    def test_slave_without_registers(self):
+        """Тест: slave без карты регистров не обслуживает ни одного адреса"""
+        self.gateway.load_units(DEVICES + [{"id": 2, "slave_id": 8}], {"30": 9})
+        for unit_id in (8, 30):
+            response = ReadHoldingRegistersRequest(0, 1).execute(self.gateway[unit_id])
+            self.assertIsInstance(response, ExceptionResponse)
+            self.assertEqual(response.exception_code, 2)
+            response = WriteMultipleRegistersRequest(0, [1]).execute(self.gateway[unit_id])
+            self.assertEqual(response.exception_code, 2)
+        self.master.write_registers.assert_not_called()
+        self.assertEqual(self.gateway.get_status()['30']['ranges'], {})
+
+    def test_unknown_unit(self):
+        """Тест: unit id без соответствия"""
+        with self.assertRaises(NoSuchSlaveException):
+            self.gateway[99]
+
+    def test_writes_forwarded(self):
+        """Тест пересылки записи на шину и обновления значений"""
+        WriteMultipleRegistersRequest(10, [1, 2]).execute(self.gateway[20])
+        self.master.write_registers.assert_called_once_with(3, 10, [1, 2])
+        self.assertEqual(self.gateway[3].getValues(3, 10, 2), [1, 2])
+
+        response = WriteSingleCoilRequest(4, True).execute(self.gateway[3])
+        self.master.write_coil.assert_called_once_with(3, 4, True)
+        self.assertTrue(response.value)
+
+    def test_failed_write_raises(self):
+        """Тест: ошибка записи передается серверу (ответ Slave Device Failure)"""
+        self.master.write_registers.return_value = {"success": False, "error": "Timeout"}
+        with self.assertRaises(Exception):
+            WriteMultipleRegistersRequest(10, [1]).execute(self.gateway[3])
+        self.assertFalse(self.gateway[3].validate(3, 10, 1))
+
+    def test_reload_is_incremental(self):
+        """Тест: при изменении конфигурации неизмененные контексты и значения сохраняются"""
+        self.gateway.update(3, 'holding_register', 10, [7])
+        context = self.gateway[3]
+        devices = DEVICES + [{"id": 2, "slave_id": 8, "registers": [{"name": "x", "address": 0}]}]
+
+        changes = self.gateway.load_units(devices, {})
+        self.assertEqual(changes, {"added": 1, "removed": 0, "updated": 0})
+        self.assertIs(self.gateway[3], context)
+        self.assertEqual(self.gateway[3].getValues(3, 10, 1), [7])
+        with self.assertRaises(NoSuchSlaveException):
+            self.gateway[20]
+
+        devices[1] = {"id": 2, "slave_id": 8, "registers": [{"name": "x", "address": 40}]}
+        changes = self.gateway.load_units(devices[1:], {})
+        self.assertEqual(changes, {"added": 0, "removed": 1, "updated": 1})
+        self.assertEqual(self.gateway.get_status()['8']['ranges'], {"holding_register": [[40, 1]]})
+
+    def test_same_slave_on_two_buses(self):
+        """Тест: одинаковый slave_id на двух линиях - разные контексты, запись на свою линию"""
+        buses = RTUBusManager()
+        masters = {}
+        for name, value in (('bus1', 1), ('bus2', 2)):
+            masters[name] = MagicMock(spec=ModbusRTUMaster)
+            masters[name].read_holding_registers.return_value = {"success": True, "data": [value]}
+            masters[name].write_registers.return_value = {"success": True}
+            buses.add_bus(name, masters[name])
+        devices = [{"id": name, "slave_id": 3, "bus": name, "registers": [{"name": "t", "address": 10}]}
+                   for name in ('bus1', 'bus2')]
+        buses.load_routes(devices)
+        gateway = GatewayServerContext(buses, devices, {"13": ["bus2", 3]})
+        poller = ModbusPoller(buses, devices)
+        poller.add_listener(gateway.update)
+        poller.poll_due()
+
+        self.assertEqual(ReadHoldingRegistersRequest(10, 1).execute(gateway[3]).registers, [1])
+        self.assertEqual(ReadHoldingRegistersRequest(10, 1).execute(gateway[13]).registers, [2])
+        WriteMultipleRegistersRequest(10, [5]).execute(gateway[13])
+        masters['bus2'].write_registers.assert_called_once_with(3, 10, [5])
+        masters['bus1'].write_registers.assert_not_called()
+        self.assertEqual(gateway[3].getValues(3, 10, 1), [1])
+        status = gateway.get_status()
+        self.assertEqual((status['3']['bus'], status['13']['bus']), ('bus1', 'bus2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
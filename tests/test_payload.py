@@ -0,0 +1,42 @@
+"""
+Тесты для компактного представления данных Modbus
+"""
+import base64
+import unittest
+from app.modbus.payload import (
+    pack_registers, registers_to_bytes, bytes_to_registers,
+    pack_bits, unpack_bits, set_bit, encode_data
+)
+
+
+class TestPayload(unittest.TestCase):
+    """Тестирование упаковки регистров и битов"""
+
+    def test_registers_roundtrip(self):
+        """Тест преобразования регистров в байты Modbus и обратно"""
+        data = registers_to_bytes([0x0102, 0xA0B0])
+        self.assertEqual(data, b'\x01\x02\xa0\xb0')
+        self.assertEqual(bytes_to_registers(data).tolist(), [0x0102, 0xA0B0])
+        self.assertEqual(pack_registers([1, 2]).itemsize, 2)
+
+    def test_bits_packing(self):
+        """Тест упаковки битов в порядке Modbus"""
+        bits = [True, False, True, True, False, False, False, False, True]
+        packed = pack_bits(bits)
+        self.assertEqual(bytes(packed), b'\x0d\x01')
+        self.assertEqual(unpack_bits(packed, 0, 9), bits)
+        self.assertEqual(unpack_bits(packed, 2, 2), [True, True])
+
+        set_bit(packed, 0, False)
+        set_bit(packed, 9, True)
+        self.assertEqual(bytes(packed), b'\x0c\x03')
+
+    def test_encode_data(self):
+        """Тест кодирования ответа API"""
+        self.assertEqual(encode_data('holding_registers', [1, 2], 'hex'), '00010002')
+        self.assertEqual(base64.b64decode(encode_data('coils', [True, True], 'base64')), b'\x03')
+        self.assertEqual(encode_data('input_registers', [5], 'list'), [5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Тесты для фонового опроса устройств
+"""
+import unittest
+from unittest.mock import MagicMock
+from app.modbus.poller import ModbusPoller, PointQuality
+from app.modbus.rtu_master import ModbusRTUMaster
+
+
+DEVICES = [
+    {
+        "id": 1,
+        "name": "Temperature Sensor",
+        "type": "rtu",
+        "slave_id": 1,
+        "registers": [
+            {"name": "temperature", "address": 0, "type": "holding_register", "scale": 0.1},
+            {"name": "relay", "address": 3, "type": "coil", "poll_interval": 5}
+        ]
+    }
+]
+
+
+class TestModbusPoller(unittest.TestCase):
+    """Тестирование опросчика"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.master = MagicMock(spec=ModbusRTUMaster)
+        self.master.read_holding_registers.return_value = {"success": True, "data": [215]}
+        self.master.read_coils.return_value = {"success": True, "data": [True]}
+        self.poller = ModbusPoller(self.master, DEVICES, default_interval=1.0)
+
+    def test_poll_applies_scale(self):
+        """Тест опроса и масштабирования значения"""
+        self.poller.poll_due()
+        points = self.poller.get_snapshot()['1']['points']
+
+        self.assertAlmostEqual(points['temperature']['value'], 21.5)
+        self.assertEqual(points['temperature']['raw'], 215)
+        self.assertEqual(points['temperature']['quality'], PointQuality.GOOD)
+        self.assertTrue(points['relay']['value'])
+        self.master.read_holding_registers.assert_called_once_with(1, 0, 1, use_cache=False)
+
+    def test_failed_poll_keeps_last_value(self):
+        """Тест пометки ошибочного опроса"""
+        self.poller.poll_due()
+        self.master.read_holding_registers.return_value = {"success": False, "error": "Timeout"}
+        self.poller.poll_due(now=float('inf'))
+        point = self.poller.get_snapshot()['1']['points']['temperature']
+
+        self.assertEqual(point['quality'], PointQuality.BAD)
+        self.assertEqual(point['error'], 'Timeout')
+        self.assertAlmostEqual(point['value'], 21.5)
+
+    def test_per_register_interval(self):
+        """Тест индивидуального интервала опроса регистра"""
+        self.poller.poll_due()
+        self.master.reset_mock()
+        self.poller.poll_due(now=self.poller._schedule[0][0])
+
+        self.master.read_holding_registers.assert_called_once()
+        self.master.read_coils.assert_not_called()
+
+    def test_block_read(self):
+        """Тест объединения соседних регистров в один запрос"""
+        devices = [{
+            "id": 2, "slave_id": 5,
+            "registers": [
+                {"name": "a", "address": 10},
+                {"name": "b", "address": 12}
+            ]
+        }]
+        self.master.read_holding_registers.return_value = {"success": True, "data": [1, 0, 3]}
+        poller = ModbusPoller(self.master, devices)
+        poller.poll_due()
+
+        self.master.read_holding_registers.assert_called_once_with(5, 10, 3, use_cache=False)
+        points = poller.get_snapshot()['2']['points']
+        self.assertEqual(points['b']['value'], 3)
+        self.assertEqual(poller.get_plan()['frames'], 1)
+
+    def test_multi_register_value(self):
+        """Тест опроса 32-битного значения и выдачи значений по имени"""
+        devices = [{
+            "id": 3, "name": "Meter", "slave_id": 7,
+            "registers": [
+                {"name": "energy", "address": 0, "data_type": "uint32", "scale": 0.01},
+                {"name": "alarm", "address": 2, "bit": 1}
+            ]
+        }]
+        self.master.read_holding_registers.return_value = {"success": True, "data": [1, 0, 2]}
+        poller = ModbusPoller(self.master, devices)
+        poller.poll_due()
+
+        self.master.read_holding_registers.assert_called_once_with(7, 0, 3, use_cache=False)
+        values = poller.get_device_values(3)['values']
+        self.assertAlmostEqual(values['energy']['value'], 655.36)
+        self.assertTrue(values['alarm']['value'])
+        self.assertEqual(poller.get_snapshot()['3']['points']['energy']['raw'], [1, 0])
+        self.assertIsNone(poller.get_device_values(99))
+
+    def test_stale_quality(self):
+        """Тест пометки устаревшего значения"""
+        self.poller.poll_due()
+        point = self.poller.points[(1, 'temperature')]
+        point.timestamp -= 10
+
+        snapshot = self.poller.get_snapshot()
+        self.assertEqual(snapshot['1']['points']['temperature']['quality'], PointQuality.STALE)
+
+
+if __name__ == '__main__':
+    unittest.main()
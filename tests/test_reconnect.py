@@ -0,0 +1,128 @@
+"""
+Тесты для автоматического переподключения RTU линий
+"""
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from pymodbus.exceptions import ConnectionException
+from app.modbus.bus_manager import RTUBusManager
+from app.modbus.reconnect import ReconnectSupervisor
+from app.modbus.rtu_master import ModbusRTUMaster
+
+
+class TestReconnectSupervisor(unittest.TestCase):
+    """Тестирование супервизора переподключения"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.master = MagicMock()
+        self.master.connected = False
+        self.master.keep_connected = True
+        self.master.reconnect.return_value = False
+        self.buses = RTUBusManager()
+        self.buses.add_bus('default', self.master)
+        self.supervisor = ReconnectSupervisor(self.buses, interval=1.0, max_interval=4.0, jitter=0.0)
+
+    def test_exponential_backoff(self):
+        """Тест экспоненциальной паузы между попытками"""
+        self.supervisor.check(now=0.0)
+        self.supervisor.check(now=0.5)
+        self.assertEqual(self.master.reconnect.call_count, 1)
+
+        self.supervisor.check(now=1.0)
+        self.supervisor.check(now=3.0)
+        self.supervisor.check(now=7.0)
+        self.supervisor.check(now=11.0)
+        self.assertEqual(self.master.reconnect.call_count, 5)
+        self.assertEqual(self.supervisor.links['default'].next_attempt, 15.0)
+
+    def test_jitter_shortens_delay(self):
+        """Тест случайного разброса паузы"""
+        supervisor = ReconnectSupervisor(self.buses, interval=10.0, jitter=0.5)
+        for _ in range(20):
+            self.assertTrue(5.0 <= supervisor.backoff(1) <= 10.0)
+
+    def test_reconnect_resets_state(self):
+        """Тест сброса счетчиков после восстановления связи"""
+        self.supervisor.check(now=0.0)
+        self.master.reconnect.return_value = True
+        self.supervisor.check(now=1.0)
+
+        status = self.supervisor.get_status()['buses']['default']
+        self.assertEqual(status['reconnects'], 1)
+        self.assertEqual(status['failures'], 0)
+
+    def test_manual_disconnect_not_reconnected(self):
+        """Тест: вручную отключенная линия не переподключается"""
+        self.master.keep_connected = False
+        self.supervisor.check(now=0.0)
+        self.master.reconnect.assert_not_called()
+
+
+class TestLinkLoss(unittest.TestCase):
+    """Тестирование обработки потери связи в RTU мастере"""
+
+    def test_link_loss_fails_fast(self):
+        """Тест: после потери порта запросы сразу получают ошибку, автомат slave не срабатывает"""
+        rtu = ModbusRTUMaster(port='/dev/ttyUSB0')
+        rtu.client = MagicMock()
+        rtu.client.read_holding_registers.side_effect = ConnectionException('port gone')
+        rtu.connected = True
+
+        result = rtu.read_holding_registers(1, 0, 1)
+        self.assertFalse(result['success'])
+        self.assertFalse(rtu.connected)
+        self.assertEqual(rtu.read_holding_registers(1, 0, 1), {"success": False, "error": "Not connected"})
+        self.assertEqual(rtu.health.get_status()['1']['consecutive_failures'], 0)
+        rtu.scheduler.stop()
+
+    @patch('app.modbus.rtu_master.ModbusSerialClient')
+    def test_reconnect_reopens_port(self, mock_client):
+        """Тест переоткрытия порта"""
+        mock_client.return_value.connect.return_value = True
+        rtu = ModbusRTUMaster(port='/dev/ttyUSB0')
+        old_client = rtu.client = MagicMock()
+
+        self.assertTrue(rtu.reconnect())
+        old_client.close.assert_called_once()
+        self.assertTrue(rtu.connected)
+        self.assertTrue(rtu.keep_connected)
+        rtu.scheduler.stop()
+
+    @patch('app.modbus.rtu_master.ModbusSerialClient')
+    def test_reconnect_waits_for_transaction(self, mock_client):
+        """Тест: порт не закрывается посреди начатой транзакции"""
+        mock_client.return_value.connect.return_value = True
+        rtu = ModbusRTUMaster(port='/dev/ttyUSB0')
+        old_client = rtu.client = MagicMock()
+        rtu.connected = True
+        started, release = threading.Event(), threading.Event()
+        closed_during_read = []
+
+        def slow_read(*args, **kwargs):
+            started.set()
+            release.wait(2)
+            closed_during_read.append(old_client.close.called)
+            return MagicMock(registers=[7])
+
+        old_client.read_holding_registers.side_effect = slow_read
+        reader = threading.Thread(target=rtu.read_holding_registers, args=(1, 0, 1))
+        reader.start()
+        self.assertTrue(started.wait(2))
+        reconnect = threading.Thread(target=rtu.reconnect)
+        reconnect.start()
+        time.sleep(0.05)
+        self.assertFalse(old_client.close.called)
+
+        release.set()
+        reader.join(2)
+        reconnect.join(2)
+        self.assertEqual(closed_during_read, [False])
+        old_client.close.assert_called_once()
+        self.assertTrue(rtu.connected)
+        rtu.scheduler.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Тесты для кэша результатов чтения
+"""
+import unittest
+from app.modbus.register_cache import RegisterCache, ENTRY_OVERHEAD
+
+
+class TestRegisterCache(unittest.TestCase):
+    """Тестирование кэша регистров"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.cache = RegisterCache(ttl={'holding_registers': 10})
+
+    def test_exact_hit_and_miss(self):
+        """Тест попадания и промаха"""
+        self.assertIsNone(self.cache.get(1, 'holding_registers', 0, 3))
+        self.cache.put(1, 'holding_registers', 0, 3, [1, 2, 3])
+
+        self.assertEqual(self.cache.get(1, 'holding_registers', 0, 3), [1, 2, 3])
+        self.assertIsNone(self.cache.get(2, 'holding_registers', 0, 3))
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_contained_range(self):
+        """Тест чтения меньшего диапазона из большего блока"""
+        self.cache.put(1, 'holding_registers', 10, 10, list(range(10)))
+        self.assertEqual(self.cache.get(1, 'holding_registers', 12, 3), [2, 3, 4])
+        self.assertIsNone(self.cache.get(1, 'holding_registers', 18, 5))
+
+    def test_expired_entry(self):
+        """Тест истечения времени жизни"""
+        cache = RegisterCache(ttl={'holding_registers': -1})
+        cache.put(1, 'holding_registers', 0, 1, [5])
+        self.assertIsNone(cache.get(1, 'holding_registers', 0, 1))
+
+    def test_write_updates_overlapping_ranges(self):
+        """Тест обновления кэша после записи"""
+        self.cache.put(1, 'holding_registers', 0, 4, [0, 0, 0, 0])
+        self.cache.apply_write(1, 'registers', 2, [7, 8, 9])
+        self.cache.apply_write(1, 'register', 0, [5])
+
+        self.assertEqual(self.cache.get(1, 'holding_registers', 0, 4), [5, 0, 7, 8])
+
+    def test_packed_coils(self):
+        """Тест хранения катушек битовым полем"""
+        cache = RegisterCache(ttl={'coils': 10})
+        cache.put(1, 'coils', 0, 10, [True] * 10)
+        cache.apply_write(1, 'coil', 3, [False])
+
+        self.assertEqual(cache.get(1, 'coils', 2, 3), [True, False, True])
+        self.assertEqual(cache.get_stats()['bytes'], ENTRY_OVERHEAD + 2)
+
+    def test_lru_eviction(self):
+        """Тест вытеснения по объему памяти"""
+        cache = RegisterCache(ttl={'holding_registers': 10}, max_bytes=2 * (ENTRY_OVERHEAD + 2))
+        cache.put(1, 'holding_registers', 0, 1, [1])
+        cache.put(1, 'holding_registers', 1, 1, [2])
+        cache.get(1, 'holding_registers', 0, 1)
+        cache.put(1, 'holding_registers', 2, 1, [3])
+
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+        self.assertIsNone(cache.get(1, 'holding_registers', 1, 1))
+        self.assertEqual(cache.get(1, 'holding_registers', 0, 1), [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Тесты для крайнего срока запросов API
+"""
+import unittest
+from unittest.mock import MagicMock
+from app import create_app
+from app.modbus.bus_scheduler import remaining_time, DEADLINE_EXCEEDED, OUTCOME_UNKNOWN
+
+
+class TestRequestDeadline(unittest.TestCase):
+    """Тестирование срока запроса: заголовок X-Request-Timeout -> bus_context"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.controller = create_app(remote_bus=True)
+        self.controller.bus = MagicMock()
+        self.remaining = []
+
+        def rtu_read(**params):
+            self.remaining.append(remaining_time())
+            return {'success': True, 'data': [1]}
+
+        self.controller.bus.rtu_read.side_effect = rtu_read
+        self.client = self.controller.app.test_client()
+
+    def _read(self, headers=None):
+        return self.client.post('/api/modbus/rtu/read', headers=headers or {}, json={
+            'slave_id': 1, 'type': 'holding_registers', 'start_addr': 0, 'quantity': 1
+        })
+
+    def test_header(self):
+        """Тест: срок из заголовка действует на операции шины и только внутри запроса"""
+        self.assertEqual(self._read({'X-Request-Timeout': '0.5'}).status_code, 200)
+        self.assertTrue(0 < self.remaining[0] <= 0.5)
+        self.assertIsNone(remaining_time())
+
+    def test_default_and_limit(self):
+        """Тест: без заголовка - http.request_timeout, не больше http.max_request_timeout"""
+        self._read()
+        self._read({'X-Request-Timeout': '3600'})
+        self._read({'X-Request-Timeout': 'soon'})
+        default = self.controller.config_manager.get('http.request_timeout')
+        maximum = self.controller.config_manager.get('http.max_request_timeout')
+        self.assertTrue(default - 1 < self.remaining[0] <= default)
+        self.assertTrue(maximum - 1 < self.remaining[1] <= maximum)
+        self.assertTrue(default - 1 < self.remaining[2] <= default)
+
+    def test_deadline_exceeded(self):
+        """Тест: истекший срок - 504"""
+        self.controller.bus.rtu_write.return_value = {'success': False, 'error': DEADLINE_EXCEEDED}
+        response = self.client.post('/api/modbus/rtu/write', json={
+            'slave_id': 1, 'type': 'register', 'addr': 0, 'value': 1
+        })
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(response.get_json()['error'], DEADLINE_EXCEEDED)
+
+
+    def test_outcome_unknown(self):
+        """Тест: начатая и не завершившаяся вовремя запись - 504 с отдельной ошибкой"""
+        self.controller.bus.rtu_write.return_value = {'success': False, 'error': OUTCOME_UNKNOWN}
+        response = self.client.post('/api/modbus/rtu/write', json={
+            'slave_id': 1, 'type': 'register', 'addr': 0, 'value': 1
+        })
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(response.get_json()['error'], OUTCOME_UNKNOWN)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Тесты для кодирования и сжатия ответов API
+"""
+import gzip
+import json
+import unittest
+import zlib
+from unittest.mock import MagicMock, patch
+from flask import Flask, Response, jsonify
+from app import response_encoder
+from app.response_encoder import init_app, json_dumps, json_loads
+
+SNAPSHOT = {1: {"temperature": {"value": 21.5, "quality": "good", "timestamp": 1734270000.12}},
+            2: {"registers": list(range(1000))}}
+
+
+def create_app(**config) -> Flask:
+    """Тестовое приложение с кодировщиком ответов"""
+    app = Flask(__name__)
+    init_app(app, config)
+
+    @app.route('/snapshot')
+    def snapshot():
+        return jsonify({'success': True, 'devices': SNAPSHOT})
+
+    @app.route('/small')
+    def small():
+        return jsonify({'success': True})
+
+    @app.route('/versioned')
+    def versioned():
+        response = Response(json.dumps({"data": list(range(1000))}), mimetype='application/json')
+        response.set_etag('tcp-1')
+        return response
+
+    @app.route('/stream')
+    def stream():
+        return Response(iter(["data: x\n\n"] * 1000), mimetype='text/event-stream')
+
+    return app
+
+
+class TestJSON(unittest.TestCase):
+    """Тестирование JSON кодировщиков"""
+
+    def test_int_keys(self):
+        """Тест: ключи-числа (id устройств) кодируются как строки"""
+        self.assertEqual(json_loads(json_dumps(SNAPSHOT)), json.loads(json.dumps(SNAPSHOT)))
+
+    def test_stdlib_fallback(self):
+        """Тест: без orjson используется стандартный json"""
+        with patch.object(response_encoder, 'orjson', None):
+            self.assertEqual(json_dumps({1: [1, 2]}), b'{"1":[1,2]}')
+            self.assertEqual(json_loads(b'{"1":[1,2]}'), {"1": [1, 2]})
+            client = create_app(compress_level=0).test_client()
+            self.assertEqual(client.get('/snapshot').get_json()['devices']['2']['registers'][999], 999)
+
+    def test_backend_setting(self):
+        """Тест: json_backend=json отключает orjson для ответов"""
+        app = create_app(json_backend='json')
+        self.assertFalse(app.json.fast)
+        self.assertEqual(app.test_client().get('/small').data, b'{"success":true}')
+
+
+class TestNegotiation(unittest.TestCase):
+    """Тестирование выбора формата по заголовку Accept"""
+
+    def test_json_by_default(self):
+        """Тест: без Accept и при недоступном формате - JSON"""
+        client = create_app().test_client()
+        self.assertEqual(client.get('/small').mimetype, 'application/json')
+        with patch.object(response_encoder, 'msgpack', None):
+            response = client.get('/small', headers={'Accept': 'application/msgpack'})
+        self.assertEqual(response.mimetype, 'application/json')
+
+    def test_msgpack(self):
+        """Тест: MessagePack по заголовку Accept, если пакет установлен"""
+        fake = MagicMock()
+        fake.packb.return_value = b'\x81\xa7success\xc3'
+        with patch.object(response_encoder, 'msgpack', fake):
+            client = create_app().test_client()
+            response = client.get('/small', headers={'Accept': 'application/x-msgpack, application/json;q=0.5'})
+            self.assertEqual(response.mimetype, 'application/x-msgpack')
+            self.assertEqual(response.data, b'\x81\xa7success\xc3')
+            self.assertIn('Accept', response.vary)
+            fake.packb.assert_called_once()
+            self.assertEqual(fake.packb.call_args[0][0], {'success': True})
+
+            # JSON в приоритете при равном качестве
+            self.assertEqual(client.get('/small', headers={'Accept': '*/*'}).mimetype, 'application/json')
+
+
+class TestCompression(unittest.TestCase):
+    """Тестирование сжатия ответов"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.client = create_app(compress_min_size=512).test_client()
+
+    def test_gzip(self):
+        """Тест: большой ответ сжимается gzip"""
+        response = self.client.get('/snapshot', headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.vary)
+        self.assertEqual(json.loads(gzip.decompress(response.data))['devices']['2']['registers'][10], 10)
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+
+    def test_deflate(self):
+        """Тест: deflate, если gzip не принимается"""
+        response = self.client.get('/snapshot', headers={'Accept-Encoding': 'deflate, gzip;q=0'})
+        self.assertEqual(response.headers['Content-Encoding'], 'deflate')
+        self.assertTrue(json.loads(zlib.decompress(response.data))['success'])
+
+    def test_not_compressed(self):
+        """Тест: маленькие ответы, поток событий и клиенты без сжатия - без изменений"""
+        for url, encoding in (('/small', 'gzip'), ('/stream', 'gzip'), ('/snapshot', 'identity')):
+            response = self.client.get(url, headers={'Accept-Encoding': encoding})
+            self.assertNotIn('Content-Encoding', response.headers, url)
+
+    def test_etag_weak(self):
+        """Тест: ETag сжатого ответа становится слабым"""
+        response = self.client.get('/versioned', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['ETag'], 'W/"tcp-1"')
+        response = self.client.get('/versioned')
+        self.assertEqual(response.headers['ETag'], '"tcp-1"')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,7 @@
 import unittest
 from unittest.mock import Mock, patch, MagicMock
 from app.modbus.rtu_master import ModbusRTUMaster
+from app.modbus.register_cache import RegisterCache
 
 
 class TestModbusRTUMaster(unittest.TestCase):
@@ -41,6 +42,34 @@ class TestModbusRTUMaster(unittest.TestCase):
         self.assertEqual(status['port'], '/dev/ttyUSB0')
         self.assertEqual(status['baudrate'], 9600)
 
+    
+    def test_read_trims_padded_bits(self):
+        """Тест обрезки дополненных до байта битов"""
+        self.rtu.client = MagicMock()
+        self.rtu.client.read_coils.return_value = Mock(bits=[True, False, True] + [False] * 5)
+        self.rtu.connected = True
+        
+        result = self.rtu.read_coils(1, 0, 3)
+        self.assertEqual(result, {"success": True, "data": [True, False, True]})
+    
+    def test_cached_read(self):
+        """Тест чтения через кэш и его обновления при записи"""
+        self.rtu = ModbusRTUMaster(port='/dev/ttyUSB0', cache=RegisterCache())
+        self.rtu.client = MagicMock()
+        self.rtu.client.read_holding_registers.return_value = Mock(registers=[1, 2, 3, 4])
+        self.rtu.connected = True
+        
+        self.rtu.read_holding_registers(1, 0, 4)
+        result = self.rtu.read_holding_registers(1, 1, 2)
+        self.assertEqual(result['data'], [2, 3])
+        self.assertEqual(self.rtu.client.read_holding_registers.call_count, 1)
+        
+        self.rtu.write_register(1, 1, 42)
+        self.assertEqual(self.rtu.read_holding_registers(1, 0, 2)['data'], [1, 42])
+        
+        status = self.rtu.get_status()
+        self.assertEqual(status['cache']['hits'], 2)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,144 @@
+"""
+Тесты для объединения одновременных чтений
+"""
+import threading
+import time
+import unittest
+from app.modbus.bus_scheduler import BusPriority, bus_context, DEADLINE_EXCEEDED
+from app.modbus.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Тестирование single-flight"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.flight = SingleFlight()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def _slow_read(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return {"success": True, "data": [10, 11, 12, 13]}
+
+    def _wait_for_waiters(self, count):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            with self.flight.lock:
+                flights = self.flight.flights.get((1, 'holding_registers'), [])
+                if flights and flights[0].waiters >= count:
+                    return
+            time.sleep(0.001)
+        self.fail("waiters did not join")
+
+    def test_concurrent_reads_share_transaction(self):
+        """Тест: N одновременных чтений - одна транзакция"""
+        results = []
+
+        def read(start, quantity):
+            results.append(self.flight.do(1, 'holding_registers', start, quantity, self._slow_read))
+
+        leader = threading.Thread(target=read, args=(0, 4))
+        leader.start()
+        self.started.wait(5)
+        followers = [threading.Thread(target=read, args=(0, 4)) for _ in range(4)]
+        followers.append(threading.Thread(target=read, args=(1, 2)))
+        for t in followers:
+            t.start()
+        self._wait_for_waiters(5)
+        self.release.set()
+        for t in [leader] + followers:
+            t.join(5)
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(len(results), 6)
+        self.assertIn({"success": True, "data": [11, 12]}, results)
+        self.assertEqual(self.flight.get_stats(), {"executed": 1, "shared": 5})
+
+    def test_no_join_lower_priority(self):
+        """Тест: чтение API не ждет транзакцию фонового опроса, опрос - присоединяется к чтению API"""
+        poll = threading.Thread(target=lambda: self.flight.do(
+            1, 'holding_registers', 0, 4, self._slow_read, BusPriority.POLL))
+        poll.start()
+        self.started.wait(5)
+        read = threading.Thread(target=lambda: self.flight.do(
+            1, 'holding_registers', 0, 4, self._slow_read, BusPriority.READ))
+        read.start()
+        deadline = time.monotonic() + 5
+        while self.calls < 2 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        # Чтение API выполняется, пока транзакция опроса еще не завершена
+        self.assertEqual(self.calls, 2)
+        self.release.set()
+        poll.join(5)
+        read.join(5)
+
+        self.release.clear()
+        self.started.clear()
+        read = threading.Thread(target=lambda: self.flight.do(
+            1, 'holding_registers', 0, 4, self._slow_read, BusPriority.READ))
+        read.start()
+        self.started.wait(5)
+        follower = threading.Thread(target=lambda: self.flight.do(
+            1, 'holding_registers', 0, 4, self._slow_read, BusPriority.POLL))
+        follower.start()
+        self._wait_for_waiters(1)
+        self.release.set()
+        read.join(5)
+        follower.join(5)
+        self.assertEqual(self.calls, 3)
+
+    def test_waiter_deadline(self):
+        """Тест: ожидающий чужую транзакцию уходит по своему крайнему сроку"""
+        leader = threading.Thread(
+            target=lambda: self.flight.do(1, 'holding_registers', 0, 4, self._slow_read))
+        leader.start()
+        self.started.wait(5)
+        started = time.monotonic()
+        with bus_context(deadline=time.monotonic() + 0.1):
+            result = self.flight.do(1, 'holding_registers', 0, 4, self._slow_read)
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.release.set()
+        leader.join(5)
+
+        self.assertEqual(result, {"success": False, "error": DEADLINE_EXCEEDED})
+        self.assertEqual(self.calls, 1)
+
+    def test_no_join_earlier_deadline(self):
+        """Тест: чтение не присоединяется к транзакции с более ранним крайним сроком"""
+        def leader():
+            with bus_context(deadline=time.monotonic() + 0.2):
+                self.flight.do(1, 'holding_registers', 0, 4, self._slow_read)
+
+        thread = threading.Thread(target=leader)
+        thread.start()
+        self.started.wait(5)
+        with bus_context(deadline=time.monotonic() + 5):
+            result = self.flight.do(1, 'holding_registers', 0, 4, lambda: {"success": True, "data": [1, 2, 3, 4]})
+        self.release.set()
+        thread.join(5)
+
+        self.assertEqual(result, {"success": True, "data": [1, 2, 3, 4]})
+        self.assertEqual(self.flight.get_stats(), {"executed": 2, "shared": 0})
+
+    def test_sequential_reads_not_shared(self):
+        """Тест: последовательные чтения выполняются отдельно"""
+        self.release.set()
+        self.flight.do(1, 'holding_registers', 0, 4, self._slow_read)
+        self.flight.do(1, 'holding_registers', 0, 4, self._slow_read)
+        self.assertEqual(self.calls, 2)
+
+    def test_error_is_shared(self):
+        """Тест: исключение превращается в результат с ошибкой"""
+        def failing():
+            raise IOError("port closed")
+
+        result = self.flight.do(1, 'coils', 0, 1, failing)
+        self.assertEqual(result, {"success": False, "error": "port closed"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Тесты для адаптивных таймаутов и автомата защиты slave устройств
+"""
+import unittest
+from unittest.mock import Mock, MagicMock
+from pymodbus.exceptions import ConnectionException
+from app.modbus.slave_health import SlaveHealthTracker, BreakerState
+from app.modbus.rtu_master import ModbusRTUMaster
+
+
+class TestSlaveHealthTracker(unittest.TestCase):
+    """Тестирование трекера доступности"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.tracker = SlaveHealthTracker(base_timeout=1.0, min_samples=5,
+                                          failure_threshold=3, backoff_initial=5.0)
+
+    def test_adaptive_timeout(self):
+        """Тест таймаута по перцентилю времени отклика"""
+        self.assertEqual(self.tracker.timeout_for(1), 1.0)
+        for _ in range(10):
+            self.tracker.record_success(1, 0.02)
+        self.assertAlmostEqual(self.tracker.timeout_for(1), 0.06)
+
+    def test_timeout_bounds(self):
+        """Тест ограничения таймаута сверху и снизу"""
+        for _ in range(10):
+            self.tracker.record_success(1, 0.001)
+            self.tracker.record_success(2, 0.9)
+        self.assertEqual(self.tracker.timeout_for(1), 0.05)
+        self.assertEqual(self.tracker.timeout_for(2), 1.0)
+
+    def test_breaker_opens_and_probes(self):
+        """Тест: slave отключается после серии неответов и проверяется с паузой"""
+        for _ in range(3):
+            self.tracker.record_failure(1, now=100.0)
+        self.assertTrue(self.tracker.is_open(1, now=101.0))
+        self.assertFalse(self.tracker.allow(1, now=101.0))
+
+        self.assertTrue(self.tracker.allow(1, now=105.0))
+        self.assertFalse(self.tracker.allow(1, now=105.0))
+        self.tracker.record_failure(1, now=105.0)
+        self.assertFalse(self.tracker.allow(1, now=109.0))
+        self.assertTrue(self.tracker.allow(1, now=115.0))
+
+        self.tracker.record_success(1, 0.02)
+        self.assertEqual(self.tracker.get_status()['1']['state'], BreakerState.CLOSED)
+
+    def test_release_probe(self):
+        """Тест: проба, прерванная потерей связи, не засчитывается и не блокирует следующую"""
+        for _ in range(3):
+            self.tracker.record_failure(1, now=100.0)
+        self.assertTrue(self.tracker.allow(1, now=105.0))
+        self.tracker.release_probe(1, now=106.0)
+
+        self.assertEqual(self.tracker.get_status()['1']['state'], BreakerState.OPEN)
+        self.assertEqual(self.tracker.get_status()['1']['consecutive_failures'], 3)
+        self.assertFalse(self.tracker.is_open(1, now=106.0))
+        self.assertTrue(self.tracker.allow(1, now=106.0))
+
+    def test_status(self):
+        """Тест статуса slave"""
+        self.tracker.record_success(1, 0.01)
+        self.tracker.record_failure(1)
+        status = self.tracker.get_status()['1']
+        self.assertEqual(status['error_rate'], 0.5)
+        self.assertEqual(status['rtt_p50_ms'], 10.0)
+
+
+class TestMasterCircuitBreaker(unittest.TestCase):
+    """Тестирование автомата защиты в RTU мастере"""
+
+    def test_dead_slave_fails_fast(self):
+        """Тест: после серии таймаутов запросы к slave не идут на шину"""
+        rtu = ModbusRTUMaster(port='/dev/ttyUSB0')
+        rtu.client = MagicMock()
+        rtu.client.read_holding_registers.return_value = Mock(spec=[])
+        rtu.connected = True
+
+        for _ in range(5):
+            result = rtu.read_holding_registers(4, 0, 1)
+        self.assertFalse(result['success'])
+        self.assertIn('unavailable', result['error'])
+        self.assertEqual(rtu.client.read_holding_registers.call_count, 3)
+        self.assertEqual(rtu.get_status()['slaves']['4']['state'], BreakerState.OPEN)
+        rtu.scheduler.stop()
+
+    def test_probe_after_link_loss(self):
+        """Тест: после ошибки порта во время пробы slave снова опрашивается на новом порту"""
+        rtu = ModbusRTUMaster(port='/dev/ttyUSB0')
+        rtu.health = SlaveHealthTracker(backoff_initial=0.0)
+        rtu.client = MagicMock()
+        rtu.client.read_holding_registers.return_value = Mock(spec=[])
+        rtu.connected = True
+        for _ in range(3):
+            rtu.read_holding_registers(4, 0, 1)
+
+        rtu.client.read_holding_registers.side_effect = ConnectionException('port gone')
+        self.assertFalse(rtu.read_holding_registers(4, 0, 1)['success'])
+        self.assertFalse(rtu.connected)
+
+        rtu.client = MagicMock()
+        rtu.client.read_holding_registers.return_value = Mock(registers=[9])
+        rtu.connected = True
+        self.assertEqual(rtu.read_holding_registers(4, 0, 1), {"success": True, "data": [9]})
+        self.assertEqual(rtu.get_status()['slaves']['4']['state'], BreakerState.CLOSED)
+        rtu.scheduler.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+"""
+Тесты для версий состояния (ETag, условные GET, long-poll)
+"""
+import json
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from app.bus_service import BusService
+from app.network_manager import NetworkManager
+from app.state_versions import StateVersions
+
+
+class TestVersionedState(unittest.TestCase):
+    """Тестирование версии состояния домена"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.data = {"running": False}
+        self.build = MagicMock(side_effect=lambda: dict(self.data))
+        self.states = StateVersions(refresh_interval=0.05)
+        self.state = self.states.register('tcp', self.build)
+
+    def test_version_changes_only_with_data(self):
+        """Тест: версия и тело меняются только при изменении состояния"""
+        etag, version, body = self.state.current()
+        self.assertEqual(version, 1)
+        self.assertEqual(body, '{"running":false}')
+        self.assertEqual(etag, f"tcp-{self.states.epoch}-1")
+
+        time.sleep(0.06)
+        self.assertEqual(self.state.current(), (etag, 1, body))
+        self.assertIs(self.state.current()[2], body)
+
+        self.data["running"] = True
+        self.state.invalidate()
+        self.assertEqual(self.state.current()[1], 2)
+
+    def test_refresh_interval(self):
+        """Тест: в пределах интервала состояние не собирается повторно"""
+        for _ in range(10):
+            self.state.current()
+        self.assertEqual(self.build.call_count, 1)
+
+    def test_not_periodic(self):
+        """Тест: состояние без периода собирается только после invalidate"""
+        state = self.states.register('config', self.build, periodic=False)
+        state.current()
+        time.sleep(0.06)
+        state.current()
+        self.assertEqual(self.build.call_count, 1)
+        state.invalidate()
+        state.current()
+        self.assertEqual(self.build.call_count, 2)
+
+    def test_wait(self):
+        """Тест long-poll: ответ при новой версии или текущая версия по истечении ожидания"""
+        etag, _, _ = self.state.current()
+        started = time.monotonic()
+        self.assertEqual(self.state.wait([etag], 0.1)[0], etag)
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+
+        def change():
+            self.data["running"] = True
+        timer = threading.Timer(0.1, change)
+        timer.start()
+        started = time.monotonic()
+        new_etag, version, body = self.state.wait([etag], 2.0)
+        timer.join()
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(version, 2)
+        self.assertEqual(body, '{"running":true}')
+
+    def test_invalidate_wakes_waiter(self):
+        """Тест: invalidate сразу будит ожидающих состояния без периода"""
+        state = self.states.register('config', self.build, periodic=False)
+        etag, _, _ = state.current()
+
+        def change():
+            self.data["running"] = True
+            self.states.invalidate('config')
+        timer = threading.Timer(0.1, change)
+        timer.start()
+        started = time.monotonic()
+        self.assertEqual(state.wait([etag], 2.0)[1], 2)
+        timer.join()
+        self.assertLess(time.monotonic() - started, 1.0)
+
+
+class TestStateGet(unittest.TestCase):
+    """Тестирование условного получения состояния через BusService"""
+
+    def test_not_modified(self):
+        """Тест: актуальный ETag - ответ без тела"""
+        service = BusService(MagicMock())
+        service.states.register('tcp', service.tcp_status)
+
+        state = service.state_get('tcp')
+        self.assertEqual(state['body'], '{"error":"TCP server not initialized"}')
+        self.assertEqual(service.state_get('tcp', etags=['other', state['etag']]),
+                         {'etag': state['etag'], 'version': 1, 'not_modified': True})
+        self.assertFalse(service.state_get('unknown')['success'])
+
+    def test_counters_do_not_change_etag(self):
+        """Тест: счетчики не входят в версию состояния и отдаются отдельно"""
+        service = BusService(MagicMock())
+        master = MagicMock()
+        service.rtu_buses.add_bus('line1', master)
+        service.states.register('rtu', service.rtu_status)
+        statuses = [{"connected": True, "port": "/dev/ttyUSB0", "baudrate": 9600,
+                     "queue": {"poll": {"completed": completed}},
+                     "slaves": {"1": {"state": "closed", "rtt_p50_ms": completed}}}
+                    for completed in (1, 2, 3)]
+        master.get_status.side_effect = statuses
+
+        etag = service.state_get('rtu')['etag']
+        service.states.invalidate('rtu')
+        self.assertTrue(service.state_get('rtu', etags=[etag])['not_modified'])
+        self.assertEqual(service.rtu_stats()['queue'], {"poll": {"completed": 3}})
+
+        master.get_status.side_effect = None
+        master.get_status.return_value = dict(statuses[0], slaves={"1": {"state": "open"}})
+        service.states.invalidate('rtu')
+        state = service.state_get('rtu', etags=[etag])
+        self.assertEqual(json.loads(state['body'])['slaves'], {"1": "open"})
+
+
+class TestHostnameCache(unittest.TestCase):
+    """Тестирование кэша имени хоста"""
+
+    @patch('app.network_manager.subprocess.run')
+    @patch('app.network_manager.socket.gethostname', return_value='host-a')
+    def test_cached(self, gethostname, run):
+        """Тест: имя хоста запрашивается один раз, set_hostname обновляет кэш"""
+        manager = NetworkManager()
+        self.assertEqual(manager.get_hostname(), 'host-a')
+        self.assertEqual(manager.get_hostname(), 'host-a')
+        self.assertEqual(gethostname.call_count, 1)
+
+        self.assertTrue(manager.set_hostname('host-b'))
+        self.assertEqual(manager.get_hostname(), 'host-b')
+        self.assertEqual(gethostname.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Тесты для контроля допуска клиентов Modbus TCP сервера
+"""
+import socket
+import struct
+import time
+import unittest
+from app.modbus.tcp_admission import TokenBucket, AdmissionController
+from app.modbus.tcp_server import ModbusTCPServer
+
+
+def read_request(transaction_id: int) -> bytes:
+    """MBAP + FC3 (unit 1, адрес 0, 1 регистр)"""
+    return struct.pack('>HHHBBHH', transaction_id, 0, 6, 1, 3, 0, 1)
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Тестирование бюджета запросов"""
+
+    def test_burst_then_rate(self):
+        """Тест: после исчерпания запаса запросы ждут пополнения по rate"""
+        bucket = TokenBucket(rate=10, burst=3)
+        now = bucket.updated
+        for _ in range(3):
+            self.assertEqual(bucket.delay(now), 0)
+            bucket.consume(now=now)
+        self.assertAlmostEqual(bucket.delay(now), 0.1)
+
+        # Несколько запросов в одном пакете - долг увеличивает ожидание
+        bucket.consume(2, now=now)
+        self.assertAlmostEqual(bucket.delay(now), 0.3)
+        self.assertEqual(bucket.delay(now + 0.31), 0)
+
+
+class TestAdmissionController(unittest.TestCase):
+    """Тестирование лимитов соединений"""
+
+    def test_connection_limits(self):
+        """Тест общего лимита и лимита на клиента"""
+        admission = AdmissionController(max_connections=3, max_connections_per_client=2)
+        self.assertTrue(admission.admit('10.0.0.1'))
+        self.assertTrue(admission.admit('10.0.0.1'))
+        self.assertFalse(admission.admit('10.0.0.1'))
+        self.assertTrue(admission.admit('10.0.0.2'))
+        self.assertFalse(admission.admit('10.0.0.3'))
+
+        admission.release('10.0.0.2')
+        self.assertTrue(admission.admit('10.0.0.3'))
+
+        status = admission.get_status()
+        self.assertEqual(status['connections'], 3)
+        self.assertEqual(status['rejected_connections'], 2)
+        self.assertEqual(status['clients']['10.0.0.1']['rejected_connections'], 1)
+
+    def test_disconnected_clients_trimmed(self):
+        """Тест: статистика отключившихся клиентов ограничена"""
+        admission = AdmissionController(max_clients_tracked=2)
+        for index in range(5):
+            host = f'10.0.0.{index}'
+            admission.admit(host)
+            admission.release(host)
+        self.assertEqual(len(admission.clients), 2)
+
+
+class TestAdmissionServer(unittest.TestCase):
+    """Тестирование лимитов на работающем сервере"""
+
+    def start_server(self, **admission):
+        server = ModbusTCPServer(host='127.0.0.1', port=0, admission=admission)
+        self.assertTrue(server.start())
+        self.addCleanup(server.stop)
+        return server
+
+    def connect(self, server):
+        sock = socket.create_connection((server.host, server.port), timeout=2)
+        self.addCleanup(sock.close)
+        return sock
+
+    def test_max_connections(self):
+        """Тест: соединение сверх max_connections закрывается сервером"""
+        server = self.start_server(max_connections=1)
+        first = self.connect(server)
+        first.sendall(read_request(1))
+        self.assertEqual(len(first.recv(64)), 11)
+
+        second = self.connect(server)
+        self.assertEqual(second.recv(64), b'')
+        self.assertEqual(server.get_status()['admission']['rejected_connections'], 1)
+
+    def test_rate_limit_throttles_client(self):
+        """Тест: клиент сверх бюджета замедляется, статистика показывает задержки"""
+        server = self.start_server(rate_limit=50, rate_burst=5)
+        sock = self.connect(server)
+        started = time.monotonic()
+        for transaction_id in range(15):
+            sock.sendall(read_request(transaction_id))
+            self.assertEqual(len(sock.recv(64)), 11)
+        self.assertGreater(time.monotonic() - started, 0.15)
+
+        stats = server.get_status()['admission']['clients']['127.0.0.1']
+        self.assertEqual(stats['requests'], 15)
+        self.assertGreater(stats['throttled'], 0)
+        self.assertEqual(stats['bytes_out'], 15 * 11)
+
+    def test_idle_timeout(self):
+        """Тест: соединение без запросов закрывается после idle_timeout"""
+        server = self.start_server(idle_timeout=0.2)
+        sock = self.connect(server)
+        self.assertEqual(sock.recv(64), b'')
+        time.sleep(0.05)
+
+        admission = server.get_status()['admission']
+        self.assertEqual(admission['clients']['127.0.0.1']['idle_closed'], 1)
+        self.assertEqual(admission['connections'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
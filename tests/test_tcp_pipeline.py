@@ -0,0 +1,100 @@
+"""
+Тесты для параллельного выполнения запросов Modbus TCP
+"""
+import socket
+import struct
+import time
+import unittest
+from unittest.mock import MagicMock
+from app.modbus.gateway import GatewayServerContext
+from app.modbus.rtu_master import ModbusRTUMaster
+from app.modbus.tcp_server import ModbusTCPServer
+
+WRITE_DELAY = 0.3
+DEVICES = [{"slave_id": slave_id, "registers": [{"name": "t", "address": 10}]} for slave_id in (1, 2, 3)]
+
+
+def frame(transaction_id: int, unit_id: int, pdu: bytes) -> bytes:
+    return struct.pack('>HHHB', transaction_id, 0, len(pdu) + 1, unit_id) + pdu
+
+
+def write_register(transaction_id: int, unit_id: int, value: int) -> bytes:
+    return frame(transaction_id, unit_id, struct.pack('>BHH', 6, 10, value))
+
+
+def read_register(transaction_id: int, unit_id: int) -> bytes:
+    return frame(transaction_id, unit_id, struct.pack('>BHH', 3, 10, 1))
+
+
+class TestPipelinedRequests(unittest.TestCase):
+    """Тестирование запросов, отправленных без ожидания ответов"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        def slow_write(slave_id, address, value):
+            time.sleep(WRITE_DELAY)
+            return {"success": True}
+
+        self.master = MagicMock(spec=ModbusRTUMaster)
+        self.master.write_register.side_effect = slow_write
+        gateway = GatewayServerContext(self.master, DEVICES)
+        for slave_id in (1, 2, 3):
+            gateway.update(slave_id, 'holding_register', 10, [slave_id * 100])
+
+        self.server = ModbusTCPServer(host='127.0.0.1', port=0, context=gateway)
+        self.assertTrue(self.server.start())
+        self.addCleanup(self.server.stop)
+        self.sock = socket.create_connection(('127.0.0.1', self.server.port), timeout=2)
+        self.addCleanup(self.sock.close)
+
+    def receive(self, count: int):
+        """Прочитать count ответов: [(transaction id, unit id, pdu)]"""
+        buffer = b''
+        responses = []
+        while len(responses) < count:
+            buffer += self.sock.recv(256)
+            while len(buffer) >= 7:
+                transaction_id, _, length, unit_id = struct.unpack('>HHHB', buffer[:7])
+                if len(buffer) < 6 + length:
+                    break
+                responses.append((transaction_id, unit_id, buffer[7:6 + length]))
+                buffer = buffer[6 + length:]
+        return responses
+
+    def test_writes_to_different_units_run_concurrently(self):
+        """Тест: записи на разные unit выполняются одновременно, чтение отвечает сразу"""
+        started = time.monotonic()
+        self.sock.sendall(write_register(1, 1, 11) + write_register(2, 2, 22) + read_register(3, 3))
+        responses = self.receive(3)
+        elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 2 * WRITE_DELAY)
+        self.assertEqual(responses[0], (3, 3, struct.pack('>BBH', 3, 2, 300)))
+        self.assertEqual({r[0]: r[1] for r in responses[1:]}, {1: 1, 2: 2})
+
+        stats = self.server.get_status()['admission']['clients']['127.0.0.1']
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['max_inflight'], 2)
+
+    def test_same_unit_keeps_order(self):
+        """Тест: чтение после записи в тот же unit ждет записи и видит новое значение"""
+        self.sock.sendall(write_register(7, 1, 42) + read_register(8, 1))
+        responses = self.receive(2)
+
+        self.assertEqual([r[0] for r in responses], [7, 8])
+        self.assertEqual(responses[1][2], struct.pack('>BBH', 3, 2, 42))
+
+    def test_failed_write(self):
+        """Тест: ошибка записи на шину - Slave Device Failure с transaction id запроса"""
+        self.master.write_register.side_effect = None
+        self.master.write_register.return_value = {"success": False, "error": "Timeout"}
+        self.sock.sendall(write_register(5, 2, 1) + read_register(6, 2))
+
+        self.assertEqual(self.receive(2), [
+            (5, 2, bytes([0x86, 0x04])),
+            (6, 2, struct.pack('>BBH', 3, 2, 200))
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
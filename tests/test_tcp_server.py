@@ -0,0 +1,73 @@
+"""
+Тесты для запуска и остановки Modbus TCP сервера
+"""
+import os
+import socket
+import threading
+import time
+import unittest
+from app.modbus.tcp_server import ModbusTCPServer
+
+
+def open_fds():
+    return len(os.listdir('/proc/self/fd'))
+
+
+class TestModbusTCPServerLifecycle(unittest.TestCase):
+    """Тестирование жизненного цикла сервера"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.server = ModbusTCPServer(host='127.0.0.1', port=0)
+        self.addCleanup(self.server.stop)
+
+    def test_start_waits_for_listening(self):
+        """Тест: после start() порт уже принимает соединения"""
+        self.assertTrue(self.server.start())
+        self.assertNotEqual(self.server.port, 0)
+        socket.create_connection(('127.0.0.1', self.server.port), timeout=1).close()
+
+    def test_bind_error(self):
+        """Тест: занятый порт - start() возвращает False"""
+        self.assertTrue(self.server.start())
+        other = ModbusTCPServer(host='127.0.0.1', port=self.server.port)
+
+        self.assertFalse(other.start())
+        self.assertFalse(other.running)
+        self.assertIn('address already in use', other.error)
+
+    def test_stop_closes_clients_and_port(self):
+        """Тест: stop() закрывает соединения клиентов и освобождает порт"""
+        self.assertTrue(self.server.start())
+        client = socket.create_connection(('127.0.0.1', self.server.port), timeout=1)
+        self.addCleanup(client.close)
+
+        self.server.stop()
+        self.assertEqual(client.recv(16), b'')
+        self.assertEqual(self.server.admission.connections, 0)
+        with self.assertRaises(OSError):
+            socket.create_connection(('127.0.0.1', self.server.port), timeout=1)
+
+        # Перезапуск на том же порту
+        self.assertTrue(self.server.start())
+
+    @unittest.skipUnless(os.path.isdir('/proc/self/fd'), "requires /proc")
+    def test_restart_does_not_leak(self):
+        """Тест: 1000 циклов запуска и остановки не оставляют потоков и сокетов"""
+        self.assertTrue(self.server.start())
+        self.server.stop()
+        threads, fds = threading.active_count(), open_fds()
+
+        started = time.monotonic()
+        for _ in range(1000):
+            self.assertTrue(self.server.start())
+            self.server.stop()
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(threading.active_count(), threads)
+        self.assertEqual(open_fds(), fds)
+        self.assertLess(elapsed / 1000, 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+Тесты для объединения записей
+"""
+import threading
+import time
+import unittest
+from unittest.mock import Mock, MagicMock
+from app.modbus.bus_scheduler import bus_context, current_deadline, DEADLINE_EXCEEDED, OUTCOME_UNKNOWN
+from app.modbus.write_batcher import WriteBatcher, MAX_WRITE_REGISTERS
+from app.modbus.rtu_master import ModbusRTUMaster
+
+
+class TestWriteBatcher(unittest.TestCase):
+    """Тестирование пакетной записи"""
+
+    def setUp(self):
+        """Подготовка тестов"""
+        self.calls = []
+        self.batcher = WriteBatcher(self._write, window=0.05)
+
+    def _write(self, function, slave_id, addr, value):
+        self.calls.append((function, slave_id, addr, value))
+        return {"success": True}
+
+    def _burst(self, writes):
+        results = []
+        threads = [
+            threading.Thread(target=lambda w=w: results.append(self.batcher.submit(*w)))
+            for w in writes
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        return results
+
+    def test_contiguous_registers_merged(self):
+        """Тест объединения соседних регистров в FC16"""
+        results = self._burst([('register', 1, addr, addr * 10) for addr in (3, 1, 2)])
+
+        self.assertEqual(self.calls, [('registers', 1, 1, [10, 20, 30])])
+        self.assertEqual(results, [{"success": True}] * 3)
+        self.assertEqual(self.batcher.get_stats(), {"writes": 3, "frames": 1})
+
+    def test_gaps_and_slaves_split(self):
+        """Тест: разрывы адресов и разные slave - отдельные запросы"""
+        self._burst([('coil', 1, 0, True), ('coil', 1, 5, False), ('coil', 2, 0, True)])
+        self.assertEqual(sorted(self.calls), [
+            ('coil', 1, 0, True), ('coil', 1, 5, False), ('coil', 2, 0, True)
+        ])
+
+    def test_last_write_wins(self):
+        """Тест повторной записи одного адреса"""
+        batch = [(0, 1, Mock()), (1, 2, Mock()), (0, 3, Mock())]
+        runs = list(WriteBatcher._runs('register', batch))
+        self.assertEqual([(r[0], r[1], len(r[2])) for r in runs], [(0, [3, 2], 3)])
+
+    def test_protocol_limit(self):
+        """Тест ограничения 123 регистров в FC16"""
+        batch = [(addr, 0, Mock()) for addr in range(200)]
+        runs = list(WriteBatcher._runs('register', batch))
+        self.assertEqual([len(r[1]) for r in runs], [MAX_WRITE_REGISTERS, 200 - MAX_WRITE_REGISTERS])
+
+    def test_expired_write_dropped(self):
+        """Тест: запись, срок которой истек до отправки пакета, не выполняется"""
+        with bus_context(deadline=time.monotonic() + 0.01):
+            result = self.batcher.submit('register', 1, 0, 5)
+        time.sleep(0.1)
+
+        self.assertEqual(result, {"success": False, "error": DEADLINE_EXCEEDED})
+        self.assertEqual(self.calls, [])
+
+    def test_started_batch_awaited(self):
+        """Тест: пакет, отправленный до срока записи, дожидается результата"""
+        def slow_write(*args):
+            time.sleep(0.2)
+            return {"success": True}
+
+        batcher = WriteBatcher(slow_write, window=0.01, transaction_timeout=1.0)
+        with bus_context(deadline=time.monotonic() + 0.1):
+            self.assertEqual(batcher.submit('register', 1, 0, 5), {"success": True})
+
+        batcher = WriteBatcher(slow_write, window=0.01, transaction_timeout=0.01)
+        with bus_context(deadline=time.monotonic() + 0.1):
+            self.assertEqual(batcher.submit('register', 1, 0, 5), {"success": False, "error": OUTCOME_UNKNOWN})
+
+    def test_deadline_passed_to_write(self):
+        """Тест: пакет ставится в очередь шины со сроком своих записей"""
+        deadlines = []
+        batcher = WriteBatcher(lambda *args: deadlines.append(current_deadline()) or {"success": True},
+                               window=0.01)
+        deadline = time.monotonic() + 5
+        with bus_context(deadline=deadline):
+            self.assertEqual(batcher.submit('coil', 1, 0, True), {"success": True})
+        self.assertEqual(deadlines, [deadline])
+
+
+class TestMasterWriteBatching(unittest.TestCase):
+    """Тестирование пакетной записи в RTU мастере"""
+
+    def test_burst_becomes_one_frame(self):
+        """Тест: серия write_register - один write_registers"""
+        rtu = ModbusRTUMaster(port='/dev/ttyUSB0', write_batch_window=0.05)
+        rtu.client = MagicMock()
+        rtu.client.write_registers.return_value = Mock(function_code=16)
+        rtu.connected = True
+
+        threads = [threading.Thread(target=rtu.write_register, args=(1, addr, addr)) for addr in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+
+        rtu.client.write_registers.assert_called_once_with(0, [0, 1, 2, 3], slave=1)
+        rtu.client.write_register.assert_not_called()
+        rtu.scheduler.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()